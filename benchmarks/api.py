@@ -0,0 +1,239 @@
+"""End-to-end benchmarks of yt-stream-manager.py against benchmarks/fake_youtube.py.
+
+Each scenario runs a fresh `YouTubeStreamManager` (authentication included,
+like a CLI run) against the local fake API and measures wall time, HTTP round
+trips, API calls and response bytes. Latency and jitter are injected by the fake server.
+With `-check` the results are compared with the regression thresholds in
+benchmarks/thresholds.json and the exit code is 1 if any is exceeded. The
+thresholds are meant for the default latency without injected errors.
+
+    python benchmarks/api.py -runs 20 -latency 0.05 -jitter 0.02 -check
+"""
+
+import argparse
+import datetime
+import importlib.util
+import json
+import logging
+import os
+import shutil
+import statistics
+import sys
+import tempfile
+import time
+
+from fake_youtube import FakeYouTube
+
+BENCHMARKS = os.path.dirname(os.path.abspath(__file__))
+SCRIPT = os.path.join(os.path.dirname(BENCHMARKS), "yt-stream-manager.py")
+THRESHOLDS = os.path.join(BENCHMARKS, "thresholds.json")
+STREAM_ID = "bench-stream"
+
+
+class Sandbox:
+    """A copy of the script in a temporary directory, configured for the fake API.
+
+    The manager keeps its config, token, caches and journals next to the
+    script, so running the copy never touches the files of a real setup.
+    """
+
+    def __init__(self, fake, streams):
+        self.directory = tempfile.mkdtemp(prefix="yt-stream-manager-bench-")
+        self._ledgers = []  # of the managers created, to flush before `remove`
+        shutil.copy(SCRIPT, os.path.join(self.directory, "yt_stream_manager.py"))
+        config = {
+            "logger": "info",
+            "stream_settings": {
+                "stream_id": STREAM_ID,
+                "title": "Benchmark",
+                "privacy": "private",
+                "tags": ["bench"],
+            },
+            "streams": [
+                {"name": f"cam{i}", "stream_id": f"{STREAM_ID}-{i}"} for i in range(streams)
+            ],
+            "youtube_settings": {
+                "credentials_file": "client-secret.secret",
+                "discovery_url": fake.url + "/discovery/v1/apis/youtube/v3/rest",
+                "requests_per_second": 1000,
+                # the daily ledger would stop the runs long before they end
+                "quota_budget": 10**9,
+                # the managers of a run share the process, the file would outlive the sandbox
+                "response_cache_persist": False,
+            },
+        }
+        self._write("config.json", config)
+        self._write(
+            "token.secret",
+            {
+                "token": "fake-token",
+                "refresh_token": "fake-refresh-token",
+                "client_id": "fake-client",
+                "client_secret": "fake-secret",
+                "token_uri": fake.url + "/token",
+                # valid for the whole run, so no refresh is measured
+                "expiry": (
+                    datetime.datetime.now(datetime.timezone.utc) + datetime.timedelta(days=1)
+                ).strftime("%Y-%m-%dT%H:%M:%SZ"),
+            },
+        )
+        fake.add_stream(STREAM_ID)
+        for i in range(streams):
+            fake.add_stream(f"{STREAM_ID}-{i}")
+
+        spec = importlib.util.spec_from_file_location(
+            "yt_stream_manager", os.path.join(self.directory, "yt_stream_manager.py")
+        )
+        self.module = importlib.util.module_from_spec(spec)
+        spec.loader.exec_module(self.module)
+        self.manager().refresh_discovery_document()
+
+    def _write(self, name, data):
+        with open(os.path.join(self.directory, name), "w") as f:
+            json.dump(data, f)
+
+    def manager(self):
+        manager = self.module.YouTubeStreamManager("config.json")
+        self._ledgers.append(manager.quota)
+        return manager
+
+    def remove(self):
+        # flushed at exit otherwise, when the directory is long gone
+        for ledger in self._ledgers:
+            ledger.close()
+        self._ledgers = []
+        shutil.rmtree(self.directory, ignore_errors=True)
+
+
+def percentile(values, p):
+    """Nearest-rank percentile."""
+    values = sorted(values)
+    return values[max(0, min(len(values) - 1, round(p / 100 * len(values)) - 1))]
+
+
+def measure(fake, runs, prepare, operation):
+    """Run `operation(prepare())` `runs` times, return the result row."""
+    walls, round_trips, calls, sizes = [], [], [], []
+    for _ in range(runs):
+        context = prepare()
+        fake.reset_counters()
+        start = time.perf_counter()
+        result = operation(context)
+        walls.append(time.perf_counter() - start)
+        if result is None:
+            raise SystemExit("Operation failed, run with -verbose to see the log")
+        round_trips.append(fake.http_requests)
+        calls.append(sum(fake.calls.values()))
+        sizes.append(fake.response_bytes)
+    return {
+        "runs": runs,
+        "round_trips": statistics.median(round_trips),
+        "api_calls": statistics.median(calls),
+        "response_kb": statistics.median(sizes) / 1024,
+        "p50_ms": percentile(walls, 50) * 1000,
+        "p99_ms": percentile(walls, 99) * 1000,
+        "max_ms": max(walls) * 1000,
+    }
+
+
+def scenarios(sandbox, monitor_polls):
+    def authenticated():
+        manager = sandbox.manager()
+        manager._authenticate()
+        return manager
+
+    def started():
+        manager = sandbox.manager()
+        manager.start_broadcast()
+        return sandbox.manager()  # stop_broadcast runs in a new process
+
+    def pooled():
+        manager = sandbox.manager()
+        manager.config["stream_settings"]["pool_size"] = 1
+        manager.fill_pool()
+        return manager
+
+    def poll(manager):
+        for _ in range(monitor_polls):
+            manager.poll_health()
+        return True
+
+    return {
+        "start_broadcast": (sandbox.manager, lambda m: m.start_broadcast()),
+        # the pipeline alone, `start_broadcast` also refills the pool in the background
+        "start_broadcast_pooled": (pooled, lambda m: m._run_start_pipeline({})),
+        "stop_broadcast": (started, lambda m: m.stop_broadcast()),
+        "create_stream": (
+            sandbox.manager,
+            lambda m: m.create_stream("bench", "rtmp", "1080p", 30),
+        ),
+        "start_broadcast_fleet": (
+            sandbox.manager,
+            lambda m: m.start_broadcasts(m.stream_names()),
+        ),
+        "monitor": (authenticated, poll),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("-runs", type=int, default=10, help="Runs per scenario")
+    parser.add_argument("-latency", type=float, default=0.02, help="Seconds per HTTP request")
+    parser.add_argument("-jitter", type=float, default=0.01, help="Random +/- seconds per request")
+    parser.add_argument("-error_rate", type=float, default=0.0, help="Probability of a 503 per call")
+    parser.add_argument("-streams", type=int, default=10, help="Streams of the fleet scenario")
+    parser.add_argument("-polls", type=int, default=10, help="Health polls per monitor run")
+    parser.add_argument("-only", nargs="+", metavar="SCENARIO", help="Scenarios to run")
+    parser.add_argument("-check", action="store_true", help="Fail if a threshold is exceeded")
+    parser.add_argument("-thresholds", default=THRESHOLDS, help="Regression thresholds file")
+    parser.add_argument("-json", action="store_true", help="Print the results as JSON")
+    parser.add_argument("-verbose", action="store_true", help="Keep the manager's log output")
+    args = parser.parse_args()
+
+    fake = FakeYouTube(args.latency, args.jitter, args.error_rate, seed=1)
+    fake.start()
+    if not args.verbose:
+        logging.disable(logging.WARNING)
+    sandbox = Sandbox(fake, args.streams)
+    results = {}
+    try:
+        for name, (prepare, operation) in scenarios(sandbox, args.polls).items():
+            if args.only and name not in args.only:
+                continue
+            results[name] = measure(fake, args.runs, prepare, operation)
+    finally:
+        logging.disable(logging.NOTSET)
+        sandbox.remove()
+        fake.stop()
+
+    if args.json:
+        print(json.dumps(results, indent=4))
+    else:
+        print(
+            f"{'scenario':<24}{'trips':>7}{'calls':>7}{'kb':>8}"
+            f"{'p50 ms':>9}{'p99 ms':>9}{'max ms':>9}"
+        )
+        for name, row in results.items():
+            print(
+                f"{name:<24}{row['round_trips']:>7g}{row['api_calls']:>7g}{row['response_kb']:>8.1f}"
+                f"{row['p50_ms']:>9.1f}{row['p99_ms']:>9.1f}{row['max_ms']:>9.1f}"
+            )
+
+    if args.check:
+        with open(args.thresholds, "r") as f:
+            thresholds = json.load(f)
+        failed = [
+            f"{name}: {metric} {results[name][metric]:g} > {limit:g}"
+            for name, limits in thresholds.items()
+            if name in results
+            for metric, limit in limits.items()
+            if results[name][metric] > limit
+        ]
+        for failure in failed:
+            print(f"REGRESSION {failure}")
+        if failed:
+            sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,55 @@
+"""Stand-in for ffmpeg to test the encoder supervisor of yt-stream-manager.py.
+
+Writes ffmpeg's stats line to stderr (ending in a carriage return like the
+real one) or, with `-progress`, key=value blocks to stdout. It can crash
+or stall after some seconds to exercise restarts and stall detection:
+
+    "encoder": {"command": ["python", "benchmarks/fake_encoder.py", "-exit_after", "30"]}
+"""
+
+import argparse
+import sys
+import time
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("-fps", type=float, default=30.0)
+    parser.add_argument("-bitrate", type=float, default=4500.0, help="kbit/s")
+    parser.add_argument("-interval", type=float, default=0.5, help="Seconds between updates")
+    parser.add_argument("-drop_every", type=int, default=0, help="Drop one frame per N frames")
+    parser.add_argument("-exit_after", type=float, help="Exit with code 1 after these seconds")
+    parser.add_argument("-stall_after", type=float, help="Stop writing after these seconds")
+    parser.add_argument("-progress", action="store_true", help="Write `-progress pipe:1` output")
+    args = parser.parse_args()
+
+    print("Input #0, v4l2, from '/dev/video0':", file=sys.stderr, flush=True)
+    start = time.monotonic()
+    while True:
+        elapsed = time.monotonic() - start
+        if args.exit_after is not None and elapsed >= args.exit_after:
+            print("rtmp://a.rtmp.youtube.com/live2: Broken pipe", file=sys.stderr, flush=True)
+            sys.exit(1)
+        if args.stall_after is not None and elapsed >= args.stall_after:
+            time.sleep(args.interval)
+            continue
+        frames = int(elapsed * args.fps)
+        dropped = frames // args.drop_every if args.drop_every else 0
+        if args.progress:
+            sys.stdout.write(
+                f"frame={frames}\nfps={args.fps:.2f}\nbitrate={args.bitrate:.1f}kbits/s\n"
+                f"drop_frames={dropped}\nspeed=1x\nprogress=continue\n"
+            )
+            sys.stdout.flush()
+        else:
+            sys.stderr.write(
+                f"frame={frames:5d} fps={args.fps:3.0f} q=28.0 size=  {int(elapsed * args.bitrate / 8):6d}kB "
+                f"time={time.strftime('%H:%M:%S', time.gmtime(elapsed))}.00 "
+                f"bitrate={args.bitrate:6.1f}kbits/s drop={dropped} speed=1x    \r"
+            )
+            sys.stderr.flush()
+        time.sleep(args.interval)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,116 @@
+"""Local SMTP stand-in for the email notifications of yt-stream-manager.py.
+
+Accepts every mail without delivering it and counts connections, so digests
+and connection reuse can be checked. It does not offer STARTTLS, set
+`smtp_starttls` to false under `email` in the config. `-latency` delays
+every reply to simulate a slow mail server.
+
+    python benchmarks/fake_smtp.py -port 8025 -latency 1
+"""
+
+import argparse
+import socketserver
+import threading
+import time
+
+
+class FakeSMTP:
+    def __init__(self, latency=0.0, fail=False):
+        self.latency = latency
+        self.fail = fail  # reject every mail with a 554
+        self.connections = 0
+        self.messages = []  # (sender, recipients, data)
+        self.on_message = None
+        self._lock = threading.Lock()
+        self._server = None
+
+    def start(self, port=0):
+        """Serve in a background thread, returns the port."""
+        self._server = socketserver.ThreadingTCPServer(("127.0.0.1", port), _Handler)
+        self._server.daemon_threads = True
+        self._server.fake = self
+        threading.Thread(target=self._server.serve_forever, daemon=True).start()
+        return self._server.server_address[1]
+
+    def stop(self):
+        self._server.shutdown()
+        self._server.server_close()
+
+    def _received(self, sender, recipients, data):
+        with self._lock:
+            self.messages.append((sender, recipients, data))
+        if self.on_message is not None:
+            self.on_message(sender, recipients, data)
+
+
+class _Handler(socketserver.StreamRequestHandler):
+    def reply(self, line):
+        time.sleep(self.server.fake.latency)
+        self.wfile.write(line.encode() + b"\r\n")
+
+    def handle(self):
+        fake = self.server.fake
+        with fake._lock:
+            fake.connections += 1
+        self.reply("220 fake-smtp ready")
+        sender, recipients = None, []
+        for raw in self.rfile:
+            line = raw.decode("utf-8", "replace").rstrip("\r\n")
+            verb = line.split(" ", 1)[0].upper()
+            if verb == "EHLO":
+                self.reply("250-fake-smtp")
+                self.reply("250-AUTH PLAIN")
+                self.reply("250 8BITMIME")
+            elif verb == "HELO":
+                self.reply("250 fake-smtp")
+            elif verb == "AUTH":
+                self.reply("235 Authentication successful")
+            elif verb == "MAIL":
+                sender, recipients = line.split(":", 1)[1].strip(), []
+                self.reply("250 OK")
+            elif verb == "RCPT":
+                recipients.append(line.split(":", 1)[1].strip())
+                self.reply("250 OK")
+            elif verb == "DATA":
+                self.reply("354 End data with <CR><LF>.<CR><LF>")
+                data = []
+                for raw in self.rfile:
+                    if raw.rstrip(b"\r\n") == b".":
+                        break
+                    data.append(raw[1:] if raw.startswith(b"..") else raw)
+                if fake.fail:
+                    self.reply("554 rejected")
+                    continue
+                fake._received(sender, recipients, b"".join(data))
+                self.reply("250 OK")
+            elif verb in ("RSET", "NOOP"):
+                self.reply("250 OK")
+            elif verb == "QUIT":
+                self.reply("221 Bye")
+                return
+            else:
+                self.reply("502 Command not implemented")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("-port", type=int, default=8025)
+    parser.add_argument("-latency", type=float, default=0.0, help="Seconds per reply")
+    parser.add_argument("-fail", action="store_true", help="Reject every mail")
+    args = parser.parse_args()
+
+    fake = FakeSMTP(args.latency, args.fail)
+    fake.on_message = lambda sender, recipients, data: print(
+        f"--- mail {len(fake.messages)} on connection {fake.connections} "
+        f"from {sender} to {', '.join(recipients)}\n{data.decode('utf-8', 'replace')}"
+    )
+    port = fake.start(args.port)
+    print(f"Fake SMTP server listening on 127.0.0.1:{port}")
+    try:
+        threading.Event().wait()
+    except KeyboardInterrupt:
+        fake.stop()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,433 @@
+"""Local stand-in for the parts of the YouTube Data API v3 used by yt-stream-manager.py.
+
+Serves a discovery document pointing at itself, an OAuth token endpoint and
+the `liveBroadcasts` insert/bind/transition/list, `liveStreams` insert/list and
+`videos` update endpoints, including HTTP batch requests. `list` responses
+carry an ETag and are answered with `304 Not Modified` when the client's
+`If-None-Match` still matches. Latency, jitter, random server errors and
+`quotaExceeded` responses can be injected. Sessions against the real API can
+be recorded through the server and replayed later.
+
+    python benchmarks/fake_youtube.py -port 8089 -latency 0.05 -jitter 0.02
+    python benchmarks/fake_youtube.py -record session.jsonl
+    python benchmarks/fake_youtube.py -replay session.jsonl
+"""
+
+import argparse
+import copy
+import email
+import hashlib
+import itertools
+import json
+import random
+import threading
+import time
+import urllib.error
+import urllib.request
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlparse
+
+UPSTREAM_URL = "https://youtube.googleapis.com"
+SERVICE_PATH = "/youtube/v3/"
+
+
+class FakeYouTube:
+    """In-memory YouTube Data API with injectable latency and errors.
+
+    `latency` and `jitter` are in seconds and apply to every HTTP request (a
+    batch counts once). `error_rate` is the probability of a `backendError`
+    503 for each API call. `fail_next()` queues errors for specific methods.
+    """
+
+    def __init__(
+        self,
+        latency=0.0,
+        jitter=0.0,
+        error_rate=0.0,
+        quota_exceeded=False,
+        record=None,
+        replay=None,
+        seed=None,
+    ):
+        self.latency = latency
+        self.jitter = jitter
+        self.error_rate = error_rate
+        self.quota_exceeded = quota_exceeded
+        self.record = record
+        self.random = random.Random(seed)
+        self.lock = threading.Lock()
+        self.ids = itertools.count(1)
+        self.broadcasts = {}
+        self.streams = {}
+        self.videos = {}
+        self.failures = {}  # methodId -> [(status, reason), ...]
+        self.http_requests = 0  # round trips, a batch counts once
+        self.response_bytes = 0  # bodies sent, without headers
+        self.calls = {}  # methodId -> number of API calls
+        self.replay = None
+        if replay is not None:
+            with open(replay, "r") as f:
+                self.replay = [json.loads(line) for line in f]
+        self._server = None
+
+    # -- server -------------------------------------------------------------
+
+    def start(self, port=0):
+        """Start serving in a background thread, returns the base URL."""
+        fake = self
+
+        class Handler(_Handler):
+            server_fake = fake
+
+        self._server = ThreadingHTTPServer(("127.0.0.1", port), Handler)
+        self._server.daemon_threads = True
+        threading.Thread(target=self._server.serve_forever, daemon=True).start()
+        return self.url
+
+    def stop(self):
+        self._server.shutdown()
+        self._server.server_close()
+
+    @property
+    def url(self):
+        return f"http://127.0.0.1:{self._server.server_port}"
+
+    def discovery_document(self):
+        """Return the bundled v3 discovery document, pointed at this server."""
+        import googleapiclient.discovery_cache
+
+        document = json.loads(googleapiclient.discovery_cache.get_static_doc("youtube", "v3"))
+        document["rootUrl"] = self.url + "/"
+        document["baseUrl"] = self.url + SERVICE_PATH
+        return document
+
+    def add_stream(self, stream_id, stream_status="active", health_status="good"):
+        """Create a stream as if it had been created with `liveStreams.insert`."""
+        with self.lock:
+            self.streams[stream_id] = {
+                "kind": "youtube#liveStream",
+                "id": stream_id,
+                "snippet": {"title": stream_id},
+                "cdn": {"ingestionType": "rtmp", "resolution": "1080p", "frameRate": "30fps"},
+                "status": {
+                    "streamStatus": stream_status,
+                    "healthStatus": {"status": health_status, "configurationIssues": []},
+                },
+            }
+
+    def fail_next(self, method, status=503, reason="backendError", count=1):
+        """Answer the next `count` calls of `method` (a methodId) with an error."""
+        with self.lock:
+            self.failures.setdefault(method, []).extend([(status, reason)] * count)
+
+    def reset_counters(self):
+        with self.lock:
+            self.http_requests = 0
+            self.response_bytes = 0
+            self.calls = {}
+
+    def _sleep(self):
+        delay = self.latency + self.random.uniform(-self.jitter, self.jitter)
+        if delay > 0:
+            time.sleep(delay)
+
+    # -- API ----------------------------------------------------------------
+
+    ROUTES = {
+        ("POST", "liveBroadcasts"): "youtube.liveBroadcasts.insert",
+        ("GET", "liveBroadcasts"): "youtube.liveBroadcasts.list",
+        ("PUT", "liveBroadcasts"): "youtube.liveBroadcasts.update",
+        ("DELETE", "liveBroadcasts"): "youtube.liveBroadcasts.delete",
+        ("POST", "liveBroadcasts/bind"): "youtube.liveBroadcasts.bind",
+        ("POST", "liveBroadcasts/transition"): "youtube.liveBroadcasts.transition",
+        ("POST", "liveStreams"): "youtube.liveStreams.insert",
+        ("GET", "liveStreams"): "youtube.liveStreams.list",
+        ("PUT", "videos"): "youtube.videos.update",
+        ("GET", "videos"): "youtube.videos.list",
+    }
+
+    def call(self, verb, path, body, headers=None):
+        """Answer one API call, returns `(status, response_dict)`."""
+        url = urlparse(path)
+        query = {key: values[0] for key, values in parse_qs(url.query).items()}
+        resource = url.path[len(SERVICE_PATH) :] if url.path.startswith(SERVICE_PATH) else None
+        method = self.ROUTES.get((verb, resource))
+        with self.lock:
+            self.calls[method] = self.calls.get(method, 0) + 1
+            queued = self.failures.get(method)
+            failure = queued.pop(0) if queued else None
+
+        if self.record is not None:
+            return self._forward(verb, path, body, headers or {})
+        if self.replay is not None:
+            return self._replayed(verb, path, body)
+        if method is None:
+            return _error(404, "notFound", f"{verb} {url.path} is not implemented")
+        if self.quota_exceeded:
+            return _error(403, "quotaExceeded", "The request cannot be completed because you have exceeded your quota.")
+        if failure is None and self.random.random() < self.error_rate:
+            failure = (503, "backendError")
+        if failure is not None:
+            return _error(failure[0], failure[1], "Injected error")
+        with self.lock:
+            status, response = getattr(self, "_" + method.split(".", 1)[1].replace(".", "_"))(
+                query, body
+            )
+        if verb == "GET" and status == 200:
+            response["etag"] = hashlib.md5(
+                json.dumps(response, sort_keys=True).encode("utf-8")
+            ).hexdigest()
+            if headers is not None and headers.get("If-None-Match") == response["etag"]:
+                return 304, None
+        return status, response
+
+    def _liveBroadcasts_insert(self, query, body):
+        broadcast = copy.deepcopy(body)
+        broadcast["kind"] = "youtube#liveBroadcast"
+        broadcast["id"] = f"broadcast{next(self.ids)}"
+        broadcast["snippet"]["publishedAt"] = time.strftime("%Y-%m-%dT%H:%M:%SZ", time.gmtime())
+        broadcast.setdefault("status", {})["lifeCycleStatus"] = "created"
+        broadcast.setdefault("contentDetails", {})
+        self.broadcasts[broadcast["id"]] = broadcast
+        self.videos[broadcast["id"]] = {"id": broadcast["id"], "snippet": copy.deepcopy(broadcast["snippet"])}
+        return 200, broadcast
+
+    def _liveBroadcasts_update(self, query, body):
+        broadcast = self.broadcasts.get(body.get("id"))
+        if broadcast is None:
+            return _error(404, "liveBroadcastNotFound", "Broadcast not found")
+        for part in query.get("part", "").split(","):
+            if part == "snippet":
+                broadcast["snippet"] = copy.deepcopy(body["snippet"])
+            elif part == "contentDetails":
+                bound = broadcast["contentDetails"].get("boundStreamId")
+                broadcast["contentDetails"] = copy.deepcopy(body["contentDetails"])
+                if bound is not None:
+                    broadcast["contentDetails"]["boundStreamId"] = bound
+        return 200, broadcast
+
+    def _liveBroadcasts_bind(self, query, body):
+        broadcast = self.broadcasts.get(query.get("id"))
+        if broadcast is None:
+            return _error(404, "liveBroadcastNotFound", "Broadcast not found")
+        broadcast["contentDetails"]["boundStreamId"] = query.get("streamId")
+        if broadcast["status"]["lifeCycleStatus"] == "created":
+            broadcast["status"]["lifeCycleStatus"] = "ready"
+        return 200, broadcast
+
+    def _liveBroadcasts_transition(self, query, body):
+        broadcast = self.broadcasts.get(query.get("id"))
+        if broadcast is None:
+            return _error(404, "liveBroadcastNotFound", "Broadcast not found")
+        target = query["broadcastStatus"]
+        if broadcast["status"]["lifeCycleStatus"] == target:
+            return _error(403, "redundantTransition", "Broadcast is already in that state")
+        broadcast["status"]["lifeCycleStatus"] = target
+        return 200, broadcast
+
+    def _liveBroadcasts_delete(self, query, body):
+        if self.broadcasts.pop(query.get("id"), None) is None:
+            return _error(404, "liveBroadcastNotFound", "Broadcast not found")
+        return 204, None
+
+    BROADCAST_FILTERS = {
+        "upcoming": ["created", "ready"],
+        "active": ["testStarting", "testing", "liveStarting", "live"],
+        "completed": ["complete"],
+    }
+
+    def _liveBroadcasts_list(self, query, body):
+        if "id" in query:
+            items = [self.broadcasts[i] for i in query["id"].split(",") if i in self.broadcasts]
+        else:
+            statuses = self.BROADCAST_FILTERS.get(query.get("broadcastStatus"))
+            items = [
+                broadcast
+                for broadcast in self.broadcasts.values()
+                if statuses is None or broadcast["status"]["lifeCycleStatus"] in statuses
+            ]
+        return 200, self._page(query, items)
+
+    def _liveStreams_insert(self, query, body):
+        stream = copy.deepcopy(body)
+        stream["kind"] = "youtube#liveStream"
+        stream["id"] = f"stream{next(self.ids)}"
+        stream["cdn"]["ingestionInfo"] = {
+            "streamName": f"key-{stream['id']}",
+            "ingestionAddress": "rtmp://127.0.0.1/live2",
+        }
+        stream["status"] = {"streamStatus": "ready", "healthStatus": {"status": "noData"}}
+        self.streams[stream["id"]] = stream
+        return 200, stream
+
+    def _liveStreams_list(self, query, body):
+        ids = query.get("id", "").split(",")
+        return 200, self._page(query, [self.streams[i] for i in ids if i in self.streams])
+
+    def _videos_update(self, query, body):
+        video = self.videos.get(body.get("id"))
+        if video is None:
+            return _error(404, "videoNotFound", "Video not found")
+        video["snippet"] = copy.deepcopy(body["snippet"])
+        return 200, video
+
+    def _videos_list(self, query, body):
+        ids = query.get("id", "").split(",")
+        return 200, self._page(query, [self.videos[i] for i in ids if i in self.videos])
+
+    def _page(self, query, items):
+        start = int(query.get("pageToken") or 0)
+        # YouTube ignores maxResults for lookups by id
+        size = int(query.get("maxResults") or 5) if "id" not in query else max(len(items), 1)
+        response = {
+            "items": copy.deepcopy(items[start : start + size]),
+            "pageInfo": {"totalResults": len(items), "resultsPerPage": size},
+        }
+        if start + size < len(items):
+            response["nextPageToken"] = str(start + size)
+        return response
+
+    # -- record / replay ----------------------------------------------------
+
+    def _forward(self, verb, path, body, headers):
+        request = urllib.request.Request(
+            UPSTREAM_URL + path,
+            data=json.dumps(body).encode("utf-8") if body is not None else None,
+            method=verb,
+            headers={
+                key: value
+                for key, value in headers.items()
+                if key.lower() in ["authorization", "content-type"]
+            },
+        )
+        try:
+            with urllib.request.urlopen(request) as response:
+                status, data = response.status, response.read()
+        except urllib.error.HTTPError as e:
+            status, data = e.code, e.read()
+        result = json.loads(data) if data else None
+        with self.lock, open(self.record, "a") as f:
+            entry = {"verb": verb, "path": path, "body": body, "status": status, "response": result}
+            f.write(json.dumps(entry) + "\n")
+        return status, result
+
+    def _replayed(self, verb, path, body):
+        with self.lock:
+            for i, entry in enumerate(self.replay):
+                if entry["verb"] == verb and entry["path"] == path:
+                    del self.replay[i]
+                    return entry["status"], entry["response"]
+        return _error(404, "notRecorded", f"{verb} {path} is not part of the recorded session")
+
+
+def _error(status, reason, message):
+    return status, {
+        "error": {
+            "code": status,
+            "message": message,
+            "errors": [{"reason": reason, "message": message}],
+        }
+    }
+
+
+class _Handler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"  # keep-alive, like the real API
+    server_fake = None
+
+    def log_message(self, format, *args):
+        pass
+
+    def do_GET(self):
+        self._dispatch("GET")
+
+    def do_POST(self):
+        self._dispatch("POST")
+
+    def do_PUT(self):
+        self._dispatch("PUT")
+
+    def do_DELETE(self):
+        self._dispatch("DELETE")
+
+    def _dispatch(self, verb):
+        fake = self.server_fake
+        length = int(self.headers.get("Content-Length") or 0)
+        raw = self.rfile.read(length) if length else b""
+        with fake.lock:
+            fake.http_requests += 1
+        fake._sleep()
+
+        path = urlparse(self.path).path
+        if path == "/discovery/v1/apis/youtube/v3/rest":
+            return self._send(200, json.dumps(fake.discovery_document()).encode("utf-8"))
+        if path == "/token":
+            token = {"access_token": f"fake-{time.time()}", "expires_in": 3600, "token_type": "Bearer"}
+            return self._send(200, json.dumps(token).encode("utf-8"))
+        if path.startswith("/batch"):
+            return self._batch(raw)
+        status, response = fake.call(verb, self.path, json.loads(raw) if raw else None, self.headers)
+        self._send(status, json.dumps(response).encode("utf-8") if response is not None else b"")
+
+    def _batch(self, raw):
+        message = email.message_from_bytes(
+            b"Content-Type: " + self.headers["Content-Type"].encode("ascii") + b"\r\n\r\n" + raw
+        )
+        parts = []
+        for part in message.get_payload():
+            inner = part.get_payload()
+            separator = "\r\n\r\n" if "\r\n\r\n" in inner else "\n\n"
+            head, _, body = inner.partition(separator)
+            verb, path = head.splitlines()[0].split(" ")[:2]
+            status, response = self.server_fake.call(
+                verb, path, json.loads(body) if body.strip() else None, self.headers
+            )
+            parts.append(
+                "--batch_boundary\r\n"
+                "Content-Type: application/http\r\n"
+                f"Content-ID: <response-{part['Content-ID'].strip('<>')}>\r\n\r\n"
+                f"HTTP/1.1 {status} {'OK' if status < 400 else 'Error'}\r\n"
+                "Content-Type: application/json; charset=UTF-8\r\n\r\n"
+                f"{json.dumps(response) if response is not None else ''}\r\n"
+            )
+        data = ("".join(parts) + "--batch_boundary--\r\n").encode("utf-8")
+        self._send(200, data, "multipart/mixed; boundary=batch_boundary")
+
+    def _send(self, status, data, content_type="application/json; charset=UTF-8"):
+        with self.server_fake.lock:
+            self.server_fake.response_bytes += len(data)
+        self.send_response(status)
+        self.send_header("Content-Type", content_type)
+        self.send_header("Content-Length", str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("-port", type=int, default=8089, help="Port to listen on")
+    parser.add_argument("-latency", type=float, default=0.0, help="Seconds added to every request")
+    parser.add_argument("-jitter", type=float, default=0.0, help="Random +/- seconds of latency")
+    parser.add_argument("-error_rate", type=float, default=0.0, help="Probability of a 503 per call")
+    parser.add_argument("-quota_exceeded", action="store_true", help="Answer every call with quotaExceeded")
+    parser.add_argument("-stream", action="append", default=[], help="Id of a stream to create (repeatable)")
+    group = parser.add_mutually_exclusive_group()
+    group.add_argument("-record", help="Forward calls to the real API and record them to this file")
+    group.add_argument("-replay", help="Answer calls from a recorded session")
+    args = parser.parse_args()
+
+    fake = FakeYouTube(
+        args.latency, args.jitter, args.error_rate, args.quota_exceeded, args.record, args.replay
+    )
+    for stream_id in args.stream:
+        fake.add_stream(stream_id)
+    url = fake.start(args.port)
+    print(f"Fake YouTube API listening on {url}")
+    print(f"Discovery document: {url}/discovery/v1/apis/youtube/v3/rest")
+    try:
+        threading.Event().wait()
+    except KeyboardInterrupt:
+        fake.stop()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,85 @@
+"""Cold start benchmark for the `stop_broadcast` path of yt-stream-manager.py.
+
+Every run starts a fresh interpreter with `-X importtime`, loads the script,
+creates the manager from the given config and authenticates - everything
+`stop_broadcast` does before its single API call. The slowest imports are
+reported and the exit code is 1 when the median wall time exceeds the budget.
+
+    python benchmarks/startup.py -config config.json -budget 0.8
+"""
+
+import argparse
+import os
+import statistics
+import subprocess
+import sys
+import time
+
+SCRIPT = os.path.join(
+    os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "yt-stream-manager.py"
+)
+
+COLD_START = """
+import importlib.util, sys
+spec = importlib.util.spec_from_file_location("yt_stream_manager", sys.argv[1])
+module = importlib.util.module_from_spec(spec)
+spec.loader.exec_module(module)
+manager = module.YouTubeStreamManager(sys.argv[2])
+sys.exit(0 if manager._authenticate() is not None else 1)
+"""
+
+
+def run_once(config):
+    """Return `(wall_seconds, {module: cumulative_us})` of one cold start."""
+    start = time.perf_counter()
+    process = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", COLD_START, SCRIPT, config],
+        capture_output=True,
+        text=True,
+    )
+    wall = time.perf_counter() - start
+    if process.returncode != 0:
+        sys.stderr.write(process.stderr)
+        raise SystemExit("Cold start failed - is there a valid token.secret?")
+
+    imports = {}
+    for line in process.stderr.splitlines():
+        # import time: self [us] | cumulative | imported package
+        if not line.startswith("import time:") or "imported package" in line:
+            continue
+        _, cumulative, name = line[len("import time:") :].split("|")
+        if not name[1:].startswith(" "):  # only top level imports
+            imports[name.strip()] = int(cumulative)
+    return wall, imports
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("-config", default="config.json", help="Config file to load")
+    parser.add_argument("-runs", type=int, default=5, help="Number of cold starts")
+    parser.add_argument(
+        "-budget", type=float, default=1.0, help="Allowed median wall time in seconds"
+    )
+    parser.add_argument("-top", type=int, default=10, help="Slowest imports to show")
+    args = parser.parse_args()
+
+    walls = []
+    imports = {}
+    for _ in range(args.runs):
+        wall, imports = run_once(args.config)
+        walls.append(wall)
+
+    median = statistics.median(walls)
+    print(f"cold start: median {median * 1000:.0f} ms, max {max(walls) * 1000:.0f} ms")
+    print("slowest imports (last run, cumulative):")
+    for name, cumulative in sorted(imports.items(), key=lambda i: -i[1])[: args.top]:
+        print(f"  {cumulative / 1000:8.1f} ms  {name}")
+
+    if median > args.budget:
+        print(f"FAILED: over the budget of {args.budget * 1000:.0f} ms")
+        sys.exit(1)
+    print(f"OK: within the budget of {args.budget * 1000:.0f} ms")
+
+
+if __name__ == "__main__":
+    main()
@@ -1,22 +1,122 @@
+import atexit
+import bisect
+import collections
+import contextlib
+import copy
 import datetime
+import fcntl
+import hashlib
+import itertools
 from zoneinfo import ZoneInfo
 import json
 import logging
+import logging.handlers
+import mmap
 import time
 import os
-from googleapiclient.discovery import build
-from google.oauth2.credentials import Credentials
-from google_auth_oauthlib.flow import InstalledAppFlow
-from google.auth.transport.requests import Request
-from googleapiclient.errors import HttpError
+import queue
+import random
+import re
+from concurrent.futures import ThreadPoolExecutor
+import selectors
+import signal
+import socket
+import socketserver
+import struct
+import subprocess
+import sys
+import threading
+
+# The Google client libraries take most of the start up time of the program, so
+# they are imported in the functions that need them instead of at module level.
+# `--help`, talking to a running daemon and validating the config never load them.
 
 
 class YouTubeStreamManager:
     SCOPES = ["https://www.googleapis.com/auth/youtube"]
     TOKEN_FILE = "token.secret"
     LOG_FILE = "yt-stream-manager.log"
+    LOG_FORMAT = "%(asctime)s - %(levelname)s - %(message)s"
+    QUOTA_LEDGER_FILE = "quota-ledger.json"
+    CONFIG_FILE = "config.json"
+    # of `CONFIG_FILE`, other configs get their own journal, see `_state_journal_filename`
+    STATE_JOURNAL_FILE = "broadcast-state.jsonl"
+    RESPONSE_CACHE_FILE = "response-cache.json"
+    HEALTH_HISTORY_FILE = "health-history.bin"
+    METADATA_PROGRESS_FILE = "metadata-progress.json"  # of an unfinished `update_metadata`
+    # samples further apart are a gap in the monitoring, not up or down time
+    HEALTH_HISTORY_MAX_GAP = 180
+    DISCOVERY_CACHE_FILE = "youtube-v3-discovery.json"
+    DISCOVERY_CACHE_VERSION = 1  # bump when the layout of the cache file changes
+    DISCOVERY_URL = "https://www.googleapis.com/discovery/v1/apis/youtube/v3/rest"
+    DISCOVERY_TIMEOUT = 10
+    SOCKET_FILE = "yt-stream-manager.sock"
+    CONTROL_SOCKET_TIMEOUT = 120  # seconds a client waits for the reply of the daemon
+    # may run for minutes and the daemon serves one command at a time, so they are
+    # not forwarded to it (they share the journal and ledger with the daemon anyway)
+    LOCAL_COMMANDS = ["go_live", "reconcile", "update_metadata"]
+    PROFILE_TOP_FUNCTIONS = 25  # printed after a run with `-profile`
+    HTTP_TIMEOUT = 30
+    BATCH_SIZE = 50  # requests per HTTP batch request
+    BATCH_WORKERS = 4  # HTTP batch requests executed at the same time
+    MAX_LIST_IDS = 50  # ids accepted by a single `list` call
+    MONITOR_FAST_INTERVAL = 5  # seconds between polls while something is changing
+    MONITOR_SLOW_INTERVAL = 60  # seconds between polls while everything is steady
+    MONITOR_FAST_WINDOW = 120  # seconds of fast polls after a change, then slow again
+
+    RETRY_BASE_DELAY = 1  # seconds, doubled with every attempt
+    RETRY_MAX_DELAY = 32
+    # rejected before being applied, so they are safe to retry for every method
+    REJECTED_STATUS = [429]
+    REJECTED_REASONS = ["rateLimitExceeded", "userRateLimitExceeded"]
+    # failed on YouTube's side, the request may or may not have been applied
+    SERVER_ERROR_STATUS = [500, 502, 503, 504]
+    # methods that must not be repeated without checking whether the first attempt went through
+    NON_IDEMPOTENT_METHODS = [
+        "youtube.liveBroadcasts.insert",
+        "youtube.liveStreams.insert",
+    ]
+
+    LIFECYCLE_TIMEOUT = 600  # seconds to wait for a broadcast to go live
+    LIFECYCLE_MIN_DELAY = 1  # first delay between two lifecycle polls
+    LIFECYCLE_MAX_DELAY = 30  # upper bound of the exponential poll delay
+    ROLLOVER_RETRY_DELAY = 60  # seconds after a failed rollover, doubled every time
+    ROLLOVER_ATTEMPTS = 3  # failed rollovers before a day part is given up
+
+    # lifeCycleStatus values in which YouTube is still processing a transition
+    TRANSITIONING_STATUS = ["testStarting", "liveStarting"]
+    # lifeCycleStatus values from which a broadcast will never go live
+    FINAL_STATUS = ["complete", "revoked"]
+    # errors of `transition` caused by YouTube (e.g. auto start) being faster than us
+    BENIGN_TRANSITION_REASONS = ["redundantTransition", "invalidTransition"]
+
+    RECONCILE_MIN_AGE = 600  # seconds before an untracked broadcast counts as orphaned
+    # lifeCycleStatus values of orphans that never went on air, they are deleted
+    ORPHAN_DELETE_STATUS = ["created", "ready"]
+    # lifeCycleStatus values of orphans that are streaming, they are completed to keep the video
+    ORPHAN_COMPLETE_STATUS = ["testing", "live"]
+    # the parts of a broadcast `reconcile` reads, everything else is left out of the responses
+    RECONCILE_FIELDS = "id,snippet(title,publishedAt),status(lifeCycleStatus),contentDetails(boundStreamId)"
+    # the parts of a past broadcast `update_metadata` selects by
+    METADATA_FIELDS = "id,snippet(title,actualStartTime,scheduledStartTime,publishedAt),contentDetails(boundStreamId)"
+    # writable snippet fields of a video, everything else is read only
+    METADATA_SNIPPET_KEYS = [
+        "title",
+        "description",
+        "tags",
+        "categoryId",
+        "defaultLanguage",
+        "defaultAudioLanguage",
+    ]
+
+    STEADY_STREAM_STATUS = ["active"]
+    STEADY_HEALTH_STATUS = ["good", "ok"]
+    STEADY_BROADCAST_STATUS = ["live", "complete", None]
+    STEADY_ENCODER_STATUS = ["starting", "running", None]  # `None` without an encoder
 
     CONF_LOGGER = "logger"
+    # samples kept in the health history ring file (24 bytes each), 0 disables it
+    CONF_HEALTH_HISTORY_SIZE = "health_history_size"
 
     CONF_EMAIL = "email"
     CONF_ENABLE_EMAIL = "enable_email"
@@ -26,18 +126,63 @@ class YouTubeStreamManager:
     CONF_SENDER_PASSWORD = "sender_password"
     CONF_RECIPIENT_EMAIL = "recipient_email"
     CONF_SUBJECT = "subject"
+    CONF_SMTP_STARTTLS = "smtp_starttls"  # e.g. off for a local SMTP stand-in
+    CONF_DIGEST_DELAY = "digest_delay"  # seconds notifications are collected per mail
 
     CONF_STREAM_SETTINGS = "stream_settings"
     CONF_STREAM_ID = "stream_id"
-    CONF_BROADCAST_ID = "broadcast_id"  # set by the system to later stop the broadcast
+    # only read for broadcasts started by older versions, see `BroadcastStateStore`
+    CONF_BROADCAST_ID = "broadcast_id"
     CONF_TITLE = "title"
     CONF_DESCRIPTION = "description"
     CONF_PRIVACY = "privacy"
     CONF_TAGS = "tags"
     CONF_CATEGORY = "category"
+    # broadcasts kept created, bound and updated in advance, see `fill_pool`
+    CONF_POOL_SIZE = "pool_size"
+    CONF_POOL_MAX_AGE = "pool_max_age"  # seconds before a pooled broadcast is deleted
+    # local start times ("HH:MM") of the day parts numbered "(1)", "(2)", .. in titles
+    CONF_DAY_PARTS = "day_parts"
+    CONF_TIMEZONE = "timezone"  # of the day parts and the dates in titles
+    CONF_ROLLOVER_LEAD = "rollover_lead"  # seconds the next broadcast is prepared early
+
+    CONF_ENCODER = "encoder"  # optional local encoder pushing to `stream_settings`
+    CONF_ENCODER_COMMAND = "command"  # argument list, e.g. ffmpeg with the ingest url
+    CONF_ENCODER_STALL_TIMEOUT = "stall_timeout"  # seconds without progress until a restart
+    CONF_ENCODER_RESTART_MIN_DELAY = "restart_min_delay"  # seconds, doubled per failed run
+    CONF_ENCODER_RESTART_MAX_DELAY = "restart_max_delay"
+
+    CONF_STREAMS = "streams"  # optional list of named streams for fleet mode
+    CONF_NAME = "name"
 
     CONF_YOUTUBE_SETTINGS = "youtube_settings"
     CONF_CREDENTIALS_FILE = "credentials_file"
+    CONF_DISCOVERY_CACHE_TTL = "discovery_cache_ttl"  # seconds
+    # e.g. pointed at benchmarks/fake_youtube.py to run against a local stand-in
+    CONF_DISCOVERY_URL = "discovery_url"
+    CONF_REQUESTS_PER_SECOND = "requests_per_second"  # client side rate limit
+    CONF_RETRY_DEADLINE = "retry_deadline"  # seconds an API call may be retried
+    CONF_QUOTA_BUDGET = "quota_budget"  # units per day
+    # share of the budget low priority calls (health polling) may use
+    CONF_QUOTA_LOW_PRIORITY_SHARE = "quota_low_priority_share"
+    # `list` responses kept for revalidation with their ETag, 0 disables the cache
+    CONF_RESPONSE_CACHE_SIZE = "response_cache_size"
+    CONF_RESPONSE_CACHE_TTL = "response_cache_ttl"  # seconds
+    CONF_RESPONSE_CACHE_PERSIST = "response_cache_persist"  # keep it between runs
+
+    CONF_METRICS = "metrics"
+    CONF_METRICS_ADDRESS = "address"
+    CONF_METRICS_PORT = "port"  # of `/metrics` while a long running command runs
+    # e.g. the node exporter's --collector.textfile.directory, written after every run
+    CONF_METRICS_TEXTFILE_DIRECTORY = "textfile_directory"
+
+    CONF_LOG_SETTINGS = "log_settings"
+    CONF_LOG_MAX_BYTES = "max_bytes"  # size at which the log file is rotated
+    CONF_LOG_BACKUP_COUNT = "backup_count"  # rotated log files that are kept
+    # e.g. `midnight` to rotate by time (see TimedRotatingFileHandler) instead of size
+    CONF_LOG_ROTATE_WHEN = "rotate_when"
+    CONF_LOG_JSON = "json"  # write the log file as JSON lines
+    CONF_LOG_MAX_MESSAGE_LENGTH = "max_message_length"  # longer messages are truncated
 
     CONF_INFO = "info"
     CONF_DEBUG = "debug"
@@ -51,6 +196,7 @@ class YouTubeStreamManager:
 
     DEFAULT_CONFIG = {
         CONF_LOGGER: "info",
+        CONF_HEALTH_HISTORY_SIZE: 256 * 1024,
         CONF_EMAIL: {
             CONF_ENABLE_EMAIL: False,
             # CONF_SMTP_SERVER: "",
@@ -59,6 +205,8 @@ class YouTubeStreamManager:
             # CONF_SENDER_PASSWORD: "",
             # CONF_RECIPIENT_EMAIL: "",
             # CONF_SUBJECT: "",
+            CONF_SMTP_STARTTLS: True,
+            CONF_DIGEST_DELAY: 30,
         },
         CONF_STREAM_SETTINGS: {
             CONF_STREAM_ID: None,  # required if calling start_broadcast
@@ -67,106 +215,665 @@ class YouTubeStreamManager:
             CONF_PRIVACY: CONF_PRIVATE,
             CONF_TAGS: [],
             CONF_CATEGORY: 1,
+            CONF_POOL_SIZE: 0,
+            CONF_POOL_MAX_AGE: 7 * 24 * 60 * 60,
+            CONF_DAY_PARTS: ["00:00", "12:00"],
+            CONF_TIMEZONE: "Europe/Berlin",
+            CONF_ROLLOVER_LEAD: 300,
+        },
+        CONF_ENCODER: {
+            CONF_ENCODER_COMMAND: None,
+            CONF_ENCODER_STALL_TIMEOUT: 10,
+            CONF_ENCODER_RESTART_MIN_DELAY: 1,
+            CONF_ENCODER_RESTART_MAX_DELAY: 60,
         },
         CONF_YOUTUBE_SETTINGS: {
-            CONF_CREDENTIALS_FILE: None
+            CONF_CREDENTIALS_FILE: None,
+            CONF_DISCOVERY_CACHE_TTL: 7 * 24 * 60 * 60,
+            CONF_DISCOVERY_URL: DISCOVERY_URL,
+            CONF_REQUESTS_PER_SECOND: 10,
+            CONF_RETRY_DEADLINE: 60,
+            CONF_QUOTA_BUDGET: 10000,
+            CONF_QUOTA_LOW_PRIORITY_SHARE: 0.8,
+            CONF_RESPONSE_CACHE_SIZE: 256,
+            CONF_RESPONSE_CACHE_TTL: 24 * 60 * 60,
+            CONF_RESPONSE_CACHE_PERSIST: True,
         },  # required if calling stop_broadcast
+        CONF_METRICS: {
+            CONF_METRICS_ADDRESS: "127.0.0.1",
+            CONF_METRICS_PORT: None,
+            CONF_METRICS_TEXTFILE_DIRECTORY: None,
+        },
+        CONF_LOG_SETTINGS: {
+            CONF_LOG_MAX_BYTES: 10 * 1024 * 1024,
+            CONF_LOG_BACKUP_COUNT: 5,
+            CONF_LOG_ROTATE_WHEN: None,
+            CONF_LOG_JSON: False,
+            CONF_LOG_MAX_MESSAGE_LENGTH: 4000,
+        },
+    }
+
+    # types and limits of the config, defaults come from `DEFAULT_CONFIG`, see `ConfigSchema`
+    NUMBER_TYPES = (int, float)
+    CONFIG_RULES = {
+        CONF_LOGGER: {"type": str, "choices": LOGGER_OPTIONS},
+        CONF_HEALTH_HISTORY_SIZE: {"type": int, "min": 0},
+        CONF_EMAIL: {
+            "type": dict,
+            "keys": {
+                CONF_ENABLE_EMAIL: {"type": bool},
+                CONF_SMTP_SERVER: {"type": str, "required_if": CONF_ENABLE_EMAIL},
+                CONF_SMTP_PORT: {"type": int, "required_if": CONF_ENABLE_EMAIL},
+                CONF_SENDER_EMAIL: {"type": str, "required_if": CONF_ENABLE_EMAIL},
+                CONF_SENDER_PASSWORD: {"type": str, "required_if": CONF_ENABLE_EMAIL},
+                CONF_RECIPIENT_EMAIL: {"type": str, "required_if": CONF_ENABLE_EMAIL},
+                CONF_SUBJECT: {"type": str, "required_if": CONF_ENABLE_EMAIL},
+                CONF_SMTP_STARTTLS: {"type": bool},
+                CONF_DIGEST_DELAY: {"type": NUMBER_TYPES, "min": 0},
+            },
+        },
+        CONF_STREAM_SETTINGS: {
+            "type": dict,
+            "required": True,
+            "keys": {
+                CONF_STREAM_ID: {"type": str},
+                CONF_TITLE: {"type": str},
+                CONF_DESCRIPTION: {"type": str},
+                CONF_PRIVACY: {"type": str, "choices": CONF_PRIVACY_OPTIONS},
+                CONF_TAGS: {"type": list, "items": {"type": str}},
+                CONF_CATEGORY: {"type": (int, str)},
+                CONF_POOL_SIZE: {"type": int, "min": 0},
+                CONF_POOL_MAX_AGE: {"type": NUMBER_TYPES, "min": 0},
+                CONF_DAY_PARTS: {"type": list, "format": "day_parts"},
+                CONF_TIMEZONE: {"type": str, "format": "timezone"},
+                CONF_ROLLOVER_LEAD: {"type": NUMBER_TYPES, "min": 0},
+            },
+        },
+        CONF_STREAMS: {
+            "type": list,
+            "unique": CONF_NAME,
+            "items": {
+                "type": dict,
+                "keys": {
+                    CONF_NAME: {"type": str, "required": True},
+                    CONF_STREAM_ID: {"type": str, "required": True},
+                    CONF_TITLE: {"type": str},
+                    CONF_DESCRIPTION: {"type": str},
+                    CONF_PRIVACY: {"type": str, "choices": CONF_PRIVACY_OPTIONS},
+                    CONF_TAGS: {"type": list, "items": {"type": str}},
+                },
+            },
+        },
+        CONF_ENCODER: {
+            "type": dict,
+            "keys": {
+                CONF_ENCODER_COMMAND: {
+                    "type": list,
+                    "min_items": 1,
+                    "items": {"type": str},
+                },
+                CONF_ENCODER_STALL_TIMEOUT: {"type": NUMBER_TYPES, "above": 0},
+                CONF_ENCODER_RESTART_MIN_DELAY: {"type": NUMBER_TYPES, "min": 0},
+                CONF_ENCODER_RESTART_MAX_DELAY: {"type": NUMBER_TYPES, "min": 0},
+            },
+        },
+        CONF_YOUTUBE_SETTINGS: {
+            "type": dict,
+            "required": True,
+            "keys": {
+                CONF_CREDENTIALS_FILE: {"type": str, "required": True},
+                CONF_DISCOVERY_CACHE_TTL: {"type": NUMBER_TYPES, "min": 0},
+                CONF_DISCOVERY_URL: {"type": str},
+                CONF_REQUESTS_PER_SECOND: {"type": NUMBER_TYPES, "above": 0},
+                CONF_RETRY_DEADLINE: {"type": NUMBER_TYPES, "min": 0},
+                CONF_QUOTA_BUDGET: {"type": int, "min": 0},
+                CONF_QUOTA_LOW_PRIORITY_SHARE: {"type": NUMBER_TYPES, "min": 0, "max": 1},
+                CONF_RESPONSE_CACHE_SIZE: {"type": int, "min": 0},
+                CONF_RESPONSE_CACHE_TTL: {"type": NUMBER_TYPES, "min": 0},
+                CONF_RESPONSE_CACHE_PERSIST: {"type": bool},
+            },
+        },
+        CONF_METRICS: {
+            "type": dict,
+            "keys": {
+                CONF_METRICS_ADDRESS: {"type": str},
+                CONF_METRICS_PORT: {"type": int, "min": 0, "max": 65535},
+                CONF_METRICS_TEXTFILE_DIRECTORY: {"type": str},
+            },
+        },
+        CONF_LOG_SETTINGS: {
+            "type": dict,
+            "keys": {
+                CONF_LOG_MAX_BYTES: {"type": int, "min": 0},
+                CONF_LOG_BACKUP_COUNT: {"type": int, "min": 0},
+                CONF_LOG_ROTATE_WHEN: {"type": str},
+                CONF_LOG_JSON: {"type": bool},
+                CONF_LOG_MAX_MESSAGE_LENGTH: {"type": int, "min": 0, "nullable": True},
+            },
+        },
     }
+    # read once on start up, a reloaded config only logs that they changed
+    RESTART_SETTINGS = [
+        (CONF_YOUTUBE_SETTINGS, CONF_CREDENTIALS_FILE),
+        (CONF_YOUTUBE_SETTINGS, CONF_DISCOVERY_URL),
+        (CONF_YOUTUBE_SETTINGS, CONF_RESPONSE_CACHE_PERSIST),
+        (CONF_HEALTH_HISTORY_SIZE, None),
+        (CONF_METRICS, CONF_METRICS_ADDRESS),
+        (CONF_METRICS, CONF_METRICS_PORT),
+    ]
+    _config_schema = None  # compiled on first use, see `config_schema`
 
-    def __init__(self, config_file="config.json"):
+    def __init__(self, config_file=CONFIG_FILE, tracer=None):
         self.config_file = config_file
+        self.tracer = tracer or Tracer()
+        self.youtube = None
+        self.credentials = None
+        self.credential_manager = None
         self.config = self.DEFAULT_CONFIG
         self.logger = self._setup_logger()
         self.config = self._load_config()
         # might has changed after loading the config
         self._reload_log_level()
-        self.logger.debug(f"Config:\n{self.config}")
+        self.logger.debug("Config:\n%s", self.config)
+        self._reload_log_file()
         if not self._check_config():
             self.logger.error("Config failed")
             exit()
+        self.rate_limiter = TokenBucket(
+            self.config[self.CONF_YOUTUBE_SETTINGS][self.CONF_REQUESTS_PER_SECOND]
+        )
+        dirname = os.path.dirname(__file__)
+        self.state = BroadcastStateStore(self._state_journal_filename(), self.logger)
+        self.quota = QuotaLedger(
+            os.path.join(dirname, self.QUOTA_LEDGER_FILE),
+            self.config[self.CONF_YOUTUBE_SETTINGS][self.CONF_QUOTA_BUDGET],
+            self.config[self.CONF_YOUTUBE_SETTINGS][self.CONF_QUOTA_LOW_PRIORITY_SHARE],
+            self.logger,
+        )
+        self.metrics = Metrics(self.quota)
+        self.metrics_server = None  # while a long running command serves `/metrics`
+        youtube_settings = self.config[self.CONF_YOUTUBE_SETTINGS]
+        self.response_cache = None
+        if youtube_settings[self.CONF_RESPONSE_CACHE_SIZE]:
+            self.response_cache = ResponseCache(
+                youtube_settings[self.CONF_RESPONSE_CACHE_SIZE],
+                youtube_settings[self.CONF_RESPONSE_CACHE_TTL],
+                os.path.join(dirname, self.RESPONSE_CACHE_FILE)
+                if youtube_settings[self.CONF_RESPONSE_CACHE_PERSIST]
+                else None,
+                self.logger,
+            )
+        self.notifier = EmailNotifier(self.config[self.CONF_EMAIL], self.logger)
+        self._pool_lock = threading.Lock()
+        self._pool_thread = None
+        self.encoder = None  # `EncoderSupervisor` while this process supervises it
+        self._encoder_lock_file = None
+        self.config_watcher = None  # `ConfigWatcher` of the long running commands
+        self._config_lock = threading.Lock()
 
-    def start_broadcast(self):
+    def start_broadcast(self, wait_live=False):
         # check if stream_id is set
         if self.config[self.CONF_STREAM_SETTINGS][self.CONF_STREAM_ID] is None:
             self.logger.error(
-                f"Failed to start the Broadcast! It seems like no `{self.CONF_STREAM_ID}`is provided in the config under `{self.CONF_STREAM_SETTINGS}`- run the program with `create_stream` to get a `{self.CONF_STREAM_ID}`"
+                "Failed to start the Broadcast! It seems like no `%s`is provided in the config under `%s`- run the program with `create_stream` to get a `%s`",
+                self.CONF_STREAM_ID,
+                self.CONF_STREAM_SETTINGS,
+                self.CONF_STREAM_ID,
             )
             return None
 
-        if self._authenticate() is None:
-            self.logger.info("Authentication failed")
-            return
-        self.logger.info("Authentication was successfull")
+        timings = {}
+        broadcast_id = None
+        try:
+            broadcast_id = self._run_start_pipeline(timings)
+        finally:
+            self._record_broadcast_action(
+                "start", broadcast_id is not None, timings.get("total", 0)
+            )
+            if self.logger.isEnabledFor(logging.INFO):
+                self.logger.info(
+                    "start_broadcast timings: %s",
+                    ", ".join(
+                        f"{phase}={seconds * 1000:.0f}ms"
+                        for phase, seconds in timings.items()
+                    ),
+                )
 
-        self.logger.info("Creating Broadcast..")
-        if self._create_live_broadcast() is None:
-            self.logger.info("Creating broadcast failed")
-            return
+        if self.config[self.CONF_STREAM_SETTINGS][self.CONF_POOL_SIZE]:
+            self.fill_pool_in_background()
+        if broadcast_id is None:
+            self.notifier.notify("Failed to start the broadcast", "See the log for details")
+            return None
+        self.notifier.notify(f"Broadcast {broadcast_id} was started")
+        if wait_live:
+            # if we are already sending data to the stream the broadcast has to be
+            # advanced manually, the lifecycle engine does that as soon as possible
+            if self.advance_to_live() != "live":
+                return None
+        return broadcast_id
+
+    def _run_start_pipeline(self, timings):
+        """Create and bind a broadcast with as few sequential round trips as possible.
+
+        The insert already carries title, description and privacy. Once the
+        broadcast id is known, binding the stream, setting tags/category via
+        `videos().update` and storing the broadcast id do not depend on each
+        other, so the latter two run in worker threads while the bind is in
+        flight. A resumed broadcast that was deleted on YouTube in the meantime
+        is journaled as deleted and a new one is inserted instead. `timings` is
+        filled with the duration of every phase.
+        """
+        with self._timed(timings, "total"):
+            with self._timed(timings, "auth"):
+                authenticated = self._authenticate() is not None
+            if not authenticated:
+                self.logger.info("Authentication failed")
+                return None
+            self.logger.info("Authentication was successfull")
+
+            with self._timed(timings, "claim"):
+                claimed = self._claim_pooled_broadcast()
+            if claimed:
+                return self.broadcast_id
+
+            resumed = self._resume_broadcast()
+            while True:
+                if resumed:
+                    self.logger.info(
+                        "Resuming Broadcast `%s` created by an interrupted run",
+                        self.broadcast_id,
+                    )
+                else:
+                    self.logger.info("Creating Broadcast..")
+                    with self._timed(timings, "insert"):
+                        created = self._create_live_broadcast() is not None
+                    if not created:
+                        self.logger.info("Creating broadcast failed")
+                        return None
+                    self.logger.info(
+                        "Boradcast with the ID: `%s`was successfully created",
+                        self.broadcast_id,
+                    )
+                try:
+                    bound, metadata_updated = self._bind_and_update_metadata(
+                        timings, resumed
+                    )
+                    break
+                except LookupError as e:
+                    self.state.append(
+                        "deleted", self.CONF_STREAM_SETTINGS, self.broadcast_id
+                    )
+                    if not resumed:
+                        self.logger.error("Binding stream to broadcast failed: %s", e)
+                        return None
+                    # deleted on YouTube since the interrupted run, start over
+                    self.logger.warning("%s Creating a new one instead", e)
+                    resumed = False
+
+            if bound is not None:
+                self.state.append("bound", self.CONF_STREAM_SETTINGS, self.broadcast_id)
+            if metadata_updated is not None:
+                self.state.append(
+                    "metadata", self.CONF_STREAM_SETTINGS, self.broadcast_id
+                )
+
+            if bound is None:
+                self.logger.info("Binding stream to broadcast failed")
+                return None
+            self.logger.info(
+                "Stream was successfully bound to Broadcast - Broadcast should start as soon as you start streaming to the streaming-key provides by `create_stream`"
+            )
+            if metadata_updated is None:
+                self.logger.info("Updating metadata failed")
+                return None
+
+            return self.broadcast_id
+
+    def _bind_and_update_metadata(self, timings, resumed):
+        """Bind the broadcast and set its metadata, returns both responses or `None`s.
+
+        Raises `LookupError` if YouTube does not know the broadcast.
+        """
         self.logger.info(
-            f"Boradcast with the ID: `{self.broadcast_id}`was successfully created"
+            "Binding stream ID `%s` Broadcast `%s` and updating metadata..",
+            self.config[self.CONF_STREAM_SETTINGS][self.CONF_STREAM_ID],
+            self.broadcast_id,
         )
+        with ThreadPoolExecutor(max_workers=2) as pool:
+            persisted = pool.submit(
+                self._run_timed,
+                timings,
+                "persist",
+                self._save_broadcast_id,
+                resumed,
+                parent=self.tracer.current(),
+            )
+            # httplib2 connections must not be shared between threads
+            metadata = pool.submit(
+                self._run_timed,
+                timings,
+                "metadata",
+                self.update_video_metadata,
+                self._new_authorized_http(),
+                parent=self.tracer.current(),
+            )
+            with self._timed(timings, "bind"):
+                bound = self._bind_broadcast_to_existing_stream()
+            persisted.result()
+            return bound, metadata.result()
 
-        # store the broadcast_id in the config to later be able to call stop_broadcast()
-        self.config[self.CONF_STREAM_SETTINGS][
-            self.CONF_BROADCAST_ID
-        ] = self.broadcast_id
+    def _claim_pooled_broadcast(self):
+        """Take a broadcast from the pool, returns `True` if one was claimed.
 
-        try:
-            dirname = os.path.dirname(__file__)
-            filename = os.path.join(dirname, self.config_file)
-            with open(filename, "w") as f:
-                json.dump(self.config, f, indent=4)
-            self.logger.info(f"Broadcast ID stored in config file {filename}")
-        except FileNotFoundError:
+        A pooled broadcast is already bound and has its tags and category, so
+        a single `liveBroadcasts().update` is left: it sets the title,
+        description and start time of now and turns auto start on, the rest of
+        `contentDetails` is sent as the insert set it. Without pooled
+        broadcasts this costs one read of the journal. Only a claimed
+        broadcast that is gone from YouTube is marked stale and the next one is
+        tried, any other error ends the claiming.
+        """
+        stream_settings = self.config[self.CONF_STREAM_SETTINGS]
+        pooled_after = time.time() - stream_settings[self.CONF_POOL_MAX_AGE]
+        while True:
+            title, description, body = self._live_broadcast_insert_body(stream_settings)
+            broadcast = self.state.claim(
+                self.CONF_STREAM_SETTINGS,
+                pooled_after,
+                title=title,
+                description=description,
+            )
+            if broadcast is None:
+                self.logger.info("No pooled broadcast is ready")
+                return False
+            broadcast_id = broadcast["broadcast_id"]
+            del body["status"]  # privacy was set by the insert
+            body["id"] = broadcast_id
+            try:
+                self._execute(
+                    self.youtube.liveBroadcasts().update(
+                        part="id,snippet,contentDetails", body=body
+                    )
+                )
+            except Exception as e:
+                self.logger.warning(
+                    "Failed to claim pooled broadcast `%s`: %s", broadcast_id, e
+                )
+                if self._http_error_reason(e) == "liveBroadcastNotFound":
+                    # deleted on YouTube, `fill_pool` drops it for good
+                    self.state.append("stale", self.CONF_STREAM_SETTINGS, broadcast_id)
+                    continue
+                # it may still exist, so it is left for `reconcile` and a new
+                # broadcast is inserted (`_resume_broadcast` skips it, it is bound)
+                return False
+            self.broadcast_id = broadcast_id
+            self.video_title = title
+            self.video_description = description
+            self.logger.info("Claimed pooled Broadcast `%s`", broadcast_id)
+            return True
+
+    def fill_pool(self, size=None):
+        """Delete stale pooled broadcasts and prepare new ones until the pool is full.
+
+        A pooled broadcast is created with auto start turned off, so streaming
+        does not start it, bound to the configured stream and given its tags
+        and category. The calls are made with low priority so filling the pool
+        never uses the quota left for starting broadcasts. Only one thread of
+        one process fills the pool at a time. `size` defaults to `pool_size`.
+        Returns the ids of the pooled broadcasts or `None` on failure.
+        """
+        if self.config[self.CONF_STREAM_SETTINGS][self.CONF_STREAM_ID] is None:
             self.logger.error(
-                f"Could not save Broadcast ID. Config file {filename} not found."
+                "No `%s` is provided under `%s`",
+                self.CONF_STREAM_ID,
+                self.CONF_STREAM_SETTINGS,
+            )
+            return None
+        if self._authenticate() is None:
+            self.logger.info("Authentication failed")
+            return None
+        if not self._pool_lock.acquire(blocking=False):
+            self.logger.info("The broadcast pool is already being filled")
+            return None
+        try:
+            with open(self.state.filename + ".pool.lock", "a") as lock_file:
+                try:
+                    fcntl.flock(lock_file, fcntl.LOCK_EX | fcntl.LOCK_NB)
+                except BlockingIOError:
+                    self.logger.info("The broadcast pool is being filled by another process")
+                    return None
+                # httplib2 connections must not be shared between threads
+                if size is None:
+                    size = self.config[self.CONF_STREAM_SETTINGS][self.CONF_POOL_SIZE]
+                return self._fill_pool(self._new_authorized_http(), size)
+        except Exception as e:
+            self.logger.error("Failed to fill the broadcast pool: %s", e)
+            return None
+        finally:
+            self._pool_lock.release()
+
+    def _fill_pool(self, http, size):
+        stream_settings = self.config[self.CONF_STREAM_SETTINGS]
+        pooled_after = time.time() - stream_settings[self.CONF_POOL_MAX_AGE]
+        pool = []
+        for broadcast in self.state.pool(self.CONF_STREAM_SETTINGS):
+            if broadcast["status"] == "stale" or broadcast["pooled"] <= pooled_after:
+                self._delete_pooled_broadcast(broadcast["broadcast_id"], http)
+            else:
+                pool.append(broadcast)
+        for broadcast in pool[size:]:  # the pool size was reduced
+            self._delete_pooled_broadcast(broadcast["broadcast_id"], http)
+        pool = pool[:size]
+        for broadcast in pool:  # finish what an interrupted fill left behind
+            self._prepare_pooled_broadcast(broadcast, http)
+        while len(pool) < size:
+            pool.append(self._prepare_pooled_broadcast(None, http))
+        self.logger.info("%s broadcasts are pooled", len(pool))
+        return [broadcast["broadcast_id"] for broadcast in pool]
+
+    def _prepare_pooled_broadcast(self, broadcast, http):
+        """Create (if `broadcast` is `None`), bind and update a pooled broadcast."""
+        stream_settings = self.config[self.CONF_STREAM_SETTINGS]
+        if broadcast is None:
+            title, description, body = self._live_broadcast_insert_body(stream_settings)
+            body["contentDetails"]["enableAutoStart"] = False
+            response = self._execute(
+                self.youtube.liveBroadcasts().insert(
+                    part="snippet,contentDetails,status", body=body
+                ),
+                http=http,
+                priority=QuotaLedger.PRIORITY_LOW,
+                idempotency_check=lambda: self._find_upcoming_broadcast(body, http),
+            )
+            broadcast = {
+                "broadcast_id": response["id"],
+                "title": title,
+                "description": description,
+                "bound": False,
+                "metadata": False,
+            }
+            self.state.append(
+                "pooled",
+                self.CONF_STREAM_SETTINGS,
+                broadcast["broadcast_id"],
+                title=title,
+                description=description,
             )
+            self.logger.info("Pooled Broadcast `%s` created", broadcast["broadcast_id"])
+        if not broadcast["bound"]:
+            self._execute(
+                self.youtube.liveBroadcasts().bind(
+                    part="id,contentDetails",
+                    id=broadcast["broadcast_id"],
+                    streamId=stream_settings[self.CONF_STREAM_ID],
+                ),
+                http=http,
+                priority=QuotaLedger.PRIORITY_LOW,
+            )
+            self.state.append("bound", self.CONF_STREAM_SETTINGS, broadcast["broadcast_id"])
+        if not broadcast["metadata"]:
+            self._execute(
+                self.youtube.videos().update(
+                    part="snippet",
+                    body=self._video_metadata_body(
+                        broadcast["broadcast_id"],
+                        stream_settings,
+                        broadcast["title"],
+                        broadcast["description"],
+                    ),
+                ),
+                http=http,
+                priority=QuotaLedger.PRIORITY_LOW,
+            )
+            self.state.append(
+                "metadata", self.CONF_STREAM_SETTINGS, broadcast["broadcast_id"]
+            )
+        return broadcast
 
-        self.logger.info(
-            f"Binding stream ID `{self.config[self.CONF_STREAM_SETTINGS][self.CONF_STREAM_ID]}` Broadcast `{self.broadcast_id}`.."
+    def _delete_pooled_broadcast(self, broadcast_id, http):
+        try:
+            self._execute(
+                self.youtube.liveBroadcasts().delete(id=broadcast_id),
+                http=http,
+                priority=QuotaLedger.PRIORITY_LOW,
+            )
+        except Exception as e:
+            if self._http_error_reason(e) != "liveBroadcastNotFound":
+                raise
+        self.state.append("deleted", self.CONF_STREAM_SETTINGS, broadcast_id)
+        self.logger.info("Deleted stale pooled Broadcast `%s`", broadcast_id)
+
+    def fill_pool_in_background(self):
+        """Run `fill_pool` in a daemon thread unless it is already running."""
+        if self._pool_thread is not None and self._pool_thread.is_alive():
+            return
+        self._pool_thread = threading.Thread(
+            target=self.fill_pool, name="broadcast-pool", daemon=True
         )
-        if self._bind_broadcast_to_existing_stream() is None:
-            self.logger.info("Binding stream to broadcast failed")
+        self._pool_thread.start()
+
+    def wait_for_pool(self):
+        """Wait until a background `fill_pool` has finished."""
+        if self._pool_thread is not None:
+            self._pool_thread.join()
+
+    def start_encoder(self):
+        """Supervise the configured encoder in this process, returns `True` if started.
+
+        Called by the long running commands. Only one process supervises the
+        encoder, e.g. a `monitor` next to `serve` leaves it to the daemon.
+        """
+        settings = self.config[self.CONF_ENCODER]
+        if settings[self.CONF_ENCODER_COMMAND] is None or self.encoder is not None:
+            return False
+        lock_file = open(self.state.filename + ".encoder.lock", "a")
+        try:
+            fcntl.flock(lock_file, fcntl.LOCK_EX | fcntl.LOCK_NB)
+        except BlockingIOError:
+            lock_file.close()
+            self.logger.info("The encoder is supervised by another process")
+            return False
+        self._encoder_lock_file = lock_file
+        self.encoder = EncoderSupervisor(settings, self.logger, self.notifier)
+        self.encoder.start()
+        return True
+
+    def stop_encoder(self):
+        """Stop the encoder supervised by this process, if any."""
+        if self.encoder is None:
             return
-        self.logger.info(
-            "Stream was successfully bound to Broadcast - Broadcast should start as soon as you start streaming to the streaming-key provides by `create_stream`"
+        self.encoder.stop()
+        self.encoder = None
+        self._encoder_lock_file.close()
+        self._encoder_lock_file = None
+
+    def _resume_broadcast(self):
+        """Pick up the broadcast of an interrupted start, returns `True` if there is one.
+
+        A broadcast is resumed if it was created but not both bound and updated,
+        and it would get the same title as a new broadcast (same day part).
+        """
+        broadcast = self.state.current(self.CONF_STREAM_SETTINGS)
+        if (
+            broadcast is None
+            or broadcast["status"] != "created"
+            or (broadcast["bound"] and broadcast["metadata"])
+        ):
+            return False
+        title, _, _ = self._live_broadcast_insert_body(
+            self.config[self.CONF_STREAM_SETTINGS]
         )
+        if broadcast["title"] != title:
+            return False
+        self.broadcast_id = broadcast["broadcast_id"]
+        self.video_title = broadcast["title"]
+        self.video_description = broadcast["description"]
+        return True
 
-        self.logger.info("Updating metadata..")
-        if self.update_video_metadata() is None:
-            self.logger.info("Updating metadata failed")
+    @contextlib.contextmanager
+    def _timed(self, timings, phase, parent=None):
+        start = time.perf_counter()
+        try:
+            with self.tracer.span(phase, parent):
+                yield
+        finally:
+            timings[phase] = time.perf_counter() - start
+
+    def _run_timed(self, timings, phase, function, *args, parent=None):
+        with self._timed(timings, phase, parent):
+            return function(*args)
+
+    def _save_broadcast_id(self, resumed=False):
+        """Journal the new broadcast to later be able to call stop_broadcast()."""
+        if resumed:
             return
+        self.state.append(
+            "created",
+            self.CONF_STREAM_SETTINGS,
+            self.broadcast_id,
+            title=self.video_title,
+            description=self.video_description,
+        )
+        self.logger.info("Broadcast ID stored in `%s`", self.state.filename)
 
-        # check if broadcast status is `ready` and stream status is `active`
-        # if it is we are already sending data to the stream and need to advance the stus manualy to start the broadcast
-        # time.sleep(1)  # not sure if it is needed
-        # if (
-        #     self._check_broadcast_status() == "ready"
-        #     and self._check_stream_health() == "active"
-        # ):
-        #     self._advance_broadcast()
+    def _current_broadcast_id(self, name=None):
+        """Return the broadcast last created for a named stream or `stream_settings`."""
+        broadcast = self.state.current(name or self.CONF_STREAM_SETTINGS)
+        if broadcast is not None:
+            return broadcast["broadcast_id"]
+        # earlier versions stored the broadcast id in the config
+        if name is None:
+            return self.config[self.CONF_STREAM_SETTINGS].get(self.CONF_BROADCAST_ID)
+        return self._stream_entry(name).get(self.CONF_BROADCAST_ID)
 
     def stop_broadcast(self):
+        broadcast_id = self._current_broadcast_id()
         # check if broadcast_id is set
-        if self.config[self.CONF_STREAM_SETTINGS][self.CONF_BROADCAST_ID] is None:
+        if broadcast_id is None:
             self.logger.error(
                 "Failed to stop the Broadcast! It seems like no broadcast id is stored because no broadcast was started"
             )
             return None
         self._authenticate()
+        start = time.perf_counter()
         try:
             request = self.youtube.liveBroadcasts().transition(
                 part="status",
                 broadcastStatus="complete",
-                id=self.config[self.CONF_STREAM_SETTINGS][self.CONF_BROADCAST_ID],
+                id=broadcast_id,
             )
-            response = request.execute()
+            response = self._execute(request)
+            self._record_broadcast_action("stop", True, time.perf_counter() - start)
+            self.state.append("complete", self.CONF_STREAM_SETTINGS, broadcast_id)
             self.logger.info(
-                f"Broadcast with  the id `{self.config[self.CONF_STREAM_SETTINGS][self.CONF_BROADCAST_ID]}` was stopped successfully"
+                "Broadcast with  the id `%s` was stopped successfully", broadcast_id
             )
+            self.notifier.notify(f"Broadcast {broadcast_id} was stopped")
             return response
         except Exception as e:
-            self.logger.error(f"Failed to stop broadcast: {str(e)}")
+            self._record_broadcast_action("stop", False, time.perf_counter() - start)
+            self.logger.error("Failed to stop broadcast: %s", str(e))
+            self.notifier.notify(f"Failed to stop broadcast {broadcast_id}", str(e))
             return None
 
     def create_stream(self, name, stream_type, resolution, fps):
@@ -186,277 +893,1927 @@ class YouTubeStreamManager:
                     },
                 },
             )
-            response = request.execute()
-            self.logger.info(f"Stream created: {response}")
+            response = self._execute(request)
+            self.logger.info("Stream created: %s", response)
             return response
         except Exception as e:
-            self.logger.error(f"Failed to create stream: {str(e)}")
+            self.logger.error("Failed to create stream: %s", str(e))
             return None
 
-    def _get_log_level(self):
-        if self.config[self.CONF_LOGGER] == self.CONF_INFO:
-            return logging.INFO
-        elif self.config[self.CONF_LOGGER] == self.CONF_DEBUG:
-            return logging.DEBUG
-        return logging.INFO
+    def stream_names(self):
+        """Return the names of the streams configured under `streams`."""
+        return [entry[self.CONF_NAME] for entry in self.config.get(self.CONF_STREAMS, [])]
 
-    def _setup_logger(self):
-        """Set up logging."""
-        print(self._get_log_level())
-        logging.basicConfig(
-            level=self._get_log_level(),
-            format="%(asctime)s - %(levelname)s - %(message)s",
-        )
-        dirname = os.path.dirname(__file__)
-        filename = os.path.join(dirname, self.LOG_FILE)
-        file_handler = logging.FileHandler(filename)
-        file_handler.setLevel(self._get_log_level())
-        file_handler.setFormatter(
-            logging.Formatter("%(asctime)s - %(levelname)s - %(message)s")
-        )
-        logger = logging.getLogger()
-        logger.addHandler(file_handler)
-        return logger
+    def _stream_entry(self, name):
+        for entry in self.config.get(self.CONF_STREAMS, []):
+            if entry[self.CONF_NAME] == name:
+                return entry
+        raise KeyError(f"No stream named `{name}` under `{self.CONF_STREAMS}`")
 
-    def _reload_log_level(self):
-        """Dynamically update the log level."""
-        self.logger.setLevel(self._get_log_level())
-        for handler in self.logger.handlers:
-            handler.setLevel(self._get_log_level())
-        # print(f"Log level updated to {logging.getLevelName(self._get_log_level())}")
+    def _fleet_stream_settings(self, name):
+        """Return the settings of a named stream, falling back to `stream_settings`."""
+        settings = {
+            key: value
+            for key, value in self.config[self.CONF_STREAM_SETTINGS].items()
+            if key not in [self.CONF_STREAM_ID, self.CONF_BROADCAST_ID]
+        }
+        settings.update(self._stream_entry(name))
+        settings[self.CONF_BROADCAST_ID] = self._current_broadcast_id(name)
+        return settings
 
-    def _load_config(self):
-        """Load the configuration from a file."""
-        try:
-            dirname = os.path.dirname(__file__)
-            filename = os.path.join(dirname, self.config_file)
-            with open(filename, "r") as f:
-                config = json.load(f)
-            self.logger.info(f"Loaded configuration from {filename}")
-            return config
-        except FileNotFoundError:
-            self.logger.error(f"Config file {filename} not found. - Exiting!!")
-            exit(1)
+    def _execute_batched(self, requests, idempotency_checks=None):
+        """Execute `(request_id, request)` pairs through HTTP batch requests.
 
-    def _check_config(self) -> bool:
-        if self.config[self.CONF_LOGGER] not in self.LOGGER_OPTIONS:
-            self.logger.error(
-                f"wrong log level set - options are: {self.LOGGER_OPTIONS}"
-            )
-            return False
+        Every batch holds up to `BATCH_SIZE` requests and up to `BATCH_WORKERS`
+        batches are in flight at the same time, each on its own transport.
+        Requests that failed with a retryable error are sent again in a new
+        batch. Like in `_execute`, an insert that may have been applied is only
+        sent again if `idempotency_checks` has a check for its request id and
+        that finds nothing. A check is passed the ids of the resources the
+        other requests returned, so identical inserts never claim the same
+        one. Returns `{request_id: (response, exception)}`.
+        """
+        idempotency_checks = idempotency_checks or {}
+        results = {}
+        methods = {request_id: request.methodId for request_id, request in requests}
+        parent = self.tracer.current()
 
-        email_keys = [
-            self.CONF_ENABLE_EMAIL,
-            self.CONF_SMTP_SERVER,
-            self.CONF_SMTP_PORT,
-            self.CONF_SENDER_EMAIL,
-            self.CONF_SENDER_PASSWORD,
-            self.CONF_RECIPIENT_EMAIL,
-            self.CONF_SUBJECT,
-        ]
-        if self.CONF_EMAIL not in self.config:
-            self.logger.info("No email config is provided")
-            self.config[self.CONF_EMAIL] = {self.CONF_ENABLE_EMAIL: False}
-            self.config
-        elif (
-            self.CONF_ENABLE_EMAIL in self.config[self.CONF_EMAIL]
-            and self.config[self.CONF_EMAIL][self.CONF_ENABLE_EMAIL]
-        ):
-            for key in email_keys:
-                if key not in self.config[self.CONF_EMAIL]:
-                    self.logger.error(
-                        f"No `{key}` is provided under `{self.CONF_EMAIL}`"
-                    )
-                    return False
+        def execute(chunk):
+            with self.tracer.span("batch", parent, requests=len(chunk)):
+                execute_chunk(chunk)
 
-        if self.CONF_STREAM_SETTINGS not in self.config:
-            self.logger.error("No `stream_settings` is provided")
-            return False
-        else:
-            for key in self.DEFAULT_CONFIG[self.CONF_STREAM_SETTINGS]:
-                if (
-                    key == self.CONF_PRIVACY
-                    and self.config[self.CONF_STREAM_SETTINGS][key]
-                    not in self.CONF_PRIVACY_OPTIONS
-                ):
-                    self.logger.error(
-                        f"Wrong {self.CONF_PRIVACY} option provided - valid options are: {self.CONF_PRIVACY_OPTIONS}"
-                    )
-                    return False
-                if key not in self.config[self.CONF_STREAM_SETTINGS]:
-                    # allow it to be None and check it in the functions chat requiere it
-                    # if self.DEFAULT_CONFIG[self.CONF_STREAM_SETTINGS][key] is None:
-                    #     self.logger.error(
-                    #         f"`{key}` is requred under `{self.CONF_STREAM_SETTINGS}`"
-                    #     )
-                    #     return False
-                    self.config[self.CONF_STREAM_SETTINGS][key] = self.DEFAULT_CONFIG[
-                        self.CONF_STREAM_SETTINGS
-                    ][key]
-
-        if self.CONF_YOUTUBE_SETTINGS not in self.config:
-            self.logger.error(f"No `{self.CONF_YOUTUBE_SETTINGS}` is provided")
-            return False
-        if self.CONF_CREDENTIALS_FILE not in self.config[self.CONF_YOUTUBE_SETTINGS]:
-            self.logger.error(
-                f"`{self.CONF_CREDENTIALS_FILE}` is requred under `{self.CONF_YOUTUBE_SETTINGS}`"
-            )
-            return False
-        return True
+        def execute_chunk(chunk):
+            start = time.perf_counter()
 
-    def _authenticate(self, create_new_token: bool = False):
-        try:
-            credentials = None
-            dirname = os.path.dirname(__file__)
-            token_filename = os.path.join(dirname, self.TOKEN_FILE)
-            if os.path.exists(token_filename):  # do we have a token file allready?
-                credentials = Credentials.from_authorized_user_file(
-                    token_filename, self.SCOPES
+            def callback(request_id, response, exception):
+                results[request_id] = (response, exception)
+                method = methods[request_id]
+                self._record_call(
+                    method,
+                    self.quota.cost(method),
+                    time.perf_counter() - start,
+                    exception
+                    and (self._http_error_reason(exception) or type(exception).__name__),
                 )
 
-            if create_new_token:
-                credentials = None  # will force to have to login again and create a new token file
+            batch = self.youtube.new_batch_http_request(callback=callback)
+            for request_id, request in chunk:
+                batch.add(request, request_id=request_id)
+            self.rate_limiter.acquire(len(chunk))
+            try:
+                batch.execute(http=self._new_authorized_http())
+            except Exception as e:
+                for request_id, _ in chunk:
+                    if request_id not in results:
+                        callback(request_id, None, e)
 
-            if (
-                not credentials or not credentials.valid
-            ):  # do we have no token or is the token no longer valid?
+        deadline = (
+            time.monotonic()
+            + self.config[self.CONF_YOUTUBE_SETTINGS][self.CONF_RETRY_DEADLINE]
+        )
+        attempt = 0
+        pending = requests
+        while pending:
+            chunks = [
+                pending[i : i + self.BATCH_SIZE]
+                for i in range(0, len(pending), self.BATCH_SIZE)
+            ]
+            with ThreadPoolExecutor(max_workers=self.BATCH_WORKERS) as pool:
+                list(pool.map(execute, chunks))
+
+            retry = []
+            for request_id, request in pending:
+                exception = results[request_id][1]
+                retryable = exception and self._retry_class(exception)
+                if retryable is None or (
+                    retryable == "ambiguous"
+                    and methods[request_id] in self.NON_IDEMPOTENT_METHODS
+                    and request_id not in idempotency_checks
+                ):
+                    continue  # reported to the caller
+                retry.append((request_id, request, retryable))
+            if not retry:
+                break
+            delay = self._retry_delay(attempt)
+            if time.monotonic() + delay > deadline:
+                break
+            self.logger.warning(
+                "Retrying %s failed batch requests in %.1fs (attempt %s)",
+                len(retry),
+                delay,
+                attempt + 1,
+            )
+            time.sleep(delay)
+            attempt += 1
+            pending = []
+            for request_id, request, retryable in retry:
                 if (
-                    credentials and credentials.expired and credentials.refresh_token
-                ):  # is the token expired?
-                    try:
-                        self.logger.debug("Token expired. Attempting to refresh...")
-                        credentials.refresh(Request())
-                        self.logger.debug("Token successfully refreshed.")
-                    except Exception as e:
-                        self.logger.error(f"Error renewing token: {e}")
-                        raise e
-                else:
+                    retryable == "ambiguous"
+                    and methods[request_id] in self.NON_IDEMPOTENT_METHODS
+                ):
+                    taken = {
+                        response["id"]
+                        for response, exception in results.values()
+                        if exception is None and "id" in (response or {})
+                    }
                     try:
-                        dirname = os.path.dirname(__file__)
-                        filename = os.path.join(
-                            dirname,
-                            self.config[self.CONF_YOUTUBE_SETTINGS][
-                                self.CONF_CREDENTIALS_FILE
-                            ],
-                        )
-                        flow = InstalledAppFlow.from_client_secrets_file(
-                            filename,
-                            self.SCOPES,
-                        )
-                        credentials = flow.run_local_server(
-                            port=0, access_type="offline", prompt="consent"
-                        )
+                        existing = idempotency_checks[request_id](taken)
                     except Exception as e:
+                        # unknown whether it was applied, so it is not repeated
                         self.logger.error(
-                            f"Failed to login, maybe the credentials file does not exist? `{filename}` Error was: {e}"
+                            "Failed to check whether %s `%s` was applied: %s",
+                            methods[request_id],
+                            request_id,
+                            e,
                         )
-                        raise e
-                try:
-                    with open(token_filename, "w") as token:
-                        token.write(credentials.to_json())
+                        continue
+                    if existing is not None:
                         self.logger.info(
-                            f"Token was succefully writen to token file `{token_filename}`"
+                            "%s `%s` was applied by the failed attempt - not repeating it",
+                            methods[request_id],
+                            request_id,
                         )
-                except Exception as e:
-                    self.logger.error(
-                        f"Failed to login, maybe the credentials file does not exist? `{token_filename}` Error was: {e}"
-                    )
-                    raise e
-
-            self.youtube = build("youtube", "v3", credentials=credentials)
-            return self.youtube
-        except Exception as e:
-            self.logger.error(f"Failed to authenticate: {str(e)}")
-            return None
-
-    def _create_live_broadcast(self):
-        try:
-            timezone = ZoneInfo("Europe/Berlin")
-            current_time = datetime.datetime.now(timezone)
-            current_date = datetime.datetime.now(timezone).strftime("%d.%m.%Y")
-            if current_time.hour < 12:
-                part = " (1)"
-            else:
-                part = " (2)"
+                        results[request_id] = (existing, None)
+                        continue
+                pending.append((request_id, request))
+        return results
 
-            self.video_title = (
-                self.config[self.CONF_STREAM_SETTINGS][self.CONF_TITLE]
-                + " "
-                + current_date
-                + part
-            )
-            request = self.youtube.liveBroadcasts().insert(
-                part="snippet,contentDetails,status",
-                body={
-                    "snippet": {
-                        "title": self.video_title,
-                        "description": self.config[self.CONF_STREAM_SETTINGS][
-                            self.CONF_DESCRIPTION
-                        ]
-                        + "\n"
-                        + current_date,
-                        "scheduledStartTime": current_time.isoformat(),
-                    },
-                    "contentDetails": {
-                        "monitorStream": {"enableMonitorStream": False},
-                        "enableAutoStart": True,
-                        "enableAutoStop": False,
-                    },
-                    "status": {
-                        "privacyStatus": self.config[self.CONF_STREAM_SETTINGS][
-                            self.CONF_PRIVACY
-                        ],
-                        "selfDeclaredMadeForKids": False,
-                        "broadcastStatus": "upcoming",
-                    },
-                },
-            )
-            response = request.execute()
-            self.logger.debug(response)
-            if "id" not in response:
-                self.logger.error("Broadcast creation failed: Response missing 'id'")
-                return None
-            self.broadcast_id = response["id"]
-            return response
-        except Exception as e:
-            self.logger.error(f"Failed to create broadcast: {str(e)}")
-            return None
+    def start_broadcasts(self, names):
+        """Start a broadcast for each of the named streams.
 
-    def _get_existing_stream(self, stream_id):
-        request = self.youtube.liveStreams().list(
-            part="snippet,cdn,contentDetails", id=stream_id
-        )
-        response = request.execute()
-        self.logger.info("get_existing_setream response")
-        self.logger.info(response)
-        if response["items"]:
-            return response["items"][0]
-        else:
-            self.logger.error(f"Stream with ID {stream_id} not found.")
+        All inserts go out in one batch, then all binds and metadata updates in a
+        second one, so starting many streams costs about as much as starting one.
+        Returns a `{name: report}` dict or `None` if authentication failed.
+        """
+        if self._authenticate() is None:
+            self.logger.info("Authentication failed")
             return None
-
-    def _bind_broadcast_to_existing_stream(self):
-        try:
-            request = self.youtube.liveBroadcasts().bind(
-                part="id,contentDetails",
-                id=self.broadcast_id,
-                streamId=self.config[self.CONF_STREAM_SETTINGS][self.CONF_STREAM_ID],
+        start = time.perf_counter()
+        # a name given twice would be two batch entries with the same request id
+        names = list(dict.fromkeys(names))
+        reports = {}
+        created = {}
+        inserts = []
+        checks = {}  # whether a failed insert created the broadcast anyway
+        for name in names:
+            try:
+                settings = self._fleet_stream_settings(name)
+            except KeyError as e:
+                reports[name] = {"ok": False, "error": e.args[0]}
+                continue
+            if settings[self.CONF_STREAM_ID] is None:
+                reports[name] = {
+                    "ok": False,
+                    "error": f"No `{self.CONF_STREAM_ID}` is provided",
+                }
+                continue
+            title, description, body = self._live_broadcast_insert_body(settings)
+            created[name] = (settings, title, description)
+            checks[name] = lambda taken, body=body: self._find_upcoming_broadcast(
+                body, exclude=taken
             )
-            response = request.execute()
-            self.logger.debug(response)
-
-            if "id" in response and response["id"] == self.broadcast_id:
-                self.logger.info(
-                    f"Stream {self.config[self.CONF_STREAM_SETTINGS][self.CONF_STREAM_ID]} is correctly bound to Broadcast {self.broadcast_id}"
+            inserts.append(
+                (
+                    name,
+                    self.youtube.liveBroadcasts().insert(
+                        part="snippet,contentDetails,status", body=body
+                    ),
                 )
-            else:
+            )
+
+        self.logger.info("Creating broadcasts for %s..", [name for name, _ in inserts])
+        follow_ups = []
+        events = []
+        for name, (response, exception) in self._execute_batched(
+            inserts, checks
+        ).items():
+            if exception is not None or "id" not in response:
                 self.logger.error(
-                    f"Failed to bind stream {self.config[self.CONF_STREAM_SETTINGS][self.CONF_STREAM_ID]} to Broadcast {self.broadcast_id}"
+                    "Failed to create broadcast for `%s`: %s", name, exception
                 )
-            return response
-        except Exception as e:
+                reports[name] = {"ok": False, "error": str(exception)}
+                continue
+            settings, title, description = created[name]
+            broadcast_id = response["id"]
+            reports[name] = {"ok": True, self.CONF_BROADCAST_ID: broadcast_id}
+            events.append(
+                (
+                    "created",
+                    name,
+                    broadcast_id,
+                    {"title": title, "description": description},
+                )
+            )
+            follow_ups.append(
+                (
+                    f"{name}:bind",
+                    self.youtube.liveBroadcasts().bind(
+                        part="id,contentDetails",
+                        id=broadcast_id,
+                        streamId=settings[self.CONF_STREAM_ID],
+                    ),
+                )
+            )
+            follow_ups.append(
+                (
+                    f"{name}:metadata",
+                    self.youtube.videos().update(
+                        part="snippet",
+                        body=self._video_metadata_body(
+                            broadcast_id, settings, title, description
+                        ),
+                    ),
+                )
+            )
+        self.state.append_many(events)
+
+        events = []
+        for request_id, (response, exception) in self._execute_batched(
+            follow_ups
+        ).items():
+            name, step = request_id.rsplit(":", 1)
+            if exception is not None:
+                self.logger.error(
+                    "Failed to %s broadcast of `%s`: %s", step, name, exception
+                )
+                reports[name]["ok"] = False
+                reports[name]["error"] = f"{step}: {exception}"
+            else:
+                events.append(
+                    (
+                        "bound" if step == "bind" else step,
+                        name,
+                        reports[name][self.CONF_BROADCAST_ID],
+                        {},
+                    )
+                )
+        self.state.append_many(events)
+
+        for name, report in reports.items():
+            if report["ok"]:
+                self.logger.info(
+                    "Broadcast `%s` of `%s` was started successfully",
+                    report[self.CONF_BROADCAST_ID],
+                    name,
+                )
+        # every broadcast of the fleet is ready only once the whole batch is
+        for report in reports.values():
+            self._record_broadcast_action("start", report["ok"], time.perf_counter() - start)
+        self._notify_reports("Started", reports)
+        return reports
+
+    def stop_broadcasts(self, names):
+        """Complete the current broadcast of each of the named streams in one batch."""
+        if self._authenticate() is None:
+            self.logger.info("Authentication failed")
+            return None
+        start = time.perf_counter()
+        names = list(dict.fromkeys(names))  # a batch takes every request id once
+        reports = {}
+        transitions = []
+        for name in names:
+            try:
+                broadcast_id = self._fleet_stream_settings(name)[self.CONF_BROADCAST_ID]
+            except KeyError as e:
+                reports[name] = {"ok": False, "error": e.args[0]}
+                continue
+            if broadcast_id is None:
+                reports[name] = {"ok": False, "error": "No broadcast was started"}
+                continue
+            reports[name] = {"ok": True, self.CONF_BROADCAST_ID: broadcast_id}
+            transitions.append(
+                (
+                    name,
+                    self.youtube.liveBroadcasts().transition(
+                        part="status", broadcastStatus="complete", id=broadcast_id
+                    ),
+                )
+            )
+        events = []
+        for name, (response, exception) in self._execute_batched(transitions).items():
+            if exception is not None:
+                self.logger.error(
+                    "Failed to stop broadcast of `%s`: %s", name, exception
+                )
+                reports[name]["ok"] = False
+                reports[name]["error"] = str(exception)
+            else:
+                events.append(
+                    ("complete", name, reports[name][self.CONF_BROADCAST_ID], {})
+                )
+                self.logger.info(
+                    "Broadcast `%s` of `%s` was stopped successfully",
+                    reports[name][self.CONF_BROADCAST_ID],
+                    name,
+                )
+        self.state.append_many(events)
+        for report in reports.values():
+            self._record_broadcast_action("stop", report["ok"], time.perf_counter() - start)
+        self._notify_reports("Stopped", reports)
+        return reports
+
+    def _record_broadcast_action(self, action, ok, duration):
+        """Count a started or stopped broadcast (`action`) and observe how long it took."""
+        self.metrics.broadcasts.labels(action, "ok" if ok else "failed").inc()
+        self.metrics.broadcast_duration.labels(action).observe(duration)
+
+    def _notify_reports(self, action, reports):
+        failed = {name: report for name, report in reports.items() if not report["ok"]}
+        self.notifier.notify(
+            f"{action} the broadcasts of {len(reports) - len(failed)} of {len(reports)} streams",
+            "\n".join(f"`{name}` failed: {report['error']}" for name, report in failed.items()),
+        )
+
+    def status(self):
+        """Return the configured stream and broadcast together with their current state."""
+        if self._authenticate() is None:
+            self.logger.info("Authentication failed")
+            return None
+        stream_settings = self.config[self.CONF_STREAM_SETTINGS]
+        status = {
+            self.CONF_STREAM_ID: stream_settings[self.CONF_STREAM_ID],
+            self.CONF_BROADCAST_ID: self._current_broadcast_id(),
+            "stream_status": None,
+            "broadcast_status": None,
+            "broadcasts_created_today": [
+                broadcast["broadcast_id"]
+                for broadcast in self.state.created_on(
+                    datetime.datetime.now(ZoneInfo(stream_settings[self.CONF_TIMEZONE])).date(),
+                    ZoneInfo(stream_settings[self.CONF_TIMEZONE]),
+                )
+            ],
+            "pool": [
+                broadcast["broadcast_id"]
+                for broadcast in self.state.pool(self.CONF_STREAM_SETTINGS)
+                if broadcast["status"] == "pooled"
+            ],
+            "encoder": self.encoder.snapshot() if self.encoder is not None else None,
+        }
+        try:
+            if status[self.CONF_STREAM_ID] is not None:
+                status["stream_status"] = self._check_stream_health()
+            if status[self.CONF_BROADCAST_ID] is not None:
+                self.broadcast_id = status[self.CONF_BROADCAST_ID]
+                status["broadcast_status"] = self._check_broadcast_status()
+        except Exception as e:
+            self.logger.error("Failed to query status: %s", e)
+            return None
+        return status
+
+    def _monitor_targets(self):
+        """Return `{name: (stream_id, broadcast_id)}` for every configured stream."""
+        targets = {}
+        stream_settings = self.config[self.CONF_STREAM_SETTINGS]
+        if stream_settings[self.CONF_STREAM_ID] is not None:
+            targets[self.CONF_STREAM_SETTINGS] = (
+                stream_settings[self.CONF_STREAM_ID],
+                self._current_broadcast_id(),
+            )
+        for name in self.stream_names():
+            settings = self._fleet_stream_settings(name)
+            targets[name] = (
+                settings[self.CONF_STREAM_ID],
+                settings[self.CONF_BROADCAST_ID],
+            )
+        return targets
+
+    def _list_by_ids(self, resource, part, ids, priority=None):
+        """Fetch items with as few `list` calls as possible, returns `{id: item}`."""
+        ids = sorted(set(ids))
+        items = {}
+        for i in range(0, len(ids), self.MAX_LIST_IDS):
+            chunk = ids[i : i + self.MAX_LIST_IDS]
+            response = self._execute(
+                resource.list(
+                    part=part, id=",".join(chunk), maxResults=self.MAX_LIST_IDS
+                ),
+                priority=priority,
+            )
+            for item in response.get("items", []):
+                items[item["id"]] = item
+        return items
+
+    def poll_health(self):
+        """Return the health of all configured streams and their broadcasts.
+
+        Costs one `liveStreams.list` and one `liveBroadcasts.list` call per 50
+        ids, no matter how many streams are configured.
+        """
+        targets = self._monitor_targets()
+        streams = self._list_by_ids(
+            self.youtube.liveStreams(),
+            "id,status",
+            [stream_id for stream_id, _ in targets.values()],
+            QuotaLedger.PRIORITY_LOW,
+        )
+        broadcasts = self._list_by_ids(
+            self.youtube.liveBroadcasts(),
+            "id,status",
+            [broadcast_id for _, broadcast_id in targets.values() if broadcast_id],
+            QuotaLedger.PRIORITY_LOW,
+        )
+
+        report = {}
+        for name, (stream_id, broadcast_id) in targets.items():
+            stream_status = streams.get(stream_id, {}).get("status", {})
+            health = stream_status.get("healthStatus", {})
+            broadcast = broadcasts.get(broadcast_id, {})
+            report[name] = {
+                self.CONF_STREAM_ID: stream_id,
+                "stream_status": stream_status.get("streamStatus"),
+                "health_status": health.get("status"),
+                "configuration_issues": [
+                    {
+                        "type": issue.get("type"),
+                        "severity": issue.get("severity"),
+                        "reason": issue.get("reason"),
+                    }
+                    for issue in health.get("configurationIssues", [])
+                ],
+                self.CONF_BROADCAST_ID: broadcast_id,
+                "broadcast_status": broadcast.get("status", {}).get("lifeCycleStatus"),
+                # the local encoder pushes to the stream of `stream_settings`
+                "encoder_status": self.encoder.snapshot()["status"]
+                if self.encoder is not None and name == self.CONF_STREAM_SETTINGS
+                else None,
+            }
+            self.metrics.record_health(
+                name, report[name]["health_status"], self._is_steady(report[name])
+            )
+        return report
+
+    def _is_steady(self, health):
+        return (
+            health["stream_status"] in self.STEADY_STREAM_STATUS
+            and health["health_status"] in self.STEADY_HEALTH_STATUS
+            and health["broadcast_status"] in self.STEADY_BROADCAST_STATUS
+            and health["encoder_status"] in self.STEADY_ENCODER_STATUS
+        )
+
+    def _encoder_summary(self, health):
+        """Describe the encoder and what its state means for the stream on YouTube."""
+        encoder = self.encoder.snapshot()
+        summary = f", encoder {encoder['status']}"
+        if encoder["status"] == "running":
+            summary += (
+                f" ({encoder.get('fps')} fps, {encoder.get('bitrate_kbps')} kbit/s, "
+                f"{encoder.get('dropped_frames')} dropped)"
+            )
+        encoder_ok = encoder["status"] in self.STEADY_ENCODER_STATUS
+        stream_ok = health["stream_status"] in self.STEADY_STREAM_STATUS
+        if encoder_ok and not stream_ok:
+            summary += " - the encoder is sending but YouTube receives nothing, check the network and the stream key"
+        elif not encoder_ok and stream_ok:
+            summary += " - YouTube has not noticed yet, the stream is about to go inactive"
+        return summary
+
+    def monitor(
+        self,
+        fast_interval=MONITOR_FAST_INTERVAL,
+        slow_interval=MONITOR_SLOW_INTERVAL,
+        count=None,
+        fast_window=MONITOR_FAST_WINDOW,
+    ):
+        """Poll the health of all configured streams until interrupted.
+
+        Polls every `fast_interval` seconds while any stream or broadcast is not
+        in a steady state (stream `active` with good health, broadcast `live`)
+        and every `slow_interval` seconds otherwise. Fast polls only last for
+        `fast_window` seconds after the last change, so a stream that stays
+        idle or unhealthy is polled slowly again. Changes are logged as they
+        are detected. Stops after `count` polls if given.
+        """
+        if self._authenticate() is None:
+            self.logger.info("Authentication failed")
+            return None
+        if not self._monitor_targets():
+            self.logger.error(
+                "No `%s` is configured under `%s` or `%s`",
+                self.CONF_STREAM_ID,
+                self.CONF_STREAM_SETTINGS,
+                self.CONF_STREAMS,
+            )
+            return None
+        self.start_encoder()
+        self.watch_config()
+        self.serve_metrics()
+        history = self._open_health_history()
+
+        last_report = {}
+        changed_at = time.monotonic()
+        polls = 0
+
+        def next_interval(steady):
+            if steady or time.monotonic() - changed_at > fast_window:
+                return slow_interval
+            return fast_interval
+
+        try:
+            while count is None or polls < count:
+                polls += 1
+                if self.encoder is not None:
+                    self.encoder.changed.clear()
+                try:
+                    report = self.poll_health()
+                except QuotaBudgetExceeded as e:
+                    self.logger.warning("Skipping health poll: %s", e)
+                    time.sleep(slow_interval)
+                    continue
+                except Exception as e:
+                    self.logger.error("Failed to poll stream health: %s", e)
+                    time.sleep(next_interval(False))
+                    continue
+                if history is not None:
+                    history.append(report.items())
+
+                for name, health in report.items():
+                    if health == last_report.get(name):
+                        continue
+                    changed_at = time.monotonic()
+                    steady = self._is_steady(health)
+                    summary = f"stream {health['stream_status']} ({health['health_status']}), broadcast {health['broadcast_status']}"
+                    if health["encoder_status"] is not None:
+                        summary += self._encoder_summary(health)
+                    if name not in last_report:
+                        if not steady:
+                            self.notifier.notify(f"`{name}` is not healthy", summary)
+                    elif steady != self._is_steady(last_report[name]):
+                        # during a flap storm the digest collects these into one mail
+                        self.notifier.notify(
+                            f"`{name}` is {'healthy again' if steady else 'not healthy'}",
+                            summary,
+                        )
+                    log = self.logger.info if steady else self.logger.warning
+                    log("`%s`: %s", name, summary)
+                    for issue in health["configuration_issues"]:
+                        log(
+                            "`%s`: %s configuration issue `%s`: %s",
+                            name,
+                            issue["severity"],
+                            issue["type"],
+                            issue["reason"],
+                        )
+                last_report = report
+
+                if count is not None and polls >= count:
+                    break
+                steady = all(self._is_steady(health) for health in report.values())
+                interval = next_interval(steady)
+                self.logger.debug("Next health poll in %ss", interval)
+                if self.encoder is not None:
+                    # a change of the encoder is checked with YouTube right away
+                    if self.encoder.changed.wait(interval):
+                        changed_at = time.monotonic()
+                else:
+                    time.sleep(interval)
+        except KeyboardInterrupt:
+            self.logger.info("Monitoring stopped")
+        finally:
+            if history is not None:
+                history.close()
+        return last_report
+
+    def _open_health_history(self):
+        size = self.config[self.CONF_HEALTH_HISTORY_SIZE]
+        if not size:
+            return None
+        return HealthHistory(
+            os.path.join(os.path.dirname(__file__), self.HEALTH_HISTORY_FILE),
+            size,
+            self.logger,
+        )
+
+    def health_history(self, days=1, stream=None):
+        """Return uptime and outages of the monitored streams over the last `days`.
+
+        Computed from the samples `monitor` records in the health history. A
+        stream is up while it is `active` with good health. Returns `None` if
+        the history is disabled.
+        """
+        history = self._open_health_history()
+        if history is None:
+            self.logger.error(
+                "The health history is disabled (`%s` is 0)",
+                self.CONF_HEALTH_HISTORY_SIZE,
+            )
+            return None
+        timezone = ZoneInfo(self.config[self.CONF_STREAM_SETTINGS][self.CONF_TIMEZONE])
+        try:
+            summary = history.summarize(
+                time.time() - days * 24 * 60 * 60, self.HEALTH_HISTORY_MAX_GAP, stream
+            )
+        finally:
+            history.close()
+
+        def local(timestamp):
+            return datetime.datetime.fromtimestamp(timestamp, timezone).isoformat(
+                timespec="seconds"
+            )
+
+        for report in summary.values():
+            report["first_sample"] = local(report["first_sample"])
+            report["last_sample"] = local(report["last_sample"])
+            for outage in report["outages"]:
+                outage["start"] = local(outage["start"])
+                outage["end"] = local(outage["end"])
+        return summary
+
+    def run_schedule(self, count=None):
+        """Roll the broadcast over to a new one at every day part boundary.
+
+        `rollover_lead` seconds before a boundary the next broadcast is
+        prepared like a pooled one (created, bound, updated), so at the
+        boundary it only has to be claimed and advanced to live while the
+        stream keeps running. The outgoing broadcast is completed once the
+        incoming one is live, so no footage is lost in between. Every round
+        compares the current broadcast with the day part of now, so
+        boundaries missed while the program was down result in one rollover
+        to the current day part, and an interrupted rollover is resumed. A
+        failed rollover is retried with a growing delay, after
+        `ROLLOVER_ATTEMPTS` failures the day part is given up and the next one
+        is waited for. Stops after `count` successful rollovers if given.
+        """
+        if self._authenticate() is None:
+            self.logger.info("Authentication failed")
+            return None
+        stream_settings = self.config[self.CONF_STREAM_SETTINGS]
+        if stream_settings[self.CONF_STREAM_ID] is None:
+            self.logger.error(
+                "No `%s` is provided under `%s`",
+                self.CONF_STREAM_ID,
+                self.CONF_STREAM_SETTINGS,
+            )
+            return None
+        with open(self.state.filename + ".schedule.lock", "a") as lock_file:
+            try:
+                fcntl.flock(lock_file, fcntl.LOCK_EX | fcntl.LOCK_NB)
+            except BlockingIOError:
+                self.logger.error("Another scheduler is already running")
+                return None
+            self.start_encoder()
+            self.watch_config()
+            self.serve_metrics()
+            rollovers = 0
+            failures = 0  # of the rollover to the current day part
+            try:
+                while count is None or rollovers < count:
+                    # re-read every round, the config may have been reloaded
+                    stream_settings = self.config[self.CONF_STREAM_SETTINGS]
+                    _, _, end = self._day_part(stream_settings)
+                    if not self._is_current_day_part():
+                        if self._roll_over():
+                            rollovers += 1
+                            failures = 0
+                            continue
+                        failures += 1
+                        if failures < self.ROLLOVER_ATTEMPTS:
+                            delay = self.ROLLOVER_RETRY_DELAY * 2 ** (failures - 1)
+                            self._sleep_until(
+                                min(
+                                    end,
+                                    datetime.datetime.now(end.tzinfo)
+                                    + datetime.timedelta(seconds=delay),
+                                )
+                            )
+                            continue
+                        self.logger.error(
+                            "Rollover failed %s times, waiting for the day part starting %s",
+                            failures,
+                            end.strftime("%H:%M"),
+                        )
+                        self.notifier.notify(
+                            "Rollover failed",
+                            f"The broadcast did not go live after {failures} attempts",
+                        )
+                        failures = 0
+                        self._sleep_until(end)
+                        continue
+                    lead = stream_settings[self.CONF_ROLLOVER_LEAD]
+                    self._sleep_until(end - datetime.timedelta(seconds=lead))
+                    if end > datetime.datetime.now(end.tzinfo):
+                        self.fill_pool(max(1, stream_settings[self.CONF_POOL_SIZE]))
+                    self._sleep_until(end)
+            except KeyboardInterrupt:
+                self.logger.info("Scheduler stopped")
+            return rollovers
+
+    def _sleep_until(self, moment):
+        while True:
+            remaining = (moment - datetime.datetime.now(moment.tzinfo)).total_seconds()
+            if remaining <= 0:
+                return
+            # short steps, so suspending the machine does not delay the boundary
+            time.sleep(min(remaining, self.MONITOR_SLOW_INTERVAL))
+
+    def _is_current_day_part(self):
+        """Return `True` if the current broadcast belongs to the day part of now and is live."""
+        broadcast = self.state.current(self.CONF_STREAM_SETTINGS)
+        if broadcast is None or broadcast["status"] != "live":
+            return False
+        title, _, _ = self._live_broadcast_insert_body(
+            self.config[self.CONF_STREAM_SETTINGS]
+        )
+        return broadcast["title"] == title
+
+    def _roll_over(self):
+        """Start the broadcast of the current day part and complete the others."""
+        broadcast = self.state.current(self.CONF_STREAM_SETTINGS)
+        title, _, _ = self._live_broadcast_insert_body(
+            self.config[self.CONF_STREAM_SETTINGS]
+        )
+        if (
+            broadcast is not None
+            and broadcast["title"] == title
+            and broadcast["status"] in ["created", "live"]
+        ):
+            # started by an interrupted rollover or `start_broadcast`
+            self.broadcast_id = broadcast["broadcast_id"]
+        else:
+            self.logger.info("Rolling over to `%s`", title)
+            if self.start_broadcast() is None:
+                return False
+        if self.advance_to_live() != "live":
+            # the outgoing broadcast stays live, nothing is lost
+            return False
+        for outgoing in self.state.open_broadcasts(self.CONF_STREAM_SETTINGS):
+            if outgoing["broadcast_id"] != self.broadcast_id:
+                self._complete_broadcast(outgoing["broadcast_id"])
+        return True
+
+    def _complete_broadcast(self, broadcast_id):
+        from googleapiclient.errors import HttpError
+
+        try:
+            self._execute(
+                self.youtube.liveBroadcasts().transition(
+                    part="status", broadcastStatus="complete", id=broadcast_id
+                )
+            )
+        except HttpError as e:
+            # never went live or completed in the meantime, it is done either way
+            if self._http_error_reason(e) not in self.BENIGN_TRANSITION_REASONS:
+                self.logger.error(
+                    "Failed to complete broadcast `%s`: %s", broadcast_id, e
+                )
+                return
+        self.state.append("complete", self.CONF_STREAM_SETTINGS, broadcast_id)
+        self.logger.info("Broadcast `%s` was completed", broadcast_id)
+
+    def reconcile(self, dry_run=False, min_age=RECONCILE_MIN_AGE):
+        """Clean up broadcasts on the channel that nothing tracks anymore.
+
+        Walks every broadcast of the channel page by page and compares it with
+        the journal. Only broadcasts this tool created are touched: those in
+        the journal, and those bound to one of the configured streams with a
+        title exactly like the generated "<title> DD.MM.YYYY (n)", in case the
+        journal lost them. Such a broadcast that is neither current, pooled
+        nor live in the journal is an orphan, left behind by an interrupted
+        start or an overwritten `broadcast_id`. Upcoming orphans are deleted and streaming
+        ones are completed, so their video is kept. Only the few orphans are
+        kept in memory, the clean ups go out in concurrent HTTP batches.
+        Broadcasts younger than `min_age` seconds are left alone, another
+        process may be starting them. Journal entries are brought in line with
+        the channel as well. Returns a report or `None` if authentication failed.
+        """
+        if self._authenticate() is None:
+            self.logger.info("Authentication failed")
+            return None
+        targets = self._monitor_targets()
+        stream_ids = {stream_id for stream_id, _ in targets.values()}
+        titles = {self.config[self.CONF_STREAM_SETTINGS][self.CONF_TITLE]} | {
+            self._fleet_stream_settings(name)[self.CONF_TITLE]
+            for name in self.stream_names()
+        }
+        # exactly the titles `_live_broadcast_insert_body` generates
+        generated_title = re.compile(
+            r"(?:%s) \d{2}\.\d{2}\.\d{4} \(\d+\)"
+            % "|".join(re.escape(title) for title in sorted(titles))
+        )
+        journaled = self.state.broadcast_ids()
+        tracked = {
+            state["broadcast_id"]: state
+            for state in self.state.with_status(["pooled", "created", "live"])
+        }
+        # pooled broadcasts and the outgoing one of a rollover are not current
+        known = {broadcast_id for _, broadcast_id in targets.values() if broadcast_id}
+        known.update(
+            broadcast_id
+            for broadcast_id, state in tracked.items()
+            if state["status"] in ["pooled", "live"]
+        )
+        unseen = set(tracked)
+        cutoff = time.time() - min_age
+        report = {
+            "dry_run": dry_run,
+            "listed": 0,
+            "deleted": [],
+            "completed": [],
+            "failed": {},
+            "journal_updates": 0,
+            "complete_walk": False,
+        }
+
+        events = []
+        orphans = []
+        self.logger.info("Reconciling the broadcasts of the channel..")
+        try:
+            for broadcast in self._list_broadcasts(
+                "id,snippet,status,contentDetails", self.RECONCILE_FIELDS, mine=True
+            ):
+                report["listed"] += 1
+                broadcast_id = broadcast["id"]
+                unseen.discard(broadcast_id)
+                status = broadcast["status"]["lifeCycleStatus"]
+                state = tracked.get(broadcast_id)
+                if self._is_orphan(
+                    broadcast, known, journaled, stream_ids, generated_title, cutoff
+                ):
+                    orphans.append((broadcast_id, status, state))
+                elif state is not None:
+                    event = self._reconciled_event(state, status)
+                    if event is not None:
+                        events.append((event, state["stream"], broadcast_id, {}))
+            report["complete_walk"] = True
+        except Exception as e:
+            self.logger.error("Stopped listing the broadcasts of the channel: %s", e)
+
+        # cleaned up only after the walk, deleting shifts the pages still to be listed
+        step = self.BATCH_SIZE * self.BATCH_WORKERS
+        for i in range(0, len(orphans), step):
+            try:
+                results = self._clean_orphans(orphans[i : i + step], dry_run)
+            except QuotaBudgetExceeded as e:
+                self.logger.warning("Stopped cleaning up orphaned broadcasts: %s", e)
+                break
+            for broadcast_id, action, error in results:
+                if error is not None:
+                    report["failed"][broadcast_id] = error
+                else:
+                    report[action].append(broadcast_id)
+
+        if report["complete_walk"]:
+            # gone from the channel, deleted in YouTube Studio for example
+            for broadcast_id in unseen:
+                state = tracked[broadcast_id]
+                if (state["created"] or state.get("pooled") or 0) < cutoff:
+                    events.append(("deleted", state["stream"], broadcast_id, {}))
+        report["journal_updates"] = len(events)
+        if not dry_run:
+            self.state.append_many(events)
+
+        cleaned = len(report["deleted"]) + len(report["completed"])
+        self.logger.info(
+            "Listed %s broadcasts, "
+            "%s %s orphans, "
+            "%s failed, %s journal updates",
+            report["listed"],
+            "found" if dry_run else "cleaned up",
+            cleaned,
+            len(report["failed"]),
+            len(events),
+        )
+        if cleaned and not dry_run:
+            self.notifier.notify(
+                f"Cleaned up {cleaned} orphaned broadcasts",
+                "\n".join(
+                    [f"Deleted `{broadcast_id}`" for broadcast_id in report["deleted"]]
+                    + [f"Completed `{broadcast_id}`" for broadcast_id in report["completed"]]
+                ),
+            )
+        return report
+
+    def _list_broadcasts(self, part, fields, **filters):
+        """Yield the broadcasts matching `filters`, fetching one page at a time.
+
+        Only `fields` of every broadcast are requested, so walking a channel
+        with thousands of past broadcasts keeps the responses small and never
+        holds more than one page.
+        """
+        page_token = None
+        while True:
+            response = self._execute(
+                self.youtube.liveBroadcasts().list(
+                    part=part,
+                    fields=f"nextPageToken,items({fields})",
+                    maxResults=self.MAX_LIST_IDS,
+                    pageToken=page_token,
+                    **filters,
+                ),
+                priority=QuotaLedger.PRIORITY_LOW,
+                cache=False,  # one-off pages would only evict the monitoring responses
+            )
+            yield from response.get("items", [])
+            page_token = response.get("nextPageToken")
+            if not page_token:
+                return
+
+    def _is_orphan(
+        self, broadcast, known, journaled, stream_ids, generated_title, cutoff
+    ):
+        if (
+            broadcast["id"] in known
+            or broadcast["status"]["lifeCycleStatus"]
+            not in self.ORPHAN_DELETE_STATUS + self.ORPHAN_COMPLETE_STATUS
+        ):
+            return False
+        snippet = broadcast.get("snippet", {})
+        if broadcast["id"] not in journaled and (
+            broadcast.get("contentDetails", {}).get("boundStreamId") not in stream_ids
+            or generated_title.fullmatch(snippet.get("title", "")) is None
+        ):
+            return False  # scheduled in YouTube Studio or by another program
+        published = snippet.get("publishedAt")
+        return (
+            published is not None
+            and datetime.datetime.fromisoformat(published).timestamp() < cutoff
+        )
+
+    def _reconciled_event(self, state, life_cycle_status):
+        """Return the event that brings a tracked broadcast in line with the channel."""
+        if state["status"] == "pooled":
+            return None if life_cycle_status in self.ORPHAN_DELETE_STATUS else "stale"
+        if life_cycle_status in self.FINAL_STATUS:
+            return "complete"
+        if state["status"] == "created" and life_cycle_status == "live":
+            return "live"
+        return None
+
+    def _clean_orphans(self, orphans, dry_run):
+        """Delete or complete `(broadcast_id, lifeCycleStatus, state)` orphans.
+
+        Returns `(broadcast_id, action, error)` tuples, `action` is the report
+        key `deleted` or `completed`. Raises `QuotaBudgetExceeded` instead of
+        spending more than the low priority share of the budget.
+        """
+        actions = {}
+        requests = []
+        for broadcast_id, status, _ in orphans:
+            if status in self.ORPHAN_DELETE_STATUS:
+                actions[broadcast_id] = "deleted"
+                request = self.youtube.liveBroadcasts().delete(id=broadcast_id)
+            else:
+                actions[broadcast_id] = "completed"
+                request = self.youtube.liveBroadcasts().transition(
+                    part="status", broadcastStatus="complete", id=broadcast_id
+                )
+            requests.append((broadcast_id, request))
+        if dry_run:
+            return [(broadcast_id, action, None) for broadcast_id, action in actions.items()]
+        self.quota.check(
+            f"{len(requests)} orphan clean ups",
+            sum(self.quota.cost(request.methodId) for _, request in requests),
+            QuotaLedger.PRIORITY_LOW,
+        )
+
+        results = []
+        events = []
+        responses = self._execute_batched(requests)
+        for broadcast_id, status, state in orphans:
+            action = actions[broadcast_id]
+            error = responses[broadcast_id][1]
+            # deleted or completed in the meantime, it is gone either way
+            if error is not None and self._http_error_reason(error) not in [
+                "liveBroadcastNotFound",
+                *self.BENIGN_TRANSITION_REASONS,
+            ]:
+                self.logger.error(
+                    "Failed to clean up orphaned broadcast `%s`: %s",
+                    broadcast_id,
+                    error,
+                )
+                results.append((broadcast_id, action, str(error)))
+                continue
+            self.logger.info(
+                "%s orphaned broadcast `%s` (%s)",
+                action.capitalize(),
+                broadcast_id,
+                status,
+            )
+            results.append((broadcast_id, action, None))
+            if state is not None:
+                event = "deleted" if action == "deleted" else "complete"
+                events.append((event, state["stream"], broadcast_id, {}))
+        self.state.append_many(events)
+        return results
+
+    def update_metadata(self, since=None, until=None, title=None, dry_run=False):
+        """Apply the configured description, tags and category to past videos.
+
+        Selects the completed broadcasts (their video has the same id) that
+        started between the dates `since` and `until` (inclusive, in the
+        configured timezone) and whose title matches the regular expression
+        `title`. Their snippets are fetched with one `videos.list` call per
+        `MAX_LIST_IDS` videos and compared with the settings of the stream
+        they were bound to, so only videos that differ cost an update. Videos
+        not bound to one of the configured streams are skipped and reported,
+        the settings of no stream are known to apply to them. Titles
+        are left alone and the date line `start_broadcast` appended to the
+        description is kept. The updates go out in concurrent HTTP batches at
+        low priority, shrunk to the quota that is left. The ids done are
+        written to the progress file after every chunk, so a run stopped by
+        the quota or interrupted resumes when started again with the same
+        selection and config. Returns a report or `None` on failure.
+        """
+        if self._authenticate() is None:
+            self.logger.info("Authentication failed")
+            return None
+        stream_settings = self.config[self.CONF_STREAM_SETTINGS]
+        timezone = ZoneInfo(stream_settings[self.CONF_TIMEZONE])
+        try:
+            pattern = re.compile(title) if title is not None else None
+            first_day = datetime.date.fromisoformat(since) if since is not None else None
+            last_day = datetime.date.fromisoformat(until) if until is not None else None
+        except (re.error, ValueError) as e:
+            self.logger.error("Invalid selection: %s", e)
+            return None
+        settings = {}  # by bound stream id
+        if stream_settings[self.CONF_STREAM_ID] is not None:
+            settings[stream_settings[self.CONF_STREAM_ID]] = stream_settings
+        for name in self.stream_names():
+            fleet_settings = self._fleet_stream_settings(name)
+            settings[fleet_settings[self.CONF_STREAM_ID]] = fleet_settings
+        selection = json.dumps(
+            [
+                since,
+                until,
+                title,
+                sorted(
+                    [
+                        stream_id,
+                        value[self.CONF_DESCRIPTION],
+                        value[self.CONF_TAGS],
+                        str(value[self.CONF_CATEGORY]),
+                    ]
+                    for stream_id, value in settings.items()
+                ),
+            ]
+        )
+        report = {
+            "dry_run": dry_run,
+            "selected": 0,
+            "resumed": 0,
+            "unchanged": 0,
+            "skipped": [],
+            "updated": [],
+            "failed": {},
+            "complete": False,
+        }
+
+        with open(self.state.filename + ".metadata.lock", "a") as lock_file:
+            try:
+                fcntl.flock(lock_file, fcntl.LOCK_EX | fcntl.LOCK_NB)
+            except BlockingIOError:
+                self.logger.error("Another metadata update is already running")
+                return None
+            done = set() if dry_run else self._read_metadata_progress(selection)
+            selected = {}  # video id -> bound stream id
+            self.logger.info("Selecting the videos to update..")
+            try:
+                for broadcast in self._list_broadcasts(
+                    "id,snippet,contentDetails",
+                    self.METADATA_FIELDS,
+                    broadcastStatus="completed",
+                ):
+                    snippet = broadcast["snippet"]
+                    started = (
+                        snippet.get("actualStartTime")
+                        or snippet.get("scheduledStartTime")
+                        or snippet.get("publishedAt")
+                    )
+                    day = (
+                        datetime.datetime.fromisoformat(started.replace("Z", "+00:00"))
+                        .astimezone(timezone)
+                        .date()
+                    )
+                    if (
+                        (first_day is not None and day < first_day)
+                        or (last_day is not None and day > last_day)
+                        or (pattern is not None and not pattern.search(snippet["title"]))
+                    ):
+                        continue
+                    report["selected"] += 1
+                    if broadcast["id"] in done:
+                        report["resumed"] += 1
+                        continue
+                    stream_id = broadcast.get("contentDetails", {}).get("boundStreamId")
+                    if stream_id in settings:
+                        selected[broadcast["id"]] = stream_id
+                    else:
+                        report["skipped"].append(broadcast["id"])
+            except Exception as e:
+                self.logger.error("Failed to list the past broadcasts: %s", e)
+                return None
+
+            ids = sorted(selected)
+            step = self.BATCH_SIZE * self.BATCH_WORKERS
+            try:
+                for i in range(0, len(ids), step):
+                    snippets = self._list_by_ids(
+                        self.youtube.videos(),
+                        "snippet",
+                        ids[i : i + step],
+                        priority=QuotaLedger.PRIORITY_LOW,
+                    )
+                    updates = []
+                    for video_id, video in snippets.items():
+                        body = self._metadata_update_body(
+                            video, settings[selected[video_id]]
+                        )
+                        if body is None:
+                            report["unchanged"] += 1
+                            done.add(video_id)
+                        else:
+                            updates.append((video_id, body))
+                    if dry_run:
+                        report["updated"] += [video_id for video_id, _ in updates]
+                        continue
+                    try:
+                        self._write_metadata_updates(updates, report, done)
+                    finally:
+                        self._write_metadata_progress(selection, done)
+                report["complete"] = True
+            except QuotaBudgetExceeded as e:
+                self.logger.warning(
+                    "Stopped updating metadata, run it again to resume: %s", e
+                )
+            except Exception as e:
+                self.logger.error("Stopped updating metadata: %s", e)
+            if report["complete"] and not report["failed"] and not dry_run:
+                self._write_metadata_progress(None, done)
+
+        self.logger.info(
+            "Selected %s videos, "
+            "%s %s, "
+            "%s unchanged, %s done before, "
+            "%s skipped (not bound to a configured stream), "
+            "%s failed",
+            report["selected"],
+            "would update" if dry_run else "updated",
+            len(report["updated"]),
+            report["unchanged"],
+            report["resumed"],
+            len(report["skipped"]),
+            len(report["failed"]),
+        )
+        return report
+
+    def _metadata_update_body(self, video, stream_settings):
+        """Return the `videos.update` body that applies the config, `None` if nothing differs."""
+        snippet = video["snippet"]
+        # `videos.update` replaces the snippet, the writable fields are sent unchanged
+        body = {key: snippet[key] for key in self.METADATA_SNIPPET_KEYS if key in snippet}
+        description = stream_settings[self.CONF_DESCRIPTION]
+        date = snippet.get("description", "").rsplit("\n", 1)[-1]
+        if re.fullmatch(r"\d{2}\.\d{2}\.\d{4}", date):
+            description += "\n" + date
+        body["description"] = description
+        body["tags"] = list(stream_settings[self.CONF_TAGS])
+        body["categoryId"] = str(stream_settings[self.CONF_CATEGORY])
+        if (
+            snippet.get("description", "") == body["description"]
+            and snippet.get("tags", []) == body["tags"]
+            and snippet.get("categoryId") == body["categoryId"]
+        ):
+            return None
+        return {"id": video["id"], "snippet": body}
+
+    def _write_metadata_updates(self, updates, report, done):
+        """Send `(video_id, body)` updates, as many as the low priority quota allows.
+
+        Raises `QuotaBudgetExceeded` after sending what fits if not all of them do.
+        """
+        cost = self.quota.cost("youtube.videos.update")
+        usage = self.quota.usage()
+        affordable = max(0, int((usage["low_priority_limit"] - usage["units"]) // cost))
+        sent = updates[:affordable]
+        if sent:
+            self.quota.check(
+                f"{len(sent)} metadata updates", cost * len(sent), QuotaLedger.PRIORITY_LOW
+            )
+            responses = self._execute_batched(
+                [
+                    (video_id, self.youtube.videos().update(part="snippet", body=body))
+                    for video_id, body in sent
+                ]
+            )
+            for video_id, _ in sent:
+                error = responses[video_id][1]
+                if error is not None:
+                    self.logger.error(
+                        "Failed to update the metadata of `%s`: %s", video_id, error
+                    )
+                    report["failed"][video_id] = str(error)
+                    continue
+                report["updated"].append(video_id)
+                done.add(video_id)
+        if len(sent) < len(updates):
+            raise QuotaBudgetExceeded(
+                f"{len(updates) - len(sent)} metadata updates left over, low priority calls are limited to {usage['low_priority_limit']:.0f} units"
+            )
+
+    def _metadata_progress_filename(self):
+        return os.path.join(os.path.dirname(__file__), self.METADATA_PROGRESS_FILE)
+
+    def _read_metadata_progress(self, selection):
+        """Return the ids done by an earlier run of the same `selection`."""
+        try:
+            with open(self._metadata_progress_filename(), "r") as f:
+                progress = json.load(f)
+        except FileNotFoundError:
+            return set()
+        except (OSError, ValueError) as e:
+            self.logger.warning("Ignoring the unreadable metadata progress: %s", e)
+            return set()
+        if progress.get("selection") != selection:
+            # another selection or config, every video has to be compared again
+            return set()
+        return set(progress["done"])
+
+    def _write_metadata_progress(self, selection, done):
+        """Record the ids done for `selection`, or remove the progress if it is `None`."""
+        filename = self._metadata_progress_filename()
+        try:
+            if selection is None:
+                with contextlib.suppress(FileNotFoundError):
+                    os.unlink(filename)
+                return
+            tmp_filename = filename + ".tmp"
+            with open(tmp_filename, "w") as f:
+                json.dump({"selection": selection, "done": sorted(done)}, f)
+            os.replace(tmp_filename, filename)
+        except OSError as e:
+            self.logger.error(
+                "Failed to write the metadata progress `%s`: %s", filename, e
+            )
+
+    def quota_usage(self):
+        """Return today's quota usage as recorded in the ledger."""
+        return self.quota.usage()
+
+    def handle_command(self, command, arguments):
+        """Run one control socket command and return its result (`None` on failure)."""
+        fleet = arguments.get("all") or arguments.get("streams")
+        names = self.stream_names() if arguments.get("all") else arguments.get("streams")
+        if command == "start_broadcast":
+            if fleet:
+                return self.start_broadcasts(names)
+            return self.start_broadcast(arguments.get("wait_live", False))
+        elif command == "stop_broadcast":
+            if fleet:
+                return self.stop_broadcasts(names)
+            return self.stop_broadcast()
+        elif command == "status":
+            return self.status()
+        elif command == "quota":
+            return self.quota_usage()
+        elif command == "fill_pool":
+            return self.fill_pool()
+        elif command == "reload_config":
+            return self.reload_config()
+        elif command == "create_stream":
+            return self.create_stream(
+                arguments["name"],
+                arguments["stream_type"],
+                arguments["resolution"],
+                arguments["fps"],
+            )
+        raise ValueError(f"Unknown command `{command}`")
+
+    def serve(self, socket_path):
+        """Keep the manager alive and execute commands received on a Unix domain socket."""
+        if self._authenticate() is None:
+            self.logger.error("Authentication failed - not starting the daemon")
+            return
+        if os.path.exists(socket_path):
+            if _send_daemon_command(socket_path, "ping") is not None:
+                self.logger.error("A daemon is already listening on `%s`", socket_path)
+                return
+            os.unlink(socket_path)  # left behind by a daemon that did not shut down cleanly
+
+        server = socketserver.UnixStreamServer(socket_path, _ControlHandler)
+        server.manager = self
+        os.chmod(socket_path, 0o600)
+        self.logger.info("Listening for commands on `%s`", socket_path)
+        if self.config[self.CONF_STREAM_SETTINGS][self.CONF_POOL_SIZE]:
+            self.fill_pool_in_background()
+        self.start_encoder()
+        self.watch_config()
+        self.serve_metrics()
+        try:
+            server.serve_forever()
+        except KeyboardInterrupt:
+            self.logger.info("Shutting down daemon")
+        finally:
+            server.server_close()
+            os.unlink(socket_path)
+            self.stop_watching_config()
+            self.stop_serving_metrics()
+            self.stop_encoder()
+            self.notifier.close()
+
+    def serve_metrics(self):
+        """Offer the metrics over HTTP if a `port` is configured, for the long running commands."""
+        settings = self.config[self.CONF_METRICS]
+        if settings[self.CONF_METRICS_PORT] is None or self.metrics_server is not None:
+            return
+        try:
+            self.metrics_server = self.metrics.serve(
+                settings[self.CONF_METRICS_ADDRESS],
+                settings[self.CONF_METRICS_PORT],
+                self.logger,
+            )
+        except OSError as e:  # e.g. the daemon serves them already
+            self.logger.warning(
+                "Not serving metrics on port %s: %s",
+                settings[self.CONF_METRICS_PORT],
+                e,
+            )
+
+    def stop_serving_metrics(self):
+        if self.metrics_server is None:
+            return
+        self.metrics_server.shutdown()
+        self.metrics_server.server_close()
+        self.metrics_server = None
+
+    def write_metrics(self, command):
+        """Write the metrics of this run for the textfile collector, if configured.
+
+        Every command has its own file, so a `status` run does not replace
+        the counters of the last `start_broadcast`.
+        """
+        directory = self.config[self.CONF_METRICS][self.CONF_METRICS_TEXTFILE_DIRECTORY]
+        if directory is None:
+            return
+        filename = os.path.join(directory, f"yt-stream-manager-{command}.prom")
+        try:
+            self.metrics.write_textfile(filename)
+        except OSError as e:
+            self.logger.error("Failed to write the metrics to `%s`: %s", filename, e)
+
+    def _get_log_level(self):
+        if self.config[self.CONF_LOGGER] == self.CONF_INFO:
+            return logging.INFO
+        elif self.config[self.CONF_LOGGER] == self.CONF_DEBUG:
+            return logging.DEBUG
+        return logging.INFO
+
+    def _setup_logger(self):
+        """Set up logging.
+
+        Log calls only put the record on a queue. A `QueueListener` thread
+        formats it and writes it to the console and the rotating log file, so
+        the caller never waits for the disk.
+        """
+        logger = logging.getLogger()
+        for handler in list(logger.handlers):
+            if isinstance(handler, _DeferredQueueHandler):  # of an earlier instance
+                handler.listener.stop()
+                logger.removeHandler(handler)
+        console_handler = logging.StreamHandler()
+        console_handler.setFormatter(logging.Formatter(self.LOG_FORMAT))
+        log_queue = queue.SimpleQueue()
+        handler = _DeferredQueueHandler(log_queue)
+        handler.setLevel(self._get_log_level())
+        # keeps the records until the config says how the log file is written
+        file_buffer = logging.handlers.MemoryHandler(
+            capacity=1000, flushLevel=logging.CRITICAL + 1
+        )
+        handler.listener = _LogListener(log_queue, console_handler, file_buffer)
+        handler.listener.start()
+        atexit.register(handler.listener.stop)
+        self.log_listener = handler.listener
+        logger.addHandler(handler)
+        return logger
+
+    def _log_settings(self):
+        # also used before `_check_config` filled in the defaults
+        return {
+            **self.DEFAULT_CONFIG[self.CONF_LOG_SETTINGS],
+            **self.config.get(self.CONF_LOG_SETTINGS, {}),
+        }
+
+    def _log_file_handler(self):
+        settings = self._log_settings()
+        filename = os.path.join(os.path.dirname(__file__), self.LOG_FILE)
+        if settings[self.CONF_LOG_ROTATE_WHEN]:
+            handler = logging.handlers.TimedRotatingFileHandler(
+                filename,
+                when=settings[self.CONF_LOG_ROTATE_WHEN],
+                backupCount=settings[self.CONF_LOG_BACKUP_COUNT],
+            )
+        else:
+            handler = logging.handlers.RotatingFileHandler(
+                filename,
+                maxBytes=settings[self.CONF_LOG_MAX_BYTES],
+                backupCount=settings[self.CONF_LOG_BACKUP_COUNT],
+            )
+        if settings[self.CONF_LOG_JSON]:
+            handler.setFormatter(_JsonFormatter())
+        else:
+            handler.setFormatter(logging.Formatter(self.LOG_FORMAT))
+        return handler
+
+    def _reload_log_file(self):
+        """Apply the `log_settings` of the loaded config to the log file."""
+        listener = self.log_listener
+        listener.stop()  # handles what is queued with the old settings
+        console_handler, old_handler = listener.handlers
+        file_handler = self._log_file_handler()
+        if isinstance(old_handler, logging.handlers.MemoryHandler):
+            old_handler.setTarget(file_handler)
+        old_handler.close()
+        listener.handlers = (console_handler, file_handler)
+        listener.max_message_length = self._log_settings()[
+            self.CONF_LOG_MAX_MESSAGE_LENGTH
+        ]
+        listener.start()
+
+    def _reload_log_level(self):
+        """Dynamically update the log level."""
+        self.logger.setLevel(self._get_log_level())
+        for handler in self.logger.handlers:
+            handler.setLevel(self._get_log_level())
+        # print(f"Log level updated to {logging.getLevelName(self._get_log_level())}")
+
+    def _config_path(self):
+        return os.path.join(os.path.dirname(__file__), self.config_file)
+
+    def _state_journal_filename(self):
+        """Return the journal of this config.
+
+        The journal keys the main stream by `stream_settings` and fleet
+        streams by name, so configs run from the same checkout must not share
+        it or `stop_broadcast` of one would complete the broadcast of another.
+        The journal of `CONFIG_FILE` keeps the name of earlier versions.
+        """
+        dirname = os.path.dirname(__file__)
+        config_path = os.path.realpath(self._config_path())
+        if config_path == os.path.realpath(os.path.join(dirname, self.CONFIG_FILE)):
+            return os.path.join(dirname, self.STATE_JOURNAL_FILE)
+        name = os.path.splitext(os.path.basename(config_path))[0]
+        # configs with the same file name in different directories
+        digest = hashlib.sha1(config_path.encode()).hexdigest()[:8]
+        base, extension = os.path.splitext(self.STATE_JOURNAL_FILE)
+        return os.path.join(dirname, f"{base}-{name}-{digest}{extension}")
+
+    def _load_config(self):
+        """Load the configuration from a file."""
+        filename = self._config_path()
+        try:
+            with open(filename, "r") as f:
+                config = json.load(f)
+            self.logger.info("Loaded configuration from %s", filename)
+            return config
+        except FileNotFoundError:
+            self.logger.error("Config file %s not found. - Exiting!!", filename)
+            exit(1)
+
+    @classmethod
+    def config_schema(cls):
+        """Return the `ConfigSchema` of `CONFIG_RULES`, compiled once per process."""
+        if cls._config_schema is None:
+            cls._config_schema = ConfigSchema(cls.CONFIG_RULES, cls.DEFAULT_CONFIG)
+        return cls._config_schema
+
+    def _check_config(self) -> bool:
+        """Validate the loaded config, log every error and fill in the defaults."""
+        if self.CONF_EMAIL not in self.config:
+            self.logger.info("No email config is provided")
+        config, errors = self.config_schema().validate(self.config)
+        for error in errors:
+            self.logger.error("Invalid config: %s", error)
+        if errors:
+            return False
+        self.config = config
+        return True
+
+    def reload_config(self):
+        """Read the config file again and switch to it if it is valid.
+
+        The new config replaces the old one in a single assignment and the
+        old one is never changed, so an operation in flight finishes with the
+        sections it already holds and the next one picks up the new title,
+        tags, privacy, day parts and so on. An invalid file is reported and
+        the running config is kept. Returns `True` if the new config is used.
+        """
+        with self._config_lock:
+            try:
+                with open(self._config_path(), "r") as f:
+                    config = json.load(f)
+            except (OSError, ValueError) as e:
+                self.logger.error(
+                    "Could not reload the config, keeping the current one: %s", e
+                )
+                return False
+            config, errors = self.config_schema().validate(config)
+            if errors:
+                for error in errors:
+                    self.logger.error("Invalid config: %s", error)
+                self.logger.error("Keeping the current config")
+                self.notifier.notify("Config reload failed", "\n".join(errors))
+                return False
+            old, self.config = self.config, config
+            changed = sorted(key for key in old.keys() | config.keys() if old.get(key) != config.get(key))
+            if not changed:
+                return True
+            self.logger.info("Reloaded the config, changed: %s", ", ".join(changed))
+            self._apply_config(old)
+            return True
+
+    def _apply_config(self, old):
+        """Bring what was built from the `old` config in line with the current one."""
+        config = self.config
+        if config[self.CONF_LOGGER] != old[self.CONF_LOGGER]:
+            self._reload_log_level()
+        if config[self.CONF_LOG_SETTINGS] != old[self.CONF_LOG_SETTINGS]:
+            self._reload_log_file()
+
+        youtube_settings = config[self.CONF_YOUTUBE_SETTINGS]
+        rate = youtube_settings[self.CONF_REQUESTS_PER_SECOND]
+        if rate != old[self.CONF_YOUTUBE_SETTINGS][self.CONF_REQUESTS_PER_SECOND]:
+            # callers waiting on the old bucket finish with it
+            self.rate_limiter = TokenBucket(rate)
+        self.quota.budget = youtube_settings[self.CONF_QUOTA_BUDGET]
+        self.quota.low_priority_share = youtube_settings[self.CONF_QUOTA_LOW_PRIORITY_SHARE]
+        cache_size = youtube_settings[self.CONF_RESPONSE_CACHE_SIZE]
+        if self.response_cache is not None and cache_size:
+            self.response_cache.max_entries = cache_size
+            self.response_cache.ttl = youtube_settings[self.CONF_RESPONSE_CACHE_TTL]
+        elif bool(cache_size) != (self.response_cache is not None):
+            self.logger.warning(
+                "`%s` changed, takes effect after a restart",
+                self.CONF_RESPONSE_CACHE_SIZE,
+            )
+
+        if config[self.CONF_EMAIL] != old[self.CONF_EMAIL]:
+            notifier, self.notifier = self.notifier, EmailNotifier(
+                config[self.CONF_EMAIL], self.logger
+            )
+            if self.encoder is not None:
+                self.encoder.notifier = self.notifier
+            notifier.close()  # sends what is queued with the old settings
+        if config[self.CONF_ENCODER] != old[self.CONF_ENCODER]:
+            supervised = self.encoder is not None
+            self.stop_encoder()
+            if supervised or old[self.CONF_ENCODER][self.CONF_ENCODER_COMMAND] is None:
+                self.start_encoder()
+
+        for section, key in self.RESTART_SETTINGS:
+            old_value = old.get(section) if key is None else old[section].get(key)
+            value = config.get(section) if key is None else config[section].get(key)
+            if value != old_value:
+                self.logger.warning(
+                    "`%s` changed, takes effect after a restart", key or section
+                )
+
+    def watch_config(self):
+        """Reload the config whenever its file changes, for the long running commands."""
+        if self.config_watcher is not None:
+            return
+        self.config_watcher = ConfigWatcher(self._config_path(), self.reload_config, self.logger)
+        self.config_watcher.start()
+
+    def stop_watching_config(self):
+        if self.config_watcher is None:
+            return
+        self.config_watcher.stop()
+        self.config_watcher = None
+
+    def _discovery_cache_filename(self):
+        dirname = os.path.dirname(__file__)
+        return os.path.join(dirname, self.DISCOVERY_CACHE_FILE)
+
+    def _read_discovery_cache(self):
+        """Return `(document, age_in_seconds)` from the on-disk cache or `(None, None)`."""
+        filename = self._discovery_cache_filename()
+        try:
+            with open(filename, "r") as f:
+                cache = json.load(f)
+        except FileNotFoundError:
+            return None, None
+        except (OSError, ValueError) as e:
+            self.logger.warning(
+                "Ignoring unreadable discovery cache `%s`: %s", filename, e
+            )
+            return None, None
+        if (
+            cache.get("cache_version") != self.DISCOVERY_CACHE_VERSION
+            or cache.get("document", {}).get("version") != "v3"
+        ):
+            self.logger.info("Discovery cache `%s` is outdated - ignoring it", filename)
+            return None, None
+        return cache["document"], time.time() - cache.get("fetched_at", 0)
+
+    def _write_discovery_cache(self, document):
+        filename = self._discovery_cache_filename()
+        tmp_filename = filename + ".tmp"
+        with open(tmp_filename, "w") as f:
+            json.dump(
+                {
+                    "cache_version": self.DISCOVERY_CACHE_VERSION,
+                    "fetched_at": time.time(),
+                    "document": document,
+                },
+                f,
+            )
+        os.replace(tmp_filename, filename)
+
+    def refresh_discovery_document(self):
+        """Download the v3 discovery document and store it in the on-disk cache."""
+        import urllib.request
+
+        try:
+            with urllib.request.urlopen(
+                self.config[self.CONF_YOUTUBE_SETTINGS][self.CONF_DISCOVERY_URL],
+                timeout=self.DISCOVERY_TIMEOUT,
+            ) as response:
+                document = json.loads(response.read().decode("utf-8"))
+            self._write_discovery_cache(document)
+            self.logger.info(
+                "Discovery document revision `%s` stored in `%s`",
+                document.get("revision"),
+                self._discovery_cache_filename(),
+            )
+            return document
+        except Exception as e:
+            self.logger.error("Failed to refresh discovery document: %s", e)
+            return None
+
+    def _get_discovery_document(self):
+        """Return the cached discovery document, refreshing it once the TTL has passed.
+
+        A stale copy is preferred over failing when the refresh does not succeed.
+        """
+        document, age = self._read_discovery_cache()
+        ttl = self.config[self.CONF_YOUTUBE_SETTINGS][self.CONF_DISCOVERY_CACHE_TTL]
+        if document is not None and age < ttl:
+            self.logger.debug("Using cached discovery document (%ds old)", age)
+            return document
+        refreshed = self.refresh_discovery_document()
+        if refreshed is not None:
+            return refreshed
+        if document is not None:
+            self.logger.warning("Using stale discovery document")
+        return document
+
+    def _build_client(self, credentials):
+        from googleapiclient.discovery import build, build_from_document
+
+        # one authorized transport per manager so that a long running daemon reuses
+        # its keep-alive connection to the API for every command
+        http = self._new_authorized_http(credentials)
+        document = self._get_discovery_document()
+        if document is None:
+            # fall back to the discovery document bundled with googleapiclient
+            return build("youtube", "v3", http=http)
+        return build_from_document(document, http=http)
+
+    def _new_authorized_http(self, credentials=None):
+        """Return a new authorized transport, e.g. for requests executed in another thread."""
+        import httplib2
+        from google_auth_httplib2 import AuthorizedHttp
+
+        http = httplib2.Http(timeout=self.HTTP_TIMEOUT)
+        if self.tracer.enabled:
+            http.request = self.tracer.wrap_request(http.request)
+        return AuthorizedHttp(credentials or self.credentials, http=http)
+
+    def _authenticate(self, create_new_token: bool = False):
+        if self.youtube is not None and not create_new_token:
+            return self.youtube
+
+        try:
+            credentials = None
+            dirname = os.path.dirname(__file__)
+            token_filename = os.path.join(dirname, self.TOKEN_FILE)
+            if self.credential_manager is not None:
+                self.credential_manager.stop_background_refresh()
+            self.credential_manager = CredentialManager(
+                token_filename, self.SCOPES, self.logger, self.metrics
+            )
+            if not create_new_token:
+                # do we have a token file allready? - otherwise login again and create a new token file
+                credentials = self.credential_manager.load()
+
+            if (
+                not credentials or not credentials.valid
+            ):  # do we have no token or is the token no longer valid?
+                if (
+                    credentials and credentials.expired and credentials.refresh_token
+                ):  # is the token expired?
+                    try:
+                        self.logger.debug("Token expired. Attempting to refresh...")
+                        credentials = self.credential_manager.refresh()
+                        self.logger.debug("Token successfully refreshed.")
+                    except Exception as e:
+                        self.logger.error("Error renewing token: %s", e)
+                        raise e
+                else:
+                    try:
+                        # only needed by `login`, which has to open the browser anyway
+                        from google_auth_oauthlib.flow import InstalledAppFlow
+
+                        dirname = os.path.dirname(__file__)
+                        filename = os.path.join(
+                            dirname,
+                            self.config[self.CONF_YOUTUBE_SETTINGS][
+                                self.CONF_CREDENTIALS_FILE
+                            ],
+                        )
+                        flow = InstalledAppFlow.from_client_secrets_file(
+                            filename,
+                            self.SCOPES,
+                        )
+                        credentials = flow.run_local_server(
+                            port=0, access_type="offline", prompt="consent"
+                        )
+                    except Exception as e:
+                        self.logger.error(
+                            "Failed to login, maybe the credentials file does not exist? `%s` Error was: %s",
+                            filename,
+                            e,
+                        )
+                        raise e
+                    try:
+                        self.credential_manager.save(credentials)
+                        self.logger.info(
+                            "Token was succefully writen to token file `%s`",
+                            token_filename,
+                        )
+                    except Exception as e:
+                        self.logger.error(
+                            "Failed to login, maybe the credentials file does not exist? `%s` Error was: %s",
+                            token_filename,
+                            e,
+                        )
+                        raise e
+
+            # keep the token fresh so that refreshing it never delays an API call
+            self.credential_manager.start_background_refresh()
+            self.credentials = credentials
+            self.youtube = self._build_client(credentials)
+            return self.youtube
+        except Exception as e:
+            self.logger.error("Failed to authenticate: %s", str(e))
+            return None
+
+    def _day_part(self, stream_settings, now=None):
+        """Return `(number, start, end)` of the day part `now` falls into.
+
+        `start` and `end` are aware datetimes in the configured timezone. Before
+        the first start time of a day the last part of the previous day lasts.
+        """
+        timezone = ZoneInfo(stream_settings[self.CONF_TIMEZONE])
+        now = now or datetime.datetime.now(timezone)
+        starts = []
+        for offset in [-1, 0, 1]:
+            day = now.date() + datetime.timedelta(days=offset)
+            for number, part in enumerate(stream_settings[self.CONF_DAY_PARTS], 1):
+                start = datetime.datetime.combine(
+                    day, datetime.time.fromisoformat(part), timezone
+                )
+                starts.append((start, number))
+        for (start, number), (end, _) in zip(starts, starts[1:]):
+            if start <= now < end:
+                return number, start, end
+
+    def _live_broadcast_insert_body(self, stream_settings):
+        """Return `(title, description, body)` for a new broadcast of the given stream."""
+        timezone = ZoneInfo(stream_settings[self.CONF_TIMEZONE])
+        current_time = datetime.datetime.now(timezone)
+        number, start, _ = self._day_part(stream_settings, current_time)
+        current_date = start.strftime("%d.%m.%Y")
+        part = f" ({number})"
+
+        title = stream_settings[self.CONF_TITLE] + " " + current_date + part
+        description = stream_settings[self.CONF_DESCRIPTION] + "\n" + current_date
+        body = {
+            "snippet": {
+                "title": title,
+                "description": description,
+                "scheduledStartTime": current_time.isoformat(),
+            },
+            "contentDetails": {
+                # an update of `contentDetails` requires the delay, so the
+                # claim of a pooled broadcast can send this part unchanged
+                "monitorStream": {
+                    "enableMonitorStream": False,
+                    "broadcastStreamDelayMs": 0,
+                },
+                "enableAutoStart": True,
+                "enableAutoStop": False,
+            },
+            "status": {
+                "privacyStatus": stream_settings[self.CONF_PRIVACY],
+                "selfDeclaredMadeForKids": False,
+                "broadcastStatus": "upcoming",
+            },
+        }
+        return title, description, body
+
+    def _video_metadata_body(self, broadcast_id, stream_settings, title, description):
+        # `videos().update` replaces the whole snippet, so title and description are
+        # sent again with the same values the broadcast was created with
+        return {
+            "id": broadcast_id,
+            "snippet": {
+                "title": title,
+                "description": description,
+                "tags": stream_settings[self.CONF_TAGS],
+                "categoryId": stream_settings[self.CONF_CATEGORY],
+            },
+        }
+
+    def _create_live_broadcast(self):
+        try:
+            (
+                self.video_title,
+                self.video_description,
+                body,
+            ) = self._live_broadcast_insert_body(self.config[self.CONF_STREAM_SETTINGS])
+            request = self.youtube.liveBroadcasts().insert(
+                part="snippet,contentDetails,status", body=body
+            )
+            response = self._execute(
+                request, idempotency_check=lambda: self._find_upcoming_broadcast(body)
+            )
+            self.logger.debug(response)
+            if "id" not in response:
+                self.logger.error("Broadcast creation failed: Response missing 'id'")
+                return None
+            self.broadcast_id = response["id"]
+            return response
+        except Exception as e:
+            self.logger.error("Failed to create broadcast: %s", str(e))
+            return None
+
+    def _find_upcoming_broadcast(self, body, http=None, exclude=()):
+        """Return an upcoming broadcast with the title and start time of `body`, if any.
+
+        Broadcasts whose id is in `exclude` are passed over.
+        """
+        scheduled = datetime.datetime.fromisoformat(body["snippet"]["scheduledStartTime"])
+        response = self._execute(
+            self.youtube.liveBroadcasts().list(
+                part="id,snippet",
+                broadcastStatus="upcoming",
+                maxResults=self.MAX_LIST_IDS,
+            ),
+            http=http,
+        )
+        for item in response.get("items", []):
+            snippet = item["snippet"]
+            if item["id"] in exclude or snippet["title"] != body["snippet"]["title"]:
+                continue
+            other = datetime.datetime.fromisoformat(snippet["scheduledStartTime"])
+            if abs((other - scheduled).total_seconds()) < 1:
+                return item
+        return None
+
+    def _get_existing_stream(self, stream_id):
+        request = self.youtube.liveStreams().list(
+            part="snippet,cdn,contentDetails", id=stream_id
+        )
+        response = self._execute(request)
+        self.logger.debug("get_existing_stream response: %s", response)
+        if response["items"]:
+            return response["items"][0]
+        else:
+            self.logger.error("Stream with ID %s not found.", stream_id)
+            return None
+
+    def _bind_broadcast_to_existing_stream(self):
+        try:
+            request = self.youtube.liveBroadcasts().bind(
+                part="id,contentDetails",
+                id=self.broadcast_id,
+                streamId=self.config[self.CONF_STREAM_SETTINGS][self.CONF_STREAM_ID],
+            )
+            response = self._execute(request)
+            self.logger.debug(response)
+
+            if "id" in response and response["id"] == self.broadcast_id:
+                self.logger.info(
+                    "Stream %s is correctly bound to Broadcast %s",
+                    self.config[self.CONF_STREAM_SETTINGS][self.CONF_STREAM_ID],
+                    self.broadcast_id,
+                )
+            else:
+                self.logger.error(
+                    "Failed to bind stream %s to Broadcast %s",
+                    self.config[self.CONF_STREAM_SETTINGS][self.CONF_STREAM_ID],
+                    self.broadcast_id,
+                )
+            return response
+        except Exception as e:
+            if self._http_error_reason(e) == "liveBroadcastNotFound":
+                raise LookupError(f"Broadcast {self.broadcast_id} not found.") from e
             self.logger.error(
-                f"Error binding broadcast {self.broadcast_id} to stream {self.config[self.CONF_STREAM_SETTINGS][self.CONF_STREAM_ID]}: {e}"
+                "Error binding broadcast %s to stream %s: %s",
+                self.broadcast_id,
+                self.config[self.CONF_STREAM_SETTINGS][self.CONF_STREAM_ID],
+                e,
             )
 
     def _check_stream_health(self):
@@ -464,83 +2821,2481 @@ class YouTubeStreamManager:
             part="cdn, status",
             id=self.config[self.CONF_STREAM_SETTINGS][self.CONF_STREAM_ID],
         )
-        response = request.execute()
+        response = self._execute(request)
         self.logger.debug(response)
         if response["items"]:
             cdn_settings = response["items"][0]["cdn"]
             health_status = response["items"][0]["status"].get(
                 "streamStatus", "No Status"
             )
-            self.logger.info(f"Stream Health: {health_status}")
+            self.logger.info("Stream Health: %s", health_status)
             return health_status
         else:
             self.logger.error(
-                f"Stream with ID {self.config[self.CONF_STREAM_SETTINGS][self.CONF_STREAM_ID]} not found."
+                "Stream with ID %s not found.",
+                self.config[self.CONF_STREAM_SETTINGS][self.CONF_STREAM_ID],
+            )
+            return None
+
+    def _check_broadcast_status(self):
+        from googleapiclient.errors import HttpError
+
+        try:
+            # Get the broadcast details to check if it's receiving a stream
+            request = self.youtube.liveBroadcasts().list(
+                part="status", id=self.broadcast_id
+            )
+            response = self._execute(request)
+
+            # Check if the broadcast is ready and receiving a stream
+            if response["items"]:
+                status = response["items"][0]["status"]["lifeCycleStatus"]
+                self.logger.info("Broadcast %s status: %s", self.broadcast_id, status)
+                return status
+            else:
+                self.logger.error("Broadcast %s not found.", self.broadcast_id)
+                return None
+        except HttpError as e:
+            self.logger.error("Error checking broadcast status: %s", e)
+            return None
+
+    def _execute(
+        self, request, http=None, priority=None, idempotency_check=None, cache=True
+    ):
+        """Execute an API request with retries and account for its quota cost.
+
+        Every attempt waits for the shared rate limiter and is recorded in the
+        quota ledger. Retryable errors are retried with exponential backoff and
+        full jitter until `retry_deadline` has passed. A non idempotent method
+        (insert) whose failed attempt may still have been applied is only
+        retried if `idempotency_check` is given: it is called before the retry
+        and its result is returned instead if it finds what the first attempt
+        created. Low priority requests are refused with `QuotaBudgetExceeded`
+        once the low priority share of the daily budget is used up.
+        `list` requests are revalidated against the `ResponseCache` unless
+        `cache` is false, the returned body may then be shared and must not be
+        modified.
+        """
+        from googleapiclient.errors import HttpError
+
+        method = request.methodId
+        cost = self.quota.cost(method)
+        cache_key = cached = None
+        if cache and self.response_cache is not None and method.endswith(".list"):
+            cache_key = self.response_cache.key(request)
+            cached = self.response_cache.get(cache_key)
+            if cached is not None:
+                request.headers["If-None-Match"] = cached["etag"]
+        deadline = (
+            time.monotonic()
+            + self.config[self.CONF_YOUTUBE_SETTINGS][self.CONF_RETRY_DEADLINE]
+        )
+        with self.tracer.span(
+            method, cost=cost, priority=priority or QuotaLedger.PRIORITY_NORMAL
+        ) as span:
+            attempt = 0
+            while True:
+                self.quota.check(method, cost, priority or QuotaLedger.PRIORITY_NORMAL)
+                self.rate_limiter.acquire()
+                start = time.perf_counter()
+                try:
+                    response = request.execute(http=http)
+                    self._record_call(method, cost, time.perf_counter() - start)
+                    span["retries"] = attempt
+                    if cache_key is not None:
+                        self.response_cache.put(cache_key, response)
+                    return response
+                except Exception as e:
+                    if cached is not None and isinstance(e, HttpError) and e.resp.status == 304:
+                        # costs quota like any call, but has no body to transfer and parse
+                        self._record_call(method, cost, time.perf_counter() - start)
+                        self.logger.debug("%s not modified, using the cached response", method)
+                        span["retries"] = attempt
+                        span["not_modified"] = True
+                        return self.response_cache.revalidated(cache_key, cached)
+                    reason = self._http_error_reason(e) or type(e).__name__
+                    self._record_call(method, cost, time.perf_counter() - start, reason)
+                    span["retries"] = attempt
+                    span["reason"] = reason
+                    retryable = self._retry_class(e)
+                    if retryable is None or (
+                        retryable == "ambiguous"
+                        and method in self.NON_IDEMPOTENT_METHODS
+                        and idempotency_check is None
+                    ):
+                        raise
+                    delay = self._retry_delay(attempt, e)
+                    if time.monotonic() + delay > deadline:
+                        raise
+                    self.logger.warning(
+                        "%s failed (%s), retrying in %.1fs (attempt %s)",
+                        method,
+                        reason,
+                        delay,
+                        attempt + 1,
+                    )
+                    time.sleep(delay)
+                    attempt += 1
+                    if retryable == "ambiguous" and idempotency_check is not None:
+                        existing = idempotency_check()
+                        if existing is not None:
+                            self.logger.info(
+                                "%s was applied by the failed attempt - not repeating it",
+                                method,
+                            )
+                            return existing
+
+    def _record_call(self, method, cost, latency, error=None):
+        """Account for one executed API call in the quota ledger and the metrics."""
+        self.quota.record(method, cost, latency, error)
+        self.metrics.record_call(method, cost, latency, error)
+
+    def _retry_class(self, error):
+        """Classify an error as `"rejected"`, `"ambiguous"` or `None` (not retryable).
+
+        Rejected requests were not applied and can always be repeated. Server
+        errors and connection problems are ambiguous: the request may have been
+        applied before the failure.
+        """
+        import httplib2
+        from googleapiclient.errors import HttpError
+
+        if isinstance(error, HttpError):
+            if (
+                error.resp.status in self.REJECTED_STATUS
+                or self._http_error_reason(error) in self.REJECTED_REASONS
+            ):
+                return "rejected"
+            if error.resp.status in self.SERVER_ERROR_STATUS:
+                return "ambiguous"
+            return None
+        if isinstance(error, (OSError, httplib2.HttpLib2Error)):
+            return "ambiguous"
+        return None
+
+    def _retry_delay(self, attempt, error=None):
+        """Exponential backoff with full jitter, honouring a `Retry-After` header."""
+        delay = random.uniform(
+            0, min(self.RETRY_MAX_DELAY, self.RETRY_BASE_DELAY * 2**attempt)
+        )
+        resp = getattr(error, "resp", None)
+        retry_after = resp.get("retry-after") if resp is not None else None
+        if retry_after is not None and retry_after.isdigit():
+            delay = max(delay, int(retry_after))
+        return delay
+
+    def _http_error_reason(self, error):
+        """Return the `reason` of the first error detail of an `HttpError`."""
+        details = getattr(error, "error_details", None)
+        if isinstance(details, list) and details and isinstance(details[0], dict):
+            return details[0].get("reason")
+        return None
+
+    def _get_lifecycle(self):
+        """Return `(lifeCycleStatus, monitor_stream_enabled, bound_stream_status)`."""
+        response = self._execute(
+            self.youtube.liveBroadcasts().list(
+                part="status,contentDetails", id=self.broadcast_id
+            )
+        )
+        if not response["items"]:
+            raise LookupError(f"Broadcast {self.broadcast_id} not found.")
+        broadcast = response["items"][0]
+        content_details = broadcast.get("contentDetails", {})
+        monitor_enabled = content_details.get("monitorStream", {}).get(
+            "enableMonitorStream", False
+        )
+        stream_status = None
+        stream_id = content_details.get("boundStreamId")
+        if stream_id:
+            streams = self._execute(
+                self.youtube.liveStreams().list(part="status", id=stream_id)
+            )
+            if streams["items"]:
+                stream_status = streams["items"][0]["status"].get("streamStatus")
+        return broadcast["status"]["lifeCycleStatus"], monitor_enabled, stream_status
+
+    def _transition_broadcast(self, broadcast_status):
+        """Request a transition, returns `False` only if it failed for good."""
+        from googleapiclient.errors import HttpError
+
+        try:
+            self._execute(
+                self.youtube.liveBroadcasts().transition(
+                    part="status", broadcastStatus=broadcast_status, id=self.broadcast_id
+                )
+            )
+            self.logger.info(
+                "Broadcast %s transitioned to `%s`", self.broadcast_id, broadcast_status
+            )
+            return True
+        except HttpError as e:
+            if self._http_error_reason(e) in self.BENIGN_TRANSITION_REASONS:
+                # e.g. auto start moved the broadcast on in the meantime
+                self.logger.debug("Transition to `%s` not applied: %s", broadcast_status, e)
+                return True
+            self.logger.error(
+                "Error transitioning broadcast %s to `%s`: %s",
+                self.broadcast_id,
+                broadcast_status,
+                e,
+            )
+            return False
+
+    def advance_to_live(self, timeout=LIFECYCLE_TIMEOUT):
+        """Drive the broadcast through created -> ready -> (testing ->) live.
+
+        The broadcast and its bound stream are polled with an exponentially
+        growing delay and every transition is requested as soon as its
+        precondition holds: `ready` needs an `active` stream, `testing` is only
+        used when the monitor stream is enabled. All decisions are made from the
+        state reported by YouTube, so calling this again after a restart resumes
+        wherever the broadcast is. Returns the last lifeCycleStatus seen, which
+        is `live` on success, or `None` on a timeout or error.
+        """
+        if self._authenticate() is None:
+            self.logger.info("Authentication failed")
+            return None
+        # the id left on a long lived manager (the daemon) may be of a broadcast
+        # another process has stopped or replaced since, the journal knows
+        broadcast = self.state.current(self.CONF_STREAM_SETTINGS)
+        if broadcast is not None:
+            self.broadcast_id = broadcast["broadcast_id"]
+        elif getattr(self, "broadcast_id", None) is None:
+            self.broadcast_id = self._current_broadcast_id()
+        if self.broadcast_id is None:
+            self.logger.error("No broadcast was started")
+            return None
+
+        deadline = time.monotonic() + timeout
+        delay = self.LIFECYCLE_MIN_DELAY
+        last_state = None
+        while True:
+            try:
+                status, monitor_enabled, stream_status = self._get_lifecycle()
+            except Exception as e:
+                self.logger.error("Error checking broadcast status: %s", e)
+                return None
+            state = (status, stream_status)
+            if state != last_state:
+                self.logger.info(
+                    "Broadcast %s is `%s`, stream is `%s`",
+                    self.broadcast_id,
+                    status,
+                    stream_status,
+                )
+                last_state = state
+
+            if status == "live":
+                self.state.append("live", self.CONF_STREAM_SETTINGS, self.broadcast_id)
+                self.notifier.notify(f"Broadcast {self.broadcast_id} is live")
+                return status
+            if status in self.FINAL_STATUS:
+                self.logger.error(
+                    "Broadcast %s is `%s` and can not go live",
+                    self.broadcast_id,
+                    status,
+                )
+                self.notifier.notify(
+                    f"Broadcast {self.broadcast_id} is `{status}` and can not go live"
+                )
+                return status
+
+            target = None
+            if status == "ready" and stream_status == "active":
+                target = "testing" if monitor_enabled else "live"
+            elif status == "testing":
+                target = "live"
+            if target is not None:
+                if not self._transition_broadcast(target):
+                    return None
+                delay = self.LIFECYCLE_MIN_DELAY  # the next state change is imminent
+
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                self.logger.error(
+                    "Broadcast %s did not go live within %ss, it is still `%s`",
+                    self.broadcast_id,
+                    timeout,
+                    status,
+                )
+                self.notifier.notify(
+                    f"Broadcast {self.broadcast_id} did not go live within {timeout}s",
+                    f"It is still `{status}`, the stream is `{stream_status}`",
+                )
+                return None
+            time.sleep(min(delay, remaining))
+            delay = min(delay * 2, self.LIFECYCLE_MAX_DELAY)
+
+    def update_video_metadata(self, http=None):
+        """Set tags and category, which `liveBroadcasts().insert` can not carry."""
+        try:
+            request = self.youtube.videos().update(
+                part="snippet",
+                body=self._video_metadata_body(
+                    self.broadcast_id,
+                    self.config[self.CONF_STREAM_SETTINGS],
+                    self.video_title,
+                    self.video_description,
+                ),
+            )
+            response = self._execute(request, http=http)
+            self.logger.debug(response)
+            self.logger.info(
+                "Metadata succefully updated for Broadcast ID %s", self.broadcast_id
+            )
+            return response
+        except Exception as e:
+            self.logger.error("Failed to update Broadcast metadata: %s", str(e))
+            return None
+
+
+class ConfigSchema:
+    """Validates configs against rules compiled once into nested check functions.
+
+    The rules mirror the layout of the config (see `CONFIG_RULES`): a key may
+    have a `type`, `choices`, limits (`min`, `max`, `above`), a `format`
+    checked by the `_format_*` method of that name, be `required` or
+    `required_if` a sibling is on, describe the `keys` of a dict or the
+    `items` of a list and require a key of these items to be `unique`.
+    Unknown keys are kept as they are. Compiling resolves all of this into
+    closures once, so validating a config only walks it.
+
+    `validate` collects every error in one pass instead of stopping at the
+    first and returns a new config with the defaults filled in. The config
+    passed in is never changed, so a running manager keeps a working config
+    when a reloaded one is invalid.
+    """
+
+    TYPE_NAMES = {
+        str: "a string",
+        int: "an integer",
+        float: "a number",
+        bool: "a boolean",
+        list: "a list",
+        dict: "an object",
+    }
+
+    def __init__(self, rules, defaults):
+        self._validate = self._compile({"type": dict, "keys": rules}, defaults)
+
+    def validate(self, config):
+        """Return the config with the defaults filled in and a list of errors."""
+        errors = []
+        config = self._validate(config, "", errors)
+        return config, errors
+
+    def _compile(self, rule, default):
+        """Return `validate(value, path, errors)` for one rule and its default."""
+        checks = self._compile_checks(rule)
+        nullable = rule.get("nullable", default is None)
+        keys = {
+            key: (
+                self._compile(child, default.get(key) if isinstance(default, dict) else None),
+                child,
+                isinstance(default, dict) and key in default,
+            )
+            for key, child in rule.get("keys", {}).items()
+        }
+        item = self._compile(rule["items"], None) if "items" in rule else None
+        unique = rule.get("unique")
+
+        def validate(value, path, errors):
+            if value is None and nullable:
+                return None
+            for check in checks:
+                error = check(value)
+                if error is not None:
+                    # e.g. the keys of something that is no dict are not checked
+                    errors.append(f"`{path}` {error}")
+                    return value
+            if keys:
+                value = dict(value)
+                for key, (validate_child, child, has_default) in keys.items():
+                    child_path = f"{path}.{key}" if path else key
+                    if key in value:
+                        value[key] = validate_child(value[key], child_path, errors)
+                    elif child.get("required"):
+                        errors.append(f"`{child_path}` is required")
+                    elif value.get(child.get("required_if")):
+                        errors.append(
+                            f"`{child_path}` is required if `{child['required_if']}` is on"
+                        )
+                    elif child.get("type") is dict:
+                        value[key] = validate_child({}, child_path, errors)
+                    elif has_default:
+                        value[key] = validate_child(
+                            copy.deepcopy(default[key]), child_path, errors
+                        )
+            valid = None
+            if item is not None:
+                elements, valid = [], []
+                for index, element in enumerate(value):
+                    before = len(errors)
+                    elements.append(item(element, f"{path}[{index}]", errors))
+                    valid.append(len(errors) == before)
+                value = elements
+            if unique is not None:
+                seen = set()
+                for index, element in enumerate(value):
+                    # an invalid element was reported already, its key may be anything
+                    if not isinstance(element, dict) or (valid and not valid[index]):
+                        continue
+                    if element.get(unique) in seen:
+                        errors.append(
+                            f"`{path}` uses the {unique} `{element[unique]}` more than once"
+                        )
+                    else:
+                        seen.add(element.get(unique))
+            return value
+
+        return validate
+
+    def _compile_checks(self, rule):
+        checks = []
+        types = rule.get("type")
+        if types is not None:
+            types = types if isinstance(types, tuple) else (types,)
+            names = " or ".join(self.TYPE_NAMES.get(t, t.__name__) for t in types)
+
+            def check_type(value):
+                # `true` is an int to Python but no number in a config
+                if not isinstance(value, types) or (
+                    isinstance(value, bool) and bool not in types
+                ):
+                    return f"must be {names}"
+
+            checks.append(check_type)
+        if "choices" in rule:
+            choices = rule["choices"]
+            checks.append(
+                lambda value: None if value in choices else f"must be one of {choices}"
+            )
+        if "min" in rule:
+            low = rule["min"]
+            checks.append(lambda value: None if value >= low else f"must be at least {low}")
+        if "above" in rule:
+            bound = rule["above"]
+            checks.append(
+                lambda value: None if value > bound else f"must be greater than {bound}"
+            )
+        if "max" in rule:
+            high = rule["max"]
+            checks.append(lambda value: None if value <= high else f"must be at most {high}")
+        if "min_items" in rule:
+            size = rule["min_items"]
+            checks.append(
+                lambda value: None
+                if len(value) >= size
+                else f"must have at least {size} {'entry' if size == 1 else 'entries'}"
+            )
+        if "format" in rule:
+            checks.append(getattr(self, f"_format_{rule['format']}"))
+        return checks
+
+    def _format_timezone(self, value):
+        try:
+            ZoneInfo(value)
+        except (ValueError, KeyError) as e:
+            return f"is no known timezone: {e}"
+
+    def _format_day_parts(self, value):
+        try:
+            parts = [datetime.time.fromisoformat(part) for part in value]
+        except (ValueError, TypeError) as e:
+            return f"must contain `HH:MM` times: {e}"
+        if not parts or parts != sorted(set(parts)):
+            return "must be a non empty list of increasing `HH:MM` times"
+
+
+class ConfigWatcher:
+    """Calls `on_change` from a background thread after the config file changed.
+
+    Watches the directory of the file with inotify, so replacing the file
+    with a rename, as editors and deployment tools do, is noticed as well as
+    writing it in place. Without inotify (not Linux) the modification time,
+    size and inode of the file are polled every `POLL_INTERVAL` seconds.
+    Events arriving within `SETTLE_DELAY` seconds, e.g. an editor truncating
+    and then writing the file, result in a single call.
+    """
+
+    POLL_INTERVAL = 2  # seconds
+    SETTLE_DELAY = 0.2  # seconds
+    IN_CLOSE_WRITE = 0x00000008
+    IN_MOVED_TO = 0x00000080
+    IN_CREATE = 0x00000100
+    IN_NONBLOCK = 0o4000
+    IN_CLOEXEC = 0o2000000
+    EVENT = struct.Struct("iIII")  # wd, mask, cookie, length of the name
+
+    def __init__(self, filename, on_change, logger):
+        self.filename = os.path.abspath(filename)
+        self.on_change = on_change
+        self.logger = logger
+        self._stop = threading.Event()
+        self._thread = None
+
+    def start(self):
+        self._stop.clear()
+        # watching before returning, so no change right after `start` is missed
+        fd = self._inotify()
+        self._thread = threading.Thread(
+            target=self._run, args=(fd,), name="config-watcher", daemon=True
+        )
+        self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join()
+            self._thread = None
+
+    def _changed(self):
+        try:
+            self.on_change()
+        except Exception as e:  # the watcher must survive a failed reload
+            self.logger.error("Failed to apply the changed config: %s", e)
+
+    def _run(self, fd):
+        if fd is None:
+            self.logger.debug("inotify is not available, polling %s", self.filename)
+            self._poll()
+            return
+        selector = selectors.DefaultSelector()
+        selector.register(fd, selectors.EVENT_READ)
+        try:
+            while not self._stop.is_set():
+                if not selector.select(1) or not self._read_events(fd):
+                    continue
+                # collapse the rest of the burst into this change
+                while selector.select(self.SETTLE_DELAY):
+                    self._read_events(fd)
+                if not self._stop.is_set():
+                    self._changed()
+        finally:
+            selector.close()
+            os.close(fd)
+
+    def _inotify(self):
+        """Return an inotify descriptor watching the directory, `None` if unavailable."""
+        import ctypes
+        import ctypes.util
+
+        try:
+            libc = ctypes.CDLL(ctypes.util.find_library("c"), use_errno=True)
+            fd = libc.inotify_init1(self.IN_NONBLOCK | self.IN_CLOEXEC)
+        except (OSError, AttributeError):
+            return None
+        if fd < 0:
+            return None
+        directory = os.path.dirname(self.filename).encode()
+        mask = self.IN_CLOSE_WRITE | self.IN_MOVED_TO | self.IN_CREATE
+        if libc.inotify_add_watch(fd, directory, mask) < 0:
+            os.close(fd)
+            return None
+        return fd
+
+    def _read_events(self, fd):
+        """Read the pending events, returns `True` if one is about the config file."""
+        try:
+            data = os.read(fd, 65536)
+        except BlockingIOError:
+            return False
+        name = os.path.basename(self.filename).encode()
+        offset, found = 0, False
+        while offset < len(data):
+            _, _, _, length = self.EVENT.unpack_from(data, offset)
+            offset += self.EVENT.size
+            if data[offset : offset + length].rstrip(b"\0") == name:
+                found = True
+            offset += length
+        return found
+
+    def _signature(self):
+        try:
+            stat = os.stat(self.filename)
+        except FileNotFoundError:
+            return None
+        return stat.st_mtime_ns, stat.st_size, stat.st_ino
+
+    def _poll(self):
+        signature = self._signature()
+        while not self._stop.wait(self.POLL_INTERVAL):
+            current = self._signature()
+            if current != signature and current is not None:
+                self._changed()
+            signature = current
+
+
+class _DeferredQueueHandler(logging.handlers.QueueHandler):
+    """Queues records without formatting them, `_LogListener` does that."""
+
+    def prepare(self, record):
+        # the queue never leaves the process, so the message is rendered in
+        # the listener thread instead of the caller's
+        return record
+
+
+class _LogListener(logging.handlers.QueueListener):
+    """Formats the queued records in its own thread and truncates long messages."""
+
+    def __init__(self, queue, *handlers, max_message_length=None):
+        super().__init__(queue, *handlers)
+        self.max_message_length = max_message_length
+
+    def prepare(self, record):
+        message = record.getMessage()
+        if self.max_message_length and len(message) > self.max_message_length:
+            message = (
+                message[: self.max_message_length]
+                + f"... [{len(message) - self.max_message_length} more characters]"
+            )
+        record.msg, record.args = message, None
+        return record
+
+    def stop(self):
+        if self._thread is not None:  # also registered with atexit
+            super().stop()
+
+
+class _JsonFormatter(logging.Formatter):
+    """Formats records as one JSON object per line."""
+
+    def format(self, record):
+        entry = {
+            "time": datetime.datetime.fromtimestamp(
+                record.created, datetime.timezone.utc
+            ).isoformat(),
+            "level": record.levelname,
+            "thread": record.threadName,
+            "message": record.getMessage(),
+        }
+        if record.exc_info:
+            entry["exception"] = self.formatException(record.exc_info)
+        return json.dumps(entry, ensure_ascii=False)
+
+
+class Tracer:
+    """Records nested spans around the phases and HTTP calls of a run.
+
+    A span has a name, its start, its duration, the thread it ran in, its
+    parent span and attributes (method, status, bytes, retries, ..) that the
+    code inside the span adds to the dict `span` yields. Spans nest per
+    thread, work handed to another thread names its `parent` explicitly. With
+    a `filename` ending in `.json` the spans are kept and written as a Chrome
+    trace (chrome://tracing, ui.perfetto.dev) by `close`, otherwise every span
+    is appended to the file as a JSON line when it ends, which suits the
+    daemon. Without a filename `span` records nothing.
+    """
+
+    def __init__(self, filename=None):
+        self.filename = filename
+        self.enabled = filename is not None
+        self.chrome = self.enabled and filename.endswith(".json")
+        self._local = threading.local()
+        self._ids = itertools.count(1)
+        self._lock = threading.Lock()
+        self._events = []  # Chrome trace events
+        self._threads = set()  # native ids of the threads named in `_events`
+        self._file = None
+        if self.enabled and not self.chrome:
+            self._file = open(filename, "a", buffering=1)
+
+    def current(self):
+        """Return the innermost open span of this thread, e.g. as `parent` for a worker."""
+        stack = getattr(self._local, "stack", None)
+        return stack[-1] if stack else None
+
+    @contextlib.contextmanager
+    def span(self, name, parent=None, **attributes):
+        if not self.enabled:
+            yield attributes
+            return
+        stack = self._local.__dict__.setdefault("stack", [])
+        parent = parent or (stack[-1] if stack else None)
+        span = {
+            "name": name,
+            "id": next(self._ids),
+            "parent": parent["id"] if parent else None,
+            "thread": threading.current_thread().name,
+            "start": time.time(),
+            "attributes": attributes,
+        }
+        stack.append(span)
+        start = time.perf_counter()
+        try:
+            yield attributes
+        except BaseException as e:
+            attributes["error"] = type(e).__name__
+            raise
+        finally:
+            span["duration"] = time.perf_counter() - start
+            stack.pop()
+            self._finish(span)
+
+    def _finish(self, span):
+        if not self.chrome:
+            line = json.dumps(
+                {
+                    **span,
+                    "start": round(span["start"], 6),
+                    "duration": round(span["duration"], 6),
+                }
+            )
+            with self._lock:
+                self._file.write(line + "\n")
+            return
+        thread = threading.get_native_id()
+        event = {
+            "name": span["name"],
+            "ph": "X",
+            "ts": round(span["start"] * 1e6),
+            "dur": round(span["duration"] * 1e6),
+            "pid": os.getpid(),
+            "tid": thread,
+            "args": {"id": span["id"], "parent": span["parent"], **span["attributes"]},
+        }
+        with self._lock:
+            if thread not in self._threads:
+                self._threads.add(thread)
+                self._events.append(
+                    {
+                        "name": "thread_name",
+                        "ph": "M",
+                        "pid": os.getpid(),
+                        "tid": thread,
+                        "args": {"name": span["thread"]},
+                    }
+                )
+            self._events.append(event)
+
+    def wrap_request(self, request):
+        """Return `httplib2.Http.request` wrapped in an `http` span."""
+
+        def traced(uri, method="GET", body=None, headers=None, *args, **kwargs):
+            with self.span(
+                "http",
+                method=method,
+                url=uri.split("?", 1)[0],
+                request_bytes=len(body or b""),
+            ) as span:
+                response, content = request(uri, method, body, headers, *args, **kwargs)
+                span["status"] = response.status
+                span["bytes"] = len(content or b"")
+                return response, content
+
+        return traced
+
+    def close(self):
+        if self._file is not None:
+            self._file.close()
+            self._file = None
+        if self.chrome:
+            with self._lock, open(self.filename, "w") as f:
+                json.dump({"traceEvents": self._events, "displayTimeUnit": "ms"}, f)
+
+
+class TokenBucket:
+    """Client side rate limiter shared by every thread of a manager.
+
+    Holds up to `rate` tokens (one second worth of requests) and refills them
+    continuously; `acquire` blocks until enough tokens are available. More
+    tokens than the bucket holds, e.g. for a batch, are taken over several
+    refills, so every request is charged.
+    """
+
+    def __init__(self, rate):
+        if rate <= 0:
+            raise ValueError(f"The rate must be above 0, got {rate}")
+        self.rate = rate
+        self.capacity = max(1, rate)
+        self._tokens = self.capacity
+        self._updated = time.monotonic()
+        self._lock = threading.Lock()
+
+    def acquire(self, tokens=1):
+        while tokens > 0:
+            needed = min(tokens, self.capacity)
+            with self._lock:
+                now = time.monotonic()
+                self._tokens = min(
+                    self.capacity, self._tokens + (now - self._updated) * self.rate
+                )
+                self._updated = now
+                if self._tokens >= needed:
+                    self._tokens -= needed
+                    tokens -= needed
+                    continue
+                wait = (needed - self._tokens) / self.rate
+            time.sleep(wait)
+
+
+class CredentialManager:
+    """Keeps the OAuth credentials in memory and refreshes them ahead of expiry.
+
+    A background timer refreshes the access token `REFRESH_MARGIN` seconds
+    before it expires, so API calls do not wait for a refresh. Refreshes hold a
+    lock on the token file: a process that gets the lock after another one
+    refreshed adopts the token from disk instead of refreshing again. The token
+    file is written with a write-rename and only when its content changed.
+    """
+
+    REFRESH_MARGIN = 300  # seconds before expiry the token is refreshed
+    RETRY_DELAY = 30  # seconds before a failed background refresh is retried
+
+    def __init__(self, filename, scopes, logger, metrics=None):
+        self.filename = filename
+        self.scopes = scopes
+        self.logger = logger
+        self.metrics = metrics
+        self.credentials = None
+        self._lock = threading.RLock()
+        self._timer = None
+
+    def load(self):
+        """Read the credentials from the token file, `None` if there is none."""
+        from google.oauth2.credentials import Credentials
+
+        with self._lock:
+            if os.path.exists(self.filename):
+                self.credentials = Credentials.from_authorized_user_file(
+                    self.filename, self.scopes
+                )
+            return self.credentials
+
+    def _seconds_left(self, credentials):
+        if credentials.expiry is None:
+            return float("inf")
+        # google-auth uses naive UTC datetimes
+        now = datetime.datetime.now(datetime.timezone.utc).replace(tzinfo=None)
+        return (credentials.expiry - now).total_seconds()
+
+    def refresh(self, margin=0):
+        """Make sure the token is valid for at least `margin` more seconds."""
+        from google.auth.transport.requests import Request
+        from google.oauth2.credentials import Credentials
+
+        with self._lock, open(self.filename + ".lock", "a") as lock_file:
+            fcntl.flock(lock_file, fcntl.LOCK_EX)
+            if os.path.exists(self.filename):
+                # another process may have refreshed while we waited for the lock
+                on_disk = Credentials.from_authorized_user_file(self.filename, self.scopes)
+                if (
+                    on_disk.token
+                    and self._seconds_left(on_disk) > margin
+                    and self._seconds_left(on_disk) > self._seconds_left(self.credentials)
+                ):
+                    self.logger.debug("Using the token refreshed by another process")
+                    # update in place, the authorized transports hold this object
+                    self.credentials.token = on_disk.token
+                    self.credentials.expiry = on_disk.expiry
+                    self._count_refresh("adopted")
+                    return self.credentials
+            if self._seconds_left(self.credentials) <= margin or not self.credentials.valid:
+                self.logger.debug("Refreshing token...")
+                try:
+                    self.credentials.refresh(Request())
+                except Exception:
+                    self._count_refresh("failed")
+                    raise
+                self._count_refresh("ok")
+            # also persists a token refreshed by the transport after a 401
+            self.save(self.credentials)
+            return self.credentials
+
+    def _count_refresh(self, result):
+        if self.metrics is not None:
+            self.metrics.token_refreshes.labels(result).inc()
+
+    def save(self, credentials):
+        """Write the credentials to the token file, returns `False` if unchanged."""
+        data = credentials.to_json()
+        with self._lock:
+            self.credentials = credentials
+            try:
+                with open(self.filename, "r") as f:
+                    if self._comparable(f.read()) == self._comparable(data):
+                        return False
+            except (FileNotFoundError, ValueError):
+                pass
+            tmp_filename = self.filename + ".tmp"
+            with open(
+                os.open(tmp_filename, os.O_WRONLY | os.O_CREAT | os.O_TRUNC, 0o600), "w"
+            ) as f:
+                f.write(data)
+                f.flush()
+                os.fsync(f.fileno())
+            os.replace(tmp_filename, self.filename)
+            self.logger.debug("Token written to `%s`", self.filename)
+            return True
+
+    def _comparable(self, data):
+        # the token file only stores the expiry with second precision
+        token = json.loads(data)
+        token["expiry"] = (token.get("expiry") or "")[:19]
+        return token
+
+    def start_background_refresh(self, delay=None):
+        """(Re)schedule the refresh `REFRESH_MARGIN` seconds before expiry."""
+        with self._lock:
+            self.stop_background_refresh()
+            credentials = self.credentials
+            if credentials is None or not credentials.refresh_token:
+                return
+            if delay is None:
+                if credentials.expiry is None:
+                    return
+                delay = max(0, self._seconds_left(credentials) - self.REFRESH_MARGIN)
+            self._timer = threading.Timer(delay, self._background_refresh)
+            self._timer.daemon = True
+            self._timer.start()
+
+    def stop_background_refresh(self):
+        with self._lock:
+            if self._timer is not None:
+                self._timer.cancel()
+                self._timer = None
+
+    def _background_refresh(self):
+        try:
+            self.refresh(self.REFRESH_MARGIN)
+            self.logger.debug("Token refreshed in the background")
+        except Exception as e:
+            self.logger.error("Error renewing token in the background: %s", e)
+            self.start_background_refresh(self.RETRY_DELAY)
+            return
+        self.start_background_refresh()
+
+
+class HealthHistory:
+    """Ring file of fixed-width stream health samples, memory-mapped.
+
+    The file is preallocated to `capacity` records behind a one page header,
+    so its size never changes; once it is full the oldest samples are
+    overwritten. Statuses are stored as one byte codes and configuration
+    issues as a bit mask of their types, 24 bytes per sample. Samples are
+    appended in time order, so the start of a time range is found with a
+    binary search and the range is aggregated record by record straight from
+    the mapping. Writers and readers of different processes take an
+    exclusive or shared lock on the file.
+    """
+
+    MAGIC = b"YTHH"
+    VERSION = 1
+    HEADER = struct.Struct("<4sHHIQ")  # magic, version, record size, capacity, samples written
+    COUNT = struct.Struct("<Q")
+    COUNT_OFFSET = 12
+    NAMES_OFFSET = 64  # table of the stream names, a record refers to its index
+    NAME_SIZE = 64
+    HEADER_SIZE = 4096
+    MAX_STREAMS = (HEADER_SIZE - NAMES_OFFSET) // NAME_SIZE
+    # time, stream, stream/health/lifecycle/encoder status, issue count, issue type mask
+    RECORD = struct.Struct("<dBBBBBxHQ")
+    UNKNOWN = 255  # a status this version does not know
+    STREAM_STATUS = [None, "active", "created", "error", "inactive", "ready"]
+    HEALTH_STATUS = [None, "good", "ok", "bad", "noData", "revoked"]
+    LIFE_CYCLE_STATUS = [
+        None,
+        "complete",
+        "created",
+        "live",
+        "liveStarting",
+        "ready",
+        "revoked",
+        "testStarting",
+        "testing",
+    ]
+    ENCODER_STATUS = [None, "starting", "running", "stalled", "restarting", "stopped"]
+    # configuration issue types by bit, every other type sets the last bit
+    ISSUE_TYPES = [
+        "audioBitrateHigh",
+        "audioBitrateLow",
+        "audioBitrateMismatch",
+        "audioCodec",
+        "audioCodecMismatch",
+        "audioSampleRate",
+        "audioSampleRateMismatch",
+        "audioStereoMismatch",
+        "audioTooManyChannels",
+        "badContainer",
+        "bitrateHigh",
+        "bitrateLow",
+        "frameRateHigh",
+        "framerateMismatch",
+        "gopMismatch",
+        "gopSizeLong",
+        "gopSizeOver",
+        "gopSizeShort",
+        "interlacedVideo",
+        "multipleAudioStreams",
+        "multipleVideoStreams",
+        "noAudioStream",
+        "noVideoStream",
+        "openGop",
+        "resolutionMismatch",
+        "videoBitrateMismatch",
+        "videoCodec",
+        "videoCodecMismatch",
+        "videoIngestionStarved",
+        "videoInterlaceMismatch",
+        "videoProfileMismatch",
+        "videoResolutionSuboptimal",
+        "videoResolutionUnsupported",
+    ]
+    OTHER_ISSUE_BIT = 63
+
+    def __init__(self, filename, capacity, logger):
+        self.filename = filename
+        self.capacity = capacity
+        self.logger = logger
+        self._lock = threading.Lock()
+        size = self.HEADER_SIZE + capacity * self.RECORD.size
+        self._file = open(os.open(filename, os.O_RDWR | os.O_CREAT, 0o644), "r+b")
+        with self._locked(fcntl.LOCK_EX):
+            expected = (self.MAGIC, self.VERSION, self.RECORD.size, capacity)
+            header = self._file.read(self.HEADER.size)
+            if len(header) < self.HEADER.size or self.HEADER.unpack(header)[:4] != expected:
+                if header:
+                    self.logger.warning(
+                        "Starting a new health history, `%s` has a different size or layout",
+                        filename,
+                    )
+                self._file.truncate(0)
+                self._file.truncate(size)  # sparse, blocks are allocated as samples arrive
+                self._file.seek(0)
+                self._file.write(self.HEADER.pack(*expected, 0))
+                self._file.flush()
+            self._map = mmap.mmap(self._file.fileno(), size)
+
+    def close(self):
+        self._map.close()
+        self._file.close()
+
+    @contextlib.contextmanager
+    def _locked(self, mode):
+        fcntl.flock(self._file, mode)
+        try:
+            yield
+        finally:
+            fcntl.flock(self._file, fcntl.LOCK_UN)
+
+    def _code(self, values, value):
+        try:
+            return values.index(value)
+        except ValueError:
+            return self.UNKNOWN
+
+    def _names(self):
+        names = []
+        for i in range(self.MAX_STREAMS):
+            offset = self.NAMES_OFFSET + i * self.NAME_SIZE
+            name = self._map[offset : offset + self.NAME_SIZE].rstrip(b"\0")
+            if not name:
+                break
+            names.append(name.decode("utf-8"))
+        return names
+
+    def _stream_index(self, names, name):
+        """Return the index of a stream name, adding it to the table, must hold the lock."""
+        if name in names:
+            return names.index(name)
+        if len(names) == self.MAX_STREAMS:
+            return self.UNKNOWN
+        encoded = name.encode("utf-8")[: self.NAME_SIZE]
+        offset = self.NAMES_OFFSET + len(names) * self.NAME_SIZE
+        self._map[offset : offset + len(encoded)] = encoded
+        names.append(name)
+        return len(names) - 1
+
+    def append(self, samples):
+        """Record `(stream, health)` pairs, `health` as reported by `poll_health`."""
+        now = time.time()
+        with self._lock, self._locked(fcntl.LOCK_EX):
+            names = self._names()
+            (count,) = self.COUNT.unpack_from(self._map, self.COUNT_OFFSET)
+            for name, health in samples:
+                mask = 0
+                for issue in health["configuration_issues"]:
+                    bit = self._code(self.ISSUE_TYPES, issue["type"])
+                    mask |= 1 << (bit if bit != self.UNKNOWN else self.OTHER_ISSUE_BIT)
+                self.RECORD.pack_into(
+                    self._map,
+                    self.HEADER_SIZE + count % self.capacity * self.RECORD.size,
+                    now,
+                    self._stream_index(names, name),
+                    self._code(self.STREAM_STATUS, health["stream_status"]),
+                    self._code(self.HEALTH_STATUS, health["health_status"]),
+                    self._code(self.LIFE_CYCLE_STATUS, health["broadcast_status"]),
+                    self._code(self.ENCODER_STATUS, health.get("encoder_status")),
+                    min(len(health["configuration_issues"]), 0xFFFF),
+                    mask,
+                )
+                count += 1
+            self.COUNT.pack_into(self._map, self.COUNT_OFFSET, count)
+
+    def _time_at(self, first, index):
+        return self.RECORD.unpack_from(
+            self._map, self.HEADER_SIZE + (first + index) % self.capacity * self.RECORD.size
+        )[0]
+
+    def _records(self, since):
+        """Yield the raw records from `since` on, oldest first, must hold the lock."""
+        (count,) = self.COUNT.unpack_from(self._map, self.COUNT_OFFSET)
+        stored = min(count, self.capacity)
+        first = count - stored
+        low, high = 0, stored
+        while low < high:
+            middle = (low + high) // 2
+            if self._time_at(first, middle) < since:
+                low = middle + 1
+            else:
+                high = middle
+        for index in range(low, stored):
+            yield self.RECORD.unpack_from(
+                self._map,
+                self.HEADER_SIZE + (first + index) % self.capacity * self.RECORD.size,
+            )
+
+    def summarize(self, since, max_gap, stream=None):
+        """Aggregate the samples since the timestamp `since` per stream.
+
+        Returns `{stream: report}` with the monitored and up seconds, the
+        outage windows and how many samples had each configuration issue.
+        Time between two samples further apart than `max_gap` seconds counts
+        as unmonitored.
+        """
+        up_stream = [
+            self._code(self.STREAM_STATUS, status)
+            for status in YouTubeStreamManager.STEADY_STREAM_STATUS
+        ]
+        up_health = [
+            self._code(self.HEALTH_STATUS, status)
+            for status in YouTubeStreamManager.STEADY_HEALTH_STATUS
+        ]
+        states = {}
+        with self._lock, self._locked(fcntl.LOCK_SH):
+            names = self._names()
+            if stream is not None and stream not in names:
+                return {}
+            wanted = names.index(stream) if stream is not None else None
+            for record in self._records(since):
+                timestamp, index, stream_code, health_code, life_cycle_code, _, _, mask = record
+                if wanted is not None and index != wanted:
+                    continue
+                state = states.get(index)
+                if state is None:
+                    state = states[index] = {
+                        "samples": 0,
+                        "monitored_seconds": 0.0,
+                        "up_seconds": 0.0,
+                        "first_sample": timestamp,
+                        "last_sample": timestamp,
+                        "outages": [],
+                        "issues": collections.Counter(),
+                        "up": None,
+                        "outage": None,
+                    }
+                elif timestamp - state["last_sample"] <= max_gap:
+                    state["monitored_seconds"] += timestamp - state["last_sample"]
+                    if state["up"]:
+                        state["up_seconds"] += timestamp - state["last_sample"]
+                state["samples"] += 1
+                state["last_sample"] = timestamp
+                state["up"] = stream_code in up_stream and health_code in up_health
+                if state["up"] and state["outage"] is not None:
+                    state["outage"]["end"] = timestamp
+                    state["outages"].append(state["outage"])
+                    state["outage"] = None
+                elif not state["up"] and state["outage"] is None:
+                    state["outage"] = {
+                        "start": timestamp,
+                        "end": None,
+                        "cause": self._cause(stream_code, health_code, life_cycle_code),
+                    }
+                while mask:
+                    bit = mask.bit_length() - 1
+                    state["issues"][bit] += 1
+                    mask ^= 1 << bit
+
+        summary = {}
+        for index, state in states.items():
+            name = names[index] if index < len(names) else "unknown"
+            if state["outage"] is not None:  # still down at the last sample
+                state["outage"]["end"] = state["last_sample"]
+                state["outage"]["ongoing"] = True
+                state["outages"].append(state["outage"])
+            for outage in state["outages"]:
+                outage["seconds"] = round(outage["end"] - outage["start"], 1)
+            summary[name] = {
+                "samples": state["samples"],
+                "first_sample": state["first_sample"],
+                "last_sample": state["last_sample"],
+                "monitored_seconds": round(state["monitored_seconds"], 1),
+                "up_seconds": round(state["up_seconds"], 1),
+                "uptime_percent": round(
+                    100 * state["up_seconds"] / state["monitored_seconds"], 3
+                )
+                if state["monitored_seconds"]
+                else None,
+                "outages": state["outages"],
+                "configuration_issues": {
+                    self.ISSUE_TYPES[bit] if bit < len(self.ISSUE_TYPES) else "other": samples
+                    for bit, samples in state["issues"].most_common()
+                },
+            }
+        return summary
+
+    def _status(self, values, code):
+        return "unknown" if code == self.UNKNOWN else values[code]
+
+    def _cause(self, stream_code, health_code, life_cycle_code):
+        return (
+            f"stream {self._status(self.STREAM_STATUS, stream_code)} "
+            f"({self._status(self.HEALTH_STATUS, health_code)}), "
+            f"broadcast {self._status(self.LIFE_CYCLE_STATUS, life_cycle_code)}"
+        )
+
+
+class BroadcastStateStore:
+    """Append-only journal of broadcast lifecycle events.
+
+    Every event is one JSON line, appended under an exclusive file lock and
+    fsynced before `append` returns. The journal is replayed on start up and
+    events appended by other processes are picked up incrementally, so the
+    current broadcast of every stream is known without parsing the config.
+    Once the journal grows past `COMPACT_AFTER` lines it is rewritten as one
+    snapshot line per broadcast and atomically renamed over the old file.
+
+    Broadcasts prepared for the pool are journaled as `pooled` and only become
+    the current broadcast of their stream when they are `claimed`.
+    """
+
+    COMPACT_AFTER = 1000  # journal lines before the journal is compacted
+    KEEP_DAYS = 30  # completed broadcasts older than this are dropped by compaction
+
+    def __init__(self, filename, logger):
+        self.filename = filename
+        self.logger = logger
+        self._lock = threading.Lock()
+        self._reset(None)
+        with self._lock, self._locked(fcntl.LOCK_SH):
+            self._catch_up()
+
+    def _reset(self, inode):
+        self._broadcasts = {}  # broadcast_id -> state
+        self._current = {}  # stream -> id of the broadcast created last
+        self._offset = 0
+        self._lines = 0
+        self._inode = inode
+
+    @contextlib.contextmanager
+    def _locked(self, mode):
+        with open(self.filename + ".lock", "a") as lock_file:
+            fcntl.flock(lock_file, mode)
+            yield
+
+    def _catch_up(self):
+        """Apply the events appended since the last read, by any process."""
+        try:
+            f = open(self.filename, "rb")
+        except FileNotFoundError:
+            self._reset(None)
+            return
+        with f:
+            inode = os.fstat(f.fileno()).st_ino
+            if inode != self._inode:  # first read or compacted by another process
+                self._reset(inode)
+            f.seek(self._offset)
+            for line in f:
+                if not line.endswith(b"\n"):
+                    break  # torn write of a crashed process, cut off by the next append
+                try:
+                    self._apply(json.loads(line))
+                except (ValueError, KeyError) as e:
+                    self.logger.warning(
+                        "Skipping corrupt line in `%s`: %s", self.filename, e
+                    )
+                self._offset += len(line)
+                self._lines += 1
+
+    def _apply(self, event):
+        broadcast_id = event["broadcast_id"]
+        kind = event["event"]
+        if kind == "snapshot":
+            self._broadcasts[broadcast_id] = event["state"]
+            if event["current"]:
+                self._current[event["state"]["stream"]] = broadcast_id
+            return
+        if kind == "created":
+            self._broadcasts[broadcast_id] = {
+                "broadcast_id": broadcast_id,
+                "stream": event["stream"],
+                "status": "created",
+                "created": event["time"],
+                "title": event.get("title"),
+                "description": event.get("description"),
+                "bound": False,
+                "metadata": False,
+            }
+            self._current[event["stream"]] = broadcast_id
+        elif kind == "pooled":
+            self._broadcasts[broadcast_id] = {
+                "broadcast_id": broadcast_id,
+                "stream": event["stream"],
+                "status": "pooled",
+                "created": None,  # set when claimed
+                "pooled": event["time"],
+                "title": event.get("title"),
+                "description": event.get("description"),
+                "bound": False,
+                "metadata": False,
+            }
+        elif kind == "claimed":
+            self._broadcasts[broadcast_id].update(
+                status="created",
+                created=event["time"],
+                title=event.get("title"),
+                description=event.get("description"),
+            )
+            self._current[event["stream"]] = broadcast_id
+        state = self._broadcasts.setdefault(
+            broadcast_id,
+            {
+                "broadcast_id": broadcast_id,
+                "stream": event["stream"],
+                "status": None,
+                "created": None,
+            },
+        )
+        if kind in ["bound", "metadata"]:
+            state[kind] = True
+        elif kind in ["live", "complete", "stale", "deleted"]:
+            state["status"] = kind
+        state["updated"] = event["time"]
+
+    def append(self, event, stream, broadcast_id, **data):
+        """Durably record one lifecycle event of a broadcast."""
+        self.append_many([(event, stream, broadcast_id, data)])
+
+    def append_many(self, events):
+        """Durably record `(event, stream, broadcast_id, data)` tuples with one fsync."""
+        if not events:
+            return
+        records = [
+            dict(data, time=time.time(), event=event, stream=stream, broadcast_id=broadcast_id)
+            for event, stream, broadcast_id, data in events
+        ]
+        with self._lock, self._locked(fcntl.LOCK_EX):
+            self._catch_up()
+            self._write(records)
+
+    def _write(self, records):
+        """Append and apply records, must hold the locks and be caught up."""
+        lines = b"".join(json.dumps(record).encode("utf-8") + b"\n" for record in records)
+        with open(self.filename, "ab") as f:
+            if f.tell() != self._offset:
+                f.truncate(self._offset)
+            f.write(lines)
+            f.flush()
+            os.fsync(f.fileno())
+            self._inode = os.fstat(f.fileno()).st_ino
+        self._offset += len(lines)
+        self._lines += len(records)
+        for record in records:
+            self._apply(record)
+        if self._lines > self.COMPACT_AFTER:
+            self._compact()
+
+    def _compact(self):
+        """Rewrite the journal as one snapshot per broadcast, must hold the locks."""
+        cutoff = time.time() - self.KEEP_DAYS * 24 * 60 * 60
+        current = set(self._current.values())
+        states = sorted(
+            self._broadcasts.values(), key=lambda state: state.get("created") or 0
+        )
+        tmp_filename = self.filename + ".tmp"
+        with open(tmp_filename, "wb") as f:
+            for state in states:
+                if state["status"] == "deleted" or (
+                    state["status"] == "complete"
+                    and state["updated"] < cutoff
+                    and state["broadcast_id"] not in current
+                ):
+                    continue
+                snapshot = {
+                    "time": time.time(),
+                    "event": "snapshot",
+                    "broadcast_id": state["broadcast_id"],
+                    "current": state["broadcast_id"] in current,
+                    "state": state,
+                }
+                f.write(json.dumps(snapshot).encode("utf-8") + b"\n")
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp_filename, self.filename)
+        dir_fd = os.open(os.path.dirname(self.filename) or ".", os.O_RDONLY)
+        try:
+            os.fsync(dir_fd)
+        finally:
+            os.close(dir_fd)
+        self._reset(None)
+        self._catch_up()
+        self.logger.debug("Compacted `%s` to %d lines", self.filename, self._lines)
+
+    def current(self, stream):
+        """Return the state of the broadcast created last for `stream`, if any."""
+        with self._lock, self._locked(fcntl.LOCK_SH):
+            self._catch_up()
+            broadcast_id = self._current.get(stream)
+            return dict(self._broadcasts[broadcast_id]) if broadcast_id else None
+
+    def pool(self, stream):
+        """Return the states of the pooled (and stale) broadcasts of `stream`, oldest first."""
+        with self._lock, self._locked(fcntl.LOCK_SH):
+            self._catch_up()
+            return sorted(
+                (
+                    dict(state)
+                    for state in self._broadcasts.values()
+                    if state["stream"] == stream and state["status"] in ["pooled", "stale"]
+                ),
+                key=lambda state: state["pooled"],
             )
+
+    def with_status(self, statuses):
+        """Return the states of the broadcasts of every stream in one of `statuses`."""
+        with self._lock, self._locked(fcntl.LOCK_SH):
+            self._catch_up()
+            return [
+                dict(state)
+                for state in self._broadcasts.values()
+                if state["status"] in statuses
+            ]
+
+    def broadcast_ids(self):
+        """Return the ids of every broadcast in the journal, whatever its status."""
+        with self._lock, self._locked(fcntl.LOCK_SH):
+            self._catch_up()
+            return set(self._broadcasts)
+
+    def open_broadcasts(self, stream):
+        """Return the states of the claimed or created broadcasts of `stream` not yet complete."""
+        with self._lock, self._locked(fcntl.LOCK_SH):
+            self._catch_up()
+            return [
+                dict(state)
+                for state in self._broadcasts.values()
+                if state["stream"] == stream and state["status"] in ["created", "live"]
+            ]
+
+    def claim(self, stream, pooled_after, **data):
+        """Make the oldest ready pooled broadcast of `stream` its current one.
+
+        Only broadcasts pooled after the timestamp `pooled_after` are claimed.
+        Picking and journaling happen under the exclusive lock, so concurrent
+        processes never claim the same broadcast. Returns its state or `None`.
+        """
+        with self._lock, self._locked(fcntl.LOCK_EX):
+            self._catch_up()
+            for state in sorted(
+                self._broadcasts.values(), key=lambda state: state.get("pooled") or 0
+            ):
+                if (
+                    state["stream"] == stream
+                    and state["status"] == "pooled"
+                    and state["bound"]
+                    and state["metadata"]
+                    and state["pooled"] > pooled_after
+                ):
+                    self._write(
+                        [
+                            dict(
+                                data,
+                                time=time.time(),
+                                event="claimed",
+                                stream=stream,
+                                broadcast_id=state["broadcast_id"],
+                            )
+                        ]
+                    )
+                    return dict(self._broadcasts[state["broadcast_id"]])
             return None
 
-    def _check_broadcast_status(self):
+    def created_on(self, date, timezone):
+        """Return the states of all broadcasts created on `date` in `timezone`."""
+        with self._lock, self._locked(fcntl.LOCK_SH):
+            self._catch_up()
+            return [
+                dict(state)
+                for state in self._broadcasts.values()
+                if state.get("created") is not None
+                and datetime.datetime.fromtimestamp(state["created"], timezone).date()
+                == date
+            ]
+
+
+class QuotaBudgetExceeded(Exception):
+    """Raised instead of executing a low priority call that would exceed the budget."""
+
+
+class QuotaLedger:
+    """Daily ledger of the YouTube Data API quota spent by this program.
+
+    YouTube resets the quota at midnight Pacific time, so the ledger starts a
+    new day at that boundary as well. The ledger file is shared by every
+    process (CLI runs and the daemon). Calls are counted in memory and merged
+    into it under a file lock every `FLUSH_INTERVAL` seconds, before the usage
+    is reported and at exit, written with a write-rename so readers never see
+    a partial file.
+    """
+
+    QUOTA_TIMEZONE = "America/Los_Angeles"
+    FLUSH_INTERVAL = 10  # seconds calls may stay unrecorded in the ledger file
+    PRIORITY_NORMAL = "normal"
+    PRIORITY_LOW = "low"
+
+    DEFAULT_COST = 1  # `list` calls and everything not listed below
+    COSTS = {
+        "youtube.liveBroadcasts.insert": 50,
+        "youtube.liveBroadcasts.update": 50,
+        "youtube.liveBroadcasts.bind": 50,
+        "youtube.liveBroadcasts.transition": 50,
+        "youtube.liveBroadcasts.delete": 50,
+        "youtube.liveStreams.insert": 50,
+        "youtube.liveStreams.update": 50,
+        "youtube.liveStreams.delete": 50,
+        "youtube.videos.update": 50,
+    }
+
+    def __init__(self, filename, budget, low_priority_share, logger):
+        self.filename = filename
+        self.budget = budget
+        self.low_priority_share = low_priority_share
+        self.logger = logger
+        self._lock = threading.Lock()
+        self._ledger = self._read()
+        self._pending = None  # calls not merged into the file yet, of one day
+        self._flushed = time.monotonic()
+        atexit.register(self.flush)
+
+    def cost(self, method):
+        return self.COSTS.get(method, self.DEFAULT_COST)
+
+    def _today(self):
+        return datetime.datetime.now(ZoneInfo(self.QUOTA_TIMEZONE)).date().isoformat()
+
+    def _empty(self):
+        return {"day": self._today(), "units": 0, "methods": {}}
+
+    def _read(self):
         try:
-            # Get the broadcast details to check if it's receiving a stream
-            request = self.youtube.liveBroadcasts().list(
-                part="status", id=self.broadcast_id
+            with open(self.filename, "r") as f:
+                ledger = json.load(f)
+        except FileNotFoundError:
+            return self._empty()
+        except (OSError, ValueError) as e:
+            self.logger.warning(
+                "Starting a new quota ledger, `%s` is unreadable: %s", self.filename, e
             )
-            response = request.execute()
+            return self._empty()
+        if ledger.get("day") != self._today():
+            return self._empty()
+        return ledger
 
-            # Check if the broadcast is ready and receiving a stream
-            if response["items"]:
-                status = response["items"][0]["status"]["lifeCycleStatus"]
-                self.logger.info(f"Broadcast {self.broadcast_id} status: {status}")
-                return status
-            else:
-                self.logger.error(f"Broadcast {self.broadcast_id} not found.")
+    def check(self, method, cost, priority):
+        """Raise `QuotaBudgetExceeded` if a low priority call would exceed its share."""
+        if priority != self.PRIORITY_LOW:
+            return
+        with self._lock:
+            if self._ledger["day"] != self._today():
+                self._ledger = self._empty()
+            units = self._ledger["units"]
+        limit = self.budget * self.low_priority_share
+        if units + cost > limit:
+            raise QuotaBudgetExceeded(
+                f"`{method}` would raise the quota used today to {units + cost} units, low priority calls are limited to {limit:.0f}"
+            )
+
+    def record(self, method, cost, latency, error=None):
+        """Add one executed call to the ledger, `error` is the failure reason if any."""
+        self.logger.debug(
+            "%s: %d quota units, %.0fms, %s", method, cost, latency * 1000, error or "ok"
+        )
+        with self._lock:
+            if self._ledger["day"] != self._today():
+                self._ledger = self._empty()
+            if self._pending is None or self._pending["day"] != self._ledger["day"]:
+                self._pending = self._empty()
+            for ledger in [self._ledger, self._pending]:
+                self._add(ledger, method, cost, latency, error)
+            if time.monotonic() - self._flushed >= self.FLUSH_INTERVAL:
+                self._flush()
+
+    def _add(self, ledger, method, cost, latency, error):
+        ledger["units"] += cost
+        entry = ledger["methods"].setdefault(
+            method, {"calls": 0, "units": 0, "latency": 0.0, "errors": {}}
+        )
+        entry["calls"] += 1
+        entry["units"] += cost
+        entry["latency"] += latency
+        if error is not None:
+            entry["errors"][error] = entry["errors"].get(error, 0) + 1
+
+    def flush(self):
+        """Merge the calls counted in memory into the ledger file."""
+        with self._lock:
+            if self._pending is not None:
+                self._flush()
+
+    def close(self):
+        """Flush now instead of at exit, e.g. before the ledger file is removed."""
+        atexit.unregister(self.flush)
+        self.flush()
+
+    def _flush(self):
+        """Merge the pending calls into the file and reread it, must hold `_lock`."""
+        pending, self._pending = self._pending, None
+        self._flushed = time.monotonic()
+        try:
+            with open(self.filename + ".lock", "w") as lock_file:
+                fcntl.flock(lock_file, fcntl.LOCK_EX)
+                ledger = self._read()  # merge with calls recorded by other processes
+                # calls of a day that has ended no longer count
+                if pending is not None and pending["day"] == ledger["day"]:
+                    ledger["units"] += pending["units"]
+                    for method, counts in pending["methods"].items():
+                        entry = ledger["methods"].setdefault(
+                            method, {"calls": 0, "units": 0, "latency": 0.0, "errors": {}}
+                        )
+                        for key in ["calls", "units", "latency"]:
+                            entry[key] += counts[key]
+                        for error, number in counts["errors"].items():
+                            entry["errors"][error] = entry["errors"].get(error, 0) + number
+                    tmp_filename = self.filename + ".tmp"
+                    with open(tmp_filename, "w") as f:
+                        json.dump(ledger, f, indent=4)
+                    os.replace(tmp_filename, self.filename)
+        except OSError as e:
+            self.logger.error("Failed to write quota ledger `%s`: %s", self.filename, e)
+            self._pending = pending  # written with the next flush
+            return
+        self._ledger = ledger
+
+    def usage(self):
+        """Return the ledger of today together with the configured budget."""
+        with self._lock:
+            self._flush()
+            usage = dict(self._ledger)
+        usage["budget"] = self.budget
+        usage["low_priority_limit"] = self.budget * self.low_priority_share
+        return usage
+
+
+class ResponseCache:
+    """LRU cache of `list` responses, revalidated with their ETag.
+
+    A cached response is never used without asking YouTube: the request is
+    sent with `If-None-Match` and only a `304 Not Modified` answer, which has
+    no body, is answered from the cache. That saves transferring and parsing
+    unchanged responses, e.g. the health of streams that are running fine.
+    Entries expire `ttl` seconds after they were last validated and the least
+    recently used ones are evicted beyond `max_entries`. With a `filename` the
+    cache is loaded on start up and written back with a write-rename when the
+    program exits, so consecutive CLI runs share it.
+    """
+
+    VERSION = 1  # bump when the layout of the cache file changes
+
+    def __init__(self, max_entries, ttl, filename, logger):
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self.filename = filename
+        self.logger = logger
+        self._lock = threading.Lock()
+        self._entries = collections.OrderedDict()  # key -> {etag, body, validated}
+        self._dirty = False
+        if filename is not None:
+            self._load()
+            atexit.register(self.save)
+
+    def key(self, request):
+        """Return the cache key of a request, its method and every parameter."""
+        return f"{request.methodId} {request.uri}"
+
+    def get(self, key):
+        """Return the unexpired entry of `key` or `None`."""
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
                 return None
-        except HttpError as e:
-            self.logger.error(f"Error checking broadcast status: {e}")
-            return None
+            if time.time() - entry["validated"] > self.ttl:
+                del self._entries[key]
+                self._dirty = True
+                return None
+            self._entries.move_to_end(key)
+            return entry
+
+    def put(self, key, body):
+        """Store a fresh response, responses without an `etag` are not cached."""
+        if not isinstance(body, dict) or "etag" not in body:
+            return
+        with self._lock:
+            self._entries[key] = {
+                "etag": body["etag"],
+                "body": body,
+                "validated": time.time(),
+            }
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+            self._dirty = True
+
+    def revalidated(self, key, entry):
+        """Mark `entry` as confirmed by a 304 answer and return its body."""
+        with self._lock:
+            entry["validated"] = time.time()
+            # evicted by another thread in the meantime
+            self._entries[key] = entry
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+            self._dirty = True
+        return entry["body"]
 
-    def _advance_broadcast(self):
+    def _load(self):
         try:
-            # Transition the broadcast to "live"
-            request = self.youtube.liveBroadcasts().transition(
-                part="status", broadcastStatus="testing", id=self.broadcast_id
+            with open(self.filename, "r") as f:
+                data = json.load(f)
+        except FileNotFoundError:
+            return
+        except (OSError, ValueError) as e:
+            self.logger.warning(
+                "Ignoring unreadable response cache `%s`: %s", self.filename, e
             )
-            response = request.execute()
-            self.logger.info(response)
-            self.logger.info(f"Broadcast {self.broadcast_id} started manually.")
-            return response
-        except Exception as e:
-            self.logger.error(f"Error starting broadcast {self.broadcast_id}: {e}")
-            return None
+            return
+        if data.get("version") != self.VERSION:
+            return
+        now = time.time()
+        for key, entry in data["entries"]:
+            if now - entry["validated"] <= self.ttl:
+                self._entries[key] = entry
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
 
-    def update_video_metadata(self):
+    def save(self):
+        """Write the cache to its file if it changed, least recently used first.
+
+        Only the owner may read the file, the cached streams hold their keys.
+        """
+        with self._lock:
+            if self.filename is None or not self._dirty:
+                return
+            data = {"version": self.VERSION, "entries": list(self._entries.items())}
+            self._dirty = False
+        tmp_filename = self.filename + ".tmp"
         try:
-            snippet = {}
-            snippet["title"] = self.video_title
-            snippet["description"] = self.config[self.CONF_STREAM_SETTINGS][
-                self.CONF_DESCRIPTION
-            ]
-            snippet["tags"] = self.config[self.CONF_STREAM_SETTINGS][self.CONF_TAGS]
-            snippet["categoryId"] = self.config[self.CONF_STREAM_SETTINGS][
-                self.CONF_CATEGORY
-            ]
+            with open(
+                os.open(tmp_filename, os.O_WRONLY | os.O_CREAT | os.O_TRUNC, 0o600), "w"
+            ) as f:
+                json.dump(data, f)
+            os.replace(tmp_filename, self.filename)
+        except OSError as e:
+            self.logger.warning(
+                "Failed to write response cache `%s`: %s", self.filename, e
+            )
 
-            request = self.youtube.videos().update(
-                part="snippet",
-                body={
-                    "id": self.broadcast_id,
-                    "snippet": snippet,
-                },
+
+class _Metric:
+    """One counter, gauge or histogram with a child per combination of label values."""
+
+    def __init__(self, name, kind, help, labels, buckets=None):
+        self.name = name
+        self.kind = kind
+        self.help = help
+        self.label_names = labels
+        self.buckets = buckets
+        self._children = {}
+        self._lock = threading.Lock()
+        if not labels:
+            self._default = self.labels()
+
+    def labels(self, *values):
+        """Return the child of the label values, created on first use."""
+        child = self._children.get(values)
+        if child is None:
+            with self._lock:
+                child = self._children.setdefault(values, _MetricChild(self.buckets))
+        return child
+
+    # the metric without labels records into its only child
+    def inc(self, amount=1):
+        self._default.inc(amount)
+
+    def set(self, value):
+        self._default.set(value)
+
+    def observe(self, value):
+        self._default.observe(value)
+
+    def render(self, lines):
+        lines.append(f"# HELP {self.name} {self.help}")
+        lines.append(f"# TYPE {self.name} {self.kind}")
+        for values, child in list(self._children.items()):
+            labels = ",".join(
+                f'{name}="{_escape_label(value)}"'
+                for name, value in zip(self.label_names, values)
             )
-            response = request.execute()
-            self.logger.debug(response)
-            self.logger.info(
-                f"Metadata succefully updated for Broadcast ID {self.broadcast_id}"
+            selector = f"{{{labels}}}" if labels else ""
+            if self.kind != "histogram":
+                lines.append(f"{self.name}{selector} {child.value}")
+                continue
+            with child.lock:
+                counts, total, count = list(child.counts), child.value, child.count
+            bucket_labels = labels + "," if labels else ""
+            cumulative = 0
+            for bound, bucket in zip(self.buckets, counts):
+                cumulative += bucket
+                lines.append(
+                    f'{self.name}_bucket{{{bucket_labels}le="{bound}"}} {cumulative}'
+                )
+            lines.append(f'{self.name}_bucket{{{bucket_labels}le="+Inf"}} {count}')
+            lines.append(f"{self.name}_sum{selector} {total}")
+            lines.append(f"{self.name}_count{selector} {count}")
+
+
+class _MetricChild:
+    __slots__ = ["lock", "value", "count", "counts", "buckets"]
+
+    def __init__(self, buckets=None):
+        self.lock = threading.Lock()
+        self.value = 0  # counter or gauge value, sum of a histogram
+        self.count = 0
+        self.buckets = buckets
+        self.counts = [0] * len(buckets) if buckets else None
+
+    def inc(self, amount=1):
+        with self.lock:
+            self.value += amount
+
+    def set(self, value):
+        self.value = value  # a single store needs no lock
+
+    def observe(self, value):
+        index = bisect.bisect_left(self.buckets, value)
+        with self.lock:
+            if index < len(self.counts):
+                self.counts[index] += 1
+            self.value += value
+            self.count += 1
+
+
+def _escape_label(value):
+    return str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+class Metrics:
+    """Prometheus style metrics of the manager.
+
+    Counters and histograms of the API calls (by method, with errors by
+    reason and the quota units spent), broadcast starts and stops with their
+    durations, token refreshes and a gauge of the health of every stream.
+    The quota used today is read from the `QuotaLedger` when the metrics are
+    rendered. Recording is made for hot paths like the monitor loop: a child
+    per combination of label values is created once, after that recording
+    takes only that child's uncontended lock and updates numbers in place.
+    `render` returns the text exposition format, which `serve` offers over
+    HTTP for the long running commands and `write_textfile` writes for the
+    node exporter's textfile collector after a CLI run.
+    """
+
+    PREFIX = "yt_stream_manager_"
+    # seconds, from a quick `list` call to a start with retries
+    LATENCY_BUCKETS = [0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60]
+    DURATION_BUCKETS = [0.25, 0.5, 1, 2.5, 5, 10, 20, 30, 60, 120, 300]
+
+    def __init__(self, quota=None):
+        self.quota = quota
+        self._metrics = []
+        self.api_calls = self._add(
+            "api_calls_total", "counter", "YouTube API calls", ["method"]
+        )
+        self.api_errors = self._add(
+            "api_errors_total", "counter", "Failed YouTube API calls", ["method", "reason"]
+        )
+        self.api_latency = self._add(
+            "api_call_duration_seconds",
+            "histogram",
+            "Duration of YouTube API calls",
+            ["method"],
+            self.LATENCY_BUCKETS,
+        )
+        self.quota_units = self._add(
+            "quota_units_total", "counter", "Quota units spent by this process", ["method"]
+        )
+        self.broadcasts = self._add(
+            "broadcasts_total",
+            "counter",
+            "Broadcasts started or stopped",
+            ["action", "result"],
+        )
+        self.broadcast_duration = self._add(
+            "broadcast_action_duration_seconds",
+            "histogram",
+            "Duration of starting or stopping a broadcast",
+            ["action"],
+            self.DURATION_BUCKETS,
+        )
+        self.token_refreshes = self._add(
+            "token_refreshes_total",
+            "counter",
+            "OAuth token refreshes, `adopted` ones were refreshed by another process",
+            ["result"],
+        )
+        self.stream_steady = self._add(
+            "stream_steady",
+            "gauge",
+            "1 while the stream and its broadcast are in a steady state",
+            ["stream"],
+        )
+        self.stream_health = self._add(
+            "stream_health_status",
+            "gauge",
+            "1 for the current health status of the stream",
+            ["stream", "status"],
+        )
+        self._health = {}  # stream -> (steady child, current health status)
+        self._health_lock = threading.Lock()
+
+    def _add(self, name, kind, help, labels, buckets=None):
+        metric = _Metric(self.PREFIX + name, kind, help, labels, buckets)
+        self._metrics.append(metric)
+        return metric
+
+    def record_call(self, method, cost, latency, error=None):
+        self.api_calls.labels(method).inc()
+        self.api_latency.labels(method).observe(latency)
+        self.quota_units.labels(method).inc(cost)
+        if error is not None:
+            self.api_errors.labels(method, error).inc()
+
+    def record_health(self, stream, status, steady):
+        """Set the health gauges of a stream, `status` is its health status."""
+        status = status or "unknown"
+        with self._health_lock:
+            steady_child, previous_status = self._health.get(stream) or (
+                self.stream_steady.labels(stream),
+                None,
             )
-            return response
+            steady_child.set(1 if steady else 0)
+            if status != previous_status:
+                if previous_status is not None:
+                    self.stream_health.labels(stream, previous_status).set(0)
+                self.stream_health.labels(stream, status).set(1)
+                self._health[stream] = (steady_child, status)
+
+    def render(self):
+        lines = []
+        for metric in self._metrics:
+            metric.render(lines)
+        if self.quota is not None:
+            usage = self.quota.usage()
+            for name, help, value in [
+                (
+                    "quota_units_used_today",
+                    "Quota units used today by all processes",
+                    usage["units"],
+                ),
+                ("quota_budget_units", "Configured daily quota budget", usage["budget"]),
+            ]:
+                lines.append(f"# HELP {self.PREFIX}{name} {help}")
+                lines.append(f"# TYPE {self.PREFIX}{name} gauge")
+                lines.append(f"{self.PREFIX}{name} {value}")
+        return "\n".join(lines) + "\n"
+
+    def serve(self, address, port, logger):
+        """Offer `/metrics` over HTTP from a background thread, returns the server."""
+        import http.server
+
+        metrics = self
+
+        class Handler(http.server.BaseHTTPRequestHandler):
+            def do_GET(self):
+                if self.path.split("?", 1)[0] != "/metrics":
+                    self.send_error(404)
+                    return
+                body = metrics.render().encode()
+                self.send_response(200)
+                self.send_header("Content-Type", "text/plain; version=0.0.4; charset=utf-8")
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def log_message(self, format, *args):
+                logger.debug("metrics: " + format, *args)
+
+        server = http.server.ThreadingHTTPServer((address, port), Handler)
+        server.daemon_threads = True
+        threading.Thread(target=server.serve_forever, name="metrics", daemon=True).start()
+        logger.info(
+            "Serving metrics on http://%s:%s/metrics", address, server.server_address[1]
+        )
+        return server
+
+    def write_textfile(self, filename):
+        """Write the metrics for the textfile collector with a write-rename."""
+        tmp_filename = filename + ".tmp"
+        with open(tmp_filename, "w") as f:
+            f.write(self.render())
+        os.replace(tmp_filename, filename)
+
+
+class EmailNotifier:
+    """Sends notifications by email from a background thread.
+
+    `notify` only puts the notification on a bounded queue and never blocks or
+    raises, so a slow or unreachable mail server cannot delay a broadcast.
+    Notifications arriving within `digest_delay` seconds of the first one are
+    sent as a single digest mail. The SMTP connection (upgraded with STARTTLS
+    unless `smtp_starttls` is off) is kept open between mails and closed
+    after `IDLE_TIMEOUT` seconds without notifications.
+    """
+
+    QUEUE_SIZE = 1000  # notifications waiting to be sent, newer ones are dropped
+    IDLE_TIMEOUT = 120  # seconds the SMTP connection is kept open without mails
+    SMTP_TIMEOUT = 30
+
+    def __init__(self, settings, logger):
+        self.settings = settings
+        self.logger = logger
+        self.enabled = bool(settings.get(YouTubeStreamManager.CONF_ENABLE_EMAIL))
+        self._queue = queue.Queue(self.QUEUE_SIZE)
+        self._lock = threading.Lock()
+        self._thread = None
+        self._smtp = None
+        self._dropped = 0
+
+    def notify(self, subject, text=""):
+        """Queue a notification, returns immediately."""
+        if not self.enabled:
+            return
+        with self._lock:
+            if self._thread is None:
+                self._thread = threading.Thread(
+                    target=self._run, name="email-notifier", daemon=True
+                )
+                self._thread.start()
+        try:
+            self._queue.put_nowait((datetime.datetime.now(), subject, text))
+        except queue.Full:
+            with self._lock:
+                self._dropped += 1
+
+    def close(self, timeout=SMTP_TIMEOUT):
+        """Send what is queued right away and stop, waiting at most `timeout` seconds."""
+        with self._lock:
+            thread = self._thread
+        if thread is None:
+            return
+        try:
+            self._queue.put(None, timeout=timeout)
+        except queue.Full:
+            pass
+        thread.join(timeout)
+
+    def _run(self):
+        closing = False
+        while not closing:
+            try:
+                notification = self._queue.get(timeout=self.IDLE_TIMEOUT)
+            except queue.Empty:
+                self._disconnect()
+                continue
+            if notification is None:
+                break
+            digest = [notification]
+            deadline = time.monotonic() + self.settings[
+                YouTubeStreamManager.CONF_DIGEST_DELAY
+            ]
+            while not closing:
+                try:
+                    notification = self._queue.get(
+                        timeout=max(0, deadline - time.monotonic())
+                    )
+                except queue.Empty:
+                    break
+                if notification is None:
+                    closing = True
+                else:
+                    digest.append(notification)
+            self._send(digest)
+        self._disconnect()
+        with self._lock:
+            self._thread = None
+
+    def _message(self, digest):
+        from email.message import EmailMessage
+
+        settings = self.settings
+        with self._lock:
+            dropped, self._dropped = self._dropped, 0
+        subject = settings[YouTubeStreamManager.CONF_SUBJECT]
+        if len(digest) == 1 and not dropped:
+            subject = f"{subject}: {digest[0][1]}"
+        else:
+            subject = f"{subject}: {len(digest) + dropped} notifications"
+        lines = []
+        for timestamp, title, text in digest:
+            lines.append(f"{timestamp:%Y-%m-%d %H:%M:%S} {title}")
+            if text:
+                lines.append(text)
+            lines.append("")
+        if dropped:
+            lines.append(f"{dropped} more notifications were dropped")
+
+        message = EmailMessage()
+        message["Subject"] = subject
+        message["From"] = settings[YouTubeStreamManager.CONF_SENDER_EMAIL]
+        message["To"] = settings[YouTubeStreamManager.CONF_RECIPIENT_EMAIL]
+        message.set_content("\n".join(lines))
+        return message
+
+    def _connect(self):
+        import smtplib
+        import ssl
+
+        settings = self.settings
+        smtp = smtplib.SMTP(
+            settings[YouTubeStreamManager.CONF_SMTP_SERVER],
+            settings[YouTubeStreamManager.CONF_SMTP_PORT],
+            timeout=self.SMTP_TIMEOUT,
+        )
+        try:
+            if settings[YouTubeStreamManager.CONF_SMTP_STARTTLS]:
+                smtp.starttls(context=ssl.create_default_context())
+            if settings.get(YouTubeStreamManager.CONF_SENDER_PASSWORD):
+                smtp.login(
+                    settings[YouTubeStreamManager.CONF_SENDER_EMAIL],
+                    settings[YouTubeStreamManager.CONF_SENDER_PASSWORD],
+                )
+        except Exception:
+            smtp.close()
+            raise
+        return smtp
+
+    def _disconnect(self):
+        if self._smtp is None:
+            return
+        try:
+            self._smtp.quit()
+        except Exception:
+            self._smtp.close()
+        self._smtp = None
+
+    def _send(self, digest):
+        import smtplib
+
+        try:
+            message = self._message(digest)
+            for attempt in range(2):
+                reused = self._smtp is not None
+                if not reused:
+                    self._smtp = self._connect()
+                try:
+                    self._smtp.send_message(message)
+                    break
+                except (smtplib.SMTPServerDisconnected, OSError):
+                    # the server may have closed the idle connection, reconnect once
+                    self._smtp.close()
+                    self._smtp = None
+                    if not reused:
+                        raise
+            self.logger.debug("Email `%s` sent", message["Subject"])
         except Exception as e:
-            self.logger.error(f"Failed to update Broadcast metadata: {str(e)}")
+            self._disconnect()
+            self.logger.error(
+                "Failed to send %s email notifications: %s", len(digest), e
+            )
+
+
+class EncoderSupervisor:
+    """Runs the local encoder command and restarts it when it exits or stalls.
+
+    The output of the encoder (stdout and stderr through one pipe) is read
+    with a selector in the supervising thread, so reading never blocks and a
+    stalled encoder is noticed after `stall_timeout` seconds without a new
+    frame. Every `key=value` pair is parsed, which covers both the stats line
+    ffmpeg writes to stderr and its `-progress pipe:1` output. Restarts are
+    delayed by `restart_min_delay` seconds, doubled for every run that
+    failed within `STABLE_AFTER` seconds, up to `restart_max_delay`.
+    `changed` is set whenever the status changes, so a waiting monitor can
+    poll YouTube right away.
+    """
+
+    STABLE_AFTER = 60  # seconds a run must last to reset the restart delay
+    STOP_TIMEOUT = 5  # seconds between SIGTERM and SIGKILL
+    OUTPUT_LINES = 20  # last lines of other output kept for the restart notification
+    READ_SIZE = 65536
+    # progress keys of the ffmpeg stats line and of `-progress` -> snapshot keys
+    PROGRESS_KEYS = {
+        "frame": "frames",
+        "fps": "fps",
+        "bitrate": "bitrate_kbps",
+        "drop": "dropped_frames",
+        "drop_frames": "dropped_frames",
+        "speed": "speed",
+    }
+    PAIR = re.compile(r"(\w+)=\s*(\S+)")
+    NUMBER = re.compile(r"[-+]?\d+(\.\d+)?")
+
+    def __init__(self, settings, logger, notifier):
+        self.command = settings[YouTubeStreamManager.CONF_ENCODER_COMMAND]
+        self.stall_timeout = settings[YouTubeStreamManager.CONF_ENCODER_STALL_TIMEOUT]
+        self.min_delay = settings[YouTubeStreamManager.CONF_ENCODER_RESTART_MIN_DELAY]
+        self.max_delay = settings[YouTubeStreamManager.CONF_ENCODER_RESTART_MAX_DELAY]
+        self.logger = logger
+        self.notifier = notifier
+        self.changed = threading.Event()
+        self._stop = threading.Event()
+        self._lock = threading.Lock()
+        self._thread = None
+        self._process = None
+        self._output = collections.deque(maxlen=self.OUTPUT_LINES)
+        self._status = "stopped"
+        self._progress = {}
+        self._last_progress = None  # monotonic time of the last new frame
+        self._restarts = 0
+        self._last_exit = None
+
+    def start(self):
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._run, name="encoder", daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        """Stop supervising and terminate the encoder."""
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join()
+            self._thread = None
+
+    def snapshot(self):
+        """Return the status and the last progress of the encoder."""
+        with self._lock:
+            snapshot = {
+                "status": self._status,
+                "pid": self._process.pid if self._process is not None else None,
+                "restarts": self._restarts,
+                "last_exit": self._last_exit,
+                "progress_age": round(time.monotonic() - self._last_progress, 1)
+                if self._last_progress is not None
+                else None,
+            }
+            snapshot.update(self._progress)
+        return snapshot
+
+    def _set_status(self, status):
+        with self._lock:
+            changed = status != self._status
+            self._status = status
+        if changed:
+            self.changed.set()
+
+    def _run(self):
+        failures = 0
+        while not self._stop.is_set():
+            started = time.monotonic()
+            reason = self._run_once()
+            if self._stop.is_set():
+                break
+            if time.monotonic() - started >= self.STABLE_AFTER:
+                failures = 0
+            delay = min(self.max_delay, self.min_delay * 2**failures)
+            failures += 1
+            with self._lock:
+                self._restarts += 1
+                self._last_exit = reason
+            self._set_status("restarting")
+            self.logger.warning("Encoder %s, restarting in %.0fs", reason, delay)
+            self.notifier.notify(
+                f"Encoder {reason}, restarting in {delay:.0f}s", "\n".join(self._output)
+            )
+            self._stop.wait(delay)
+        self._set_status("stopped")
+
+    def _run_once(self):
+        """Run the encoder until it exits, stalls or is stopped, returns why it ended."""
+        try:
+            process = subprocess.Popen(
+                self.command,
+                stdin=subprocess.DEVNULL,
+                stdout=subprocess.PIPE,
+                stderr=subprocess.STDOUT,
+                start_new_session=True,  # signals go to ffmpeg and its children
+            )
+        except OSError as e:
+            return f"failed to start ({e})"
+        with self._lock:
+            self._process = process
+            self._progress = {}
+            # the start up counts as progress, so a slow connect is not a stall
+            self._last_progress = time.monotonic()
+        self._set_status("starting")
+        self.logger.info("Started encoder (pid %s)", process.pid)
+        buffer = b""
+        try:
+            with selectors.DefaultSelector() as selector:
+                selector.register(process.stdout, selectors.EVENT_READ)
+                while True:
+                    if self._stop.is_set():
+                        return "stopped"
+                    if selector.get_map():
+                        if selector.select(timeout=1):
+                            chunk = os.read(process.stdout.fileno(), self.READ_SIZE)
+                            if chunk:
+                                buffer = self._parse(buffer + chunk)
+                            else:
+                                selector.unregister(process.stdout)
+                    elif process.poll() is None:
+                        try:  # closed its output but is still running
+                            process.wait(1)
+                        except subprocess.TimeoutExpired:
+                            pass
+                    else:
+                        break
+                    if time.monotonic() - self._last_progress > self.stall_timeout:
+                        self._set_status("stalled")
+                        return f"stalled (no new frame for {self.stall_timeout}s)"
+            self._parse(buffer + b"\n")
+            return f"exited with code {process.returncode}"
+        finally:
+            self._terminate(process)
+            process.stdout.close()
+            with self._lock:
+                self._process = None
+
+    def _terminate(self, process):
+        if process.poll() is not None:
+            return
+        for sig, timeout in [(signal.SIGTERM, self.STOP_TIMEOUT), (signal.SIGKILL, None)]:
+            try:
+                os.killpg(process.pid, sig)
+            except ProcessLookupError:
+                break
+            try:
+                process.wait(timeout)
+                break
+            except subprocess.TimeoutExpired:
+                continue
+
+    def _parse(self, data):
+        """Parse the complete lines of `data`, returns the incomplete rest."""
+        # ffmpeg ends its stats line with a carriage return to overwrite it
+        *lines, rest = re.split(rb"[\r\n]", data)
+        for raw in lines:
+            line = raw.decode("utf-8", "replace").strip()
+            if not line:
+                continue
+            progress = {
+                self.PROGRESS_KEYS[key]: self._number(value)
+                for key, value in self.PAIR.findall(line)
+                if key in self.PROGRESS_KEYS
+            }
+            if not progress:
+                self._output.append(line)
+                continue
+            with self._lock:
+                # ffmpeg keeps printing stats while it waits, only new frames count
+                if progress.get("frames") != self._progress.get("frames"):
+                    self._last_progress = time.monotonic()
+                self._progress.update(progress)
+            self._set_status("running")
+        return rest
+
+    def _number(self, value):
+        match = self.NUMBER.match(value)  # e.g. `2560.1kbits/s`, `1.01x`, `N/A`
+        if match is None:
             return None
+        return float(match.group()) if match.group(1) else int(match.group())
+
+
+class _ControlHandler(socketserver.StreamRequestHandler):
+    """Handle one JSON line command from the control socket.
+
+    `UnixStreamServer` serves one connection at a time, so commands never run
+    concurrently against the shared API client. Commands that may take
+    minutes (`LOCAL_COMMANDS`, waiting for a broadcast to go live) are
+    refused, they would keep `stop_broadcast` and `status` waiting.
+    """
+
+    def handle(self):
+        manager = self.server.manager
+        try:
+            message = json.loads(self.rfile.readline())
+            command = message["command"]
+            config = message.get("config")
+            if command == "ping":
+                reply = {"ok": True, "result": None}
+            elif command in manager.LOCAL_COMMANDS or message.get("arguments", {}).get(
+                "wait_live"
+            ):
+                reply = {
+                    "ok": False,
+                    "error": f"`{command}` may take minutes, run it with -local",
+                }
+            elif config is not None and config != os.path.realpath(
+                manager._config_path()
+            ):
+                # its state belongs to another config, the client runs it itself
+                reply = {
+                    "ok": False,
+                    "error": f"The daemon serves `{manager._config_path()}`, not `{config}`",
+                    "config_mismatch": True,
+                }
+            else:
+                manager.logger.info(
+                    "Received command `%s` from control socket", command
+                )
+                result = manager.handle_command(command, message.get("arguments", {}))
+                reply = {"ok": result is not None, "result": result}
+        except Exception as e:
+            manager.logger.error("Failed to handle control socket command: %s", e)
+            reply = {"ok": False, "error": str(e)}
+        self.wfile.write(json.dumps(reply).encode("utf-8") + b"\n")
+
+
+def _send_daemon_command(socket_path, command, arguments=None, config=None):
+    """Send a command to a running daemon, return its reply or `None` if none is listening.
+
+    `config` is the real path of the config the command is meant for, a
+    daemon serving another config refuses it. Without a reply within
+    `CONTROL_SOCKET_TIMEOUT` seconds a failure is returned.
+    """
+    try:
+        with socket.socket(socket.AF_UNIX, socket.SOCK_STREAM) as client:
+            client.settimeout(YouTubeStreamManager.CONTROL_SOCKET_TIMEOUT)
+            client.connect(socket_path)
+            message = {"command": command, "arguments": arguments or {}}
+            if config is not None:
+                message["config"] = config
+            client.sendall(json.dumps(message).encode("utf-8") + b"\n")
+            with client.makefile("rb") as f:
+                return json.loads(f.readline())
+    except (FileNotFoundError, ConnectionRefusedError):
+        return None
+    except TimeoutError:
+        return {
+            "ok": False,
+            "error": f"No reply from the daemon on `{socket_path}` within "
+            f"{YouTubeStreamManager.CONTROL_SOCKET_TIMEOUT}s, the command may still "
+            "be running there (see its log)",
+        }
+
+
+def _exit_on_failed_reports(reports):
+    """Exit with 1 unless every stream of a fleet command succeeded."""
+    if reports is None or not all(report["ok"] for report in reports.values()):
+        sys.exit(1)
 
 
 def main():
@@ -552,9 +5307,34 @@ def main():
     parser.add_argument(
         "-config",
         type=str,
-        default="config.json",
+        default=YouTubeStreamManager.CONFIG_FILE,
         help="Path to the configuration file (default: config.json)",
     )
+    parser.add_argument(
+        "-socket",
+        type=str,
+        default=os.path.join(
+            os.path.dirname(__file__), YouTubeStreamManager.SOCKET_FILE
+        ),
+        help="Path to the control socket of the daemon started with `serve`",
+    )
+    parser.add_argument(
+        "-local",
+        action="store_true",
+        help="Run the command in this process even if a daemon is running",
+    )
+    parser.add_argument(
+        "-trace",
+        metavar="FILE",
+        help="Record spans of the phases and HTTP calls, as a Chrome trace if FILE "
+        "ends in .json, as JSON lines otherwise (implies -local)",
+    )
+    parser.add_argument(
+        "-profile",
+        metavar="FILE",
+        help="Profile the main thread with cProfile, write the stats to FILE and "
+        "print the slowest functions (implies -local)",
+    )
     subparsers = parser.add_subparsers(dest="command", required=True)
 
     # Sub-command: login
@@ -563,6 +5343,12 @@ def main():
         help="opens the browser to login an create a token.secret file after succefull login",
     )
 
+    # Sub-command: refresh_discovery
+    subparsers.add_parser(
+        "refresh_discovery",
+        help="Downloads the YouTube API discovery document into the local cache",
+    )
+
     # Sub-command: create_stream
     create_stream_parser = subparsers.add_parser(
         "create_stream", help="Create a new stream"
@@ -590,28 +5376,283 @@ def main():
         help="Creates a new broadcast, binds the set stream id, and starts it immediately",
     )
 
+    start_broadcast_parser.add_argument(
+        "-wait_live",
+        action="store_true",
+        help="Wait for the stream and advance the broadcast to live as soon as possible",
+    )
+
+    # Sub-command: go_live
+    go_live_parser = subparsers.add_parser(
+        "go_live",
+        help="Advances the current broadcast to live as soon as its stream is active",
+    )
+    go_live_parser.add_argument(
+        "-timeout",
+        type=float,
+        default=YouTubeStreamManager.LIFECYCLE_TIMEOUT,
+        help="Seconds to wait for the broadcast to go live",
+    )
+
     # Sub-command: stop_broadcast
     stop_broadcast_parser = subparsers.add_parser(
         "stop_broadcast", help="Stops the currently running broadcast"
     )
 
+    for fleet_parser in [start_broadcast_parser, stop_broadcast_parser]:
+        fleet_group = fleet_parser.add_mutually_exclusive_group()
+        fleet_group.add_argument(
+            "-all",
+            action="store_true",
+            help="Use every stream configured under `streams`",
+        )
+        fleet_group.add_argument(
+            "-streams",
+            nargs="+",
+            metavar="NAME",
+            help="Names of streams configured under `streams`",
+        )
+
+    # Sub-command: status
+    subparsers.add_parser(
+        "status", help="Shows the configured stream and broadcast and their state"
+    )
+
+    # Sub-command: monitor
+    monitor_parser = subparsers.add_parser(
+        "monitor",
+        help="Polls the health of all configured streams and broadcasts",
+    )
+    monitor_parser.add_argument(
+        "-fast",
+        type=float,
+        default=YouTubeStreamManager.MONITOR_FAST_INTERVAL,
+        help="Seconds between polls while a stream or broadcast is changing",
+    )
+    monitor_parser.add_argument(
+        "-slow",
+        type=float,
+        default=YouTubeStreamManager.MONITOR_SLOW_INTERVAL,
+        help="Seconds between polls while everything is active and live",
+    )
+    monitor_parser.add_argument(
+        "-fast_window",
+        type=float,
+        default=YouTubeStreamManager.MONITOR_FAST_WINDOW,
+        help="Seconds of fast polls after a change, slow polls follow even if not live",
+    )
+    monitor_parser.add_argument(
+        "-count", type=int, help="Stop after this many polls (default: run forever)"
+    )
+
+    # Sub-command: schedule
+    schedule_parser = subparsers.add_parser(
+        "schedule",
+        help="Rolls the broadcast over to a new one at every day part boundary",
+    )
+    schedule_parser.add_argument(
+        "-count", type=int, help="Stop after this many rollovers (default: run forever)"
+    )
+
+    # Sub-command: history
+    history_parser = subparsers.add_parser(
+        "history",
+        help="Shows uptime and outages of the streams recorded by `monitor`",
+    )
+    history_parser.add_argument(
+        "-days", type=float, default=1, help="Days to look back (default: 1)"
+    )
+    history_parser.add_argument("-stream", help="Only this stream (default: all)")
+
+    # Sub-command: fill_pool
+    subparsers.add_parser(
+        "fill_pool",
+        help="Prepares broadcasts until `pool_size` are pooled and deletes stale ones",
+    )
+
+    # Sub-command: reconcile
+    reconcile_parser = subparsers.add_parser(
+        "reconcile",
+        help="Deletes or completes orphaned broadcasts that nothing tracks anymore",
+    )
+    reconcile_parser.add_argument(
+        "-dry_run",
+        action="store_true",
+        help="Only report the orphans, change nothing",
+    )
+
+    # Sub-command: update_metadata
+    update_metadata_parser = subparsers.add_parser(
+        "update_metadata",
+        help="Applies the configured description, tags and category to past videos",
+    )
+    update_metadata_parser.add_argument(
+        "-since", help="First day of the videos to update (YYYY-MM-DD)"
+    )
+    update_metadata_parser.add_argument(
+        "-until", help="Last day of the videos to update (YYYY-MM-DD)"
+    )
+    update_metadata_parser.add_argument(
+        "-title", help="Only videos whose title matches this regular expression"
+    )
+    update_metadata_parser.add_argument(
+        "-dry_run",
+        action="store_true",
+        help="Only report the videos that would be updated, change nothing",
+    )
+
+    # Sub-command: quota
+    subparsers.add_parser(
+        "quota", help="Shows the API quota used today, broken down by method"
+    )
+
+    # Sub-command: reload_config
+    subparsers.add_parser(
+        "reload_config",
+        help="Makes the daemon reload its config now (it also does when the file changes)",
+    )
+
+    # Sub-command: serve
+    subparsers.add_parser(
+        "serve",
+        help="Runs as a daemon and executes commands received on the control socket",
+    )
+
     args = parser.parse_args()
 
-    youtube = YouTubeStreamManager(args.config)
+    if args.command in [
+        "start_broadcast",
+        "stop_broadcast",
+        "status",
+        "quota",
+        "fill_pool",
+        "reload_config",
+        "create_stream",
+    ]:
+        arguments = {}
+        if getattr(args, "all", False) or getattr(args, "streams", None):
+            arguments = {"all": args.all, "streams": args.streams}
+        if args.command == "create_stream":
+            arguments = {
+                "name": args.name,
+                "stream_type": args.streamType,
+                "resolution": args.resolution,
+                "fps": args.fps,
+            }
+        reply = None
+        # a forwarded command would be traced or profiled in the daemon, not here,
+        # waiting for the broadcast to go live would block the daemon for minutes
+        if not (
+            args.local or args.trace or args.profile or getattr(args, "wait_live", False)
+        ):
+            reply = _send_daemon_command(
+                args.socket,
+                args.command,
+                arguments,
+                os.path.realpath(os.path.join(os.path.dirname(__file__), args.config)),
+            )
+        if reply is not None and reply.get("config_mismatch"):
+            reply = None  # the daemon runs another config, run it here
+        if reply is not None:
+            if not reply["ok"]:
+                print(
+                    f"Command `{args.command}` failed: {reply.get('error', 'see daemon log')}",
+                    file=sys.stderr,
+                )
+                sys.exit(1)
+            if reply["result"] is not None:
+                print(json.dumps(reply["result"], indent=4))
+            if arguments.get("all") or arguments.get("streams"):
+                _exit_on_failed_reports(reply["result"])
+            return
+
+    tracer = Tracer(args.trace)
+    profiler = None
+    if args.profile:
+        import cProfile
+
+        profiler = cProfile.Profile()
+        profiler.enable()
+    try:
+        with tracer.span(args.command):
+            with tracer.span("init"):
+                youtube = YouTubeStreamManager(args.config, tracer)
+            try:
+                _run_command(youtube, args)
+            finally:
+                # the command is done, only now wait for the pool and the notifications
+                youtube.stop_watching_config()
+                youtube.stop_serving_metrics()
+                youtube.stop_encoder()
+                youtube.wait_for_pool()
+                youtube.notifier.close()
+                youtube.write_metrics(args.command)
+    finally:
+        tracer.close()
+        if profiler is not None:
+            import pstats
+
+            profiler.disable()
+            profiler.dump_stats(args.profile)
+            stats = pstats.Stats(profiler, stream=sys.stderr)
+            stats.sort_stats("cumulative").print_stats(
+                YouTubeStreamManager.PROFILE_TOP_FUNCTIONS
+            )
+
+
+def _run_command(youtube, args):
+    if getattr(args, "all", False) or getattr(args, "streams", None):
+        reports = youtube.handle_command(
+            args.command, {"all": args.all, "streams": args.streams}
+        )
+        if reports is not None:
+            print(json.dumps(reports, indent=4))
+        _exit_on_failed_reports(reports)
+        return
+
     if args.command == "login":
         youtube._authenticate(True)
+    elif args.command == "refresh_discovery":
+        youtube.refresh_discovery_document()
     elif args.command == "create_stream":
         youtube.create_stream(args.name, args.streamType, args.resolution, args.fps)
     elif args.command == "start_broadcast":
-        youtube.start_broadcast()
-        # # while True:
-        # youtube._check_broadcast_status()
-        # youtube._check_stream_health()
-
-        # time.sleep(5)
-        # youtube._advance_broadcast()
+        youtube.start_broadcast(args.wait_live)
+    elif args.command == "go_live":
+        youtube.advance_to_live(args.timeout)
     elif args.command == "stop_broadcast":
         youtube.stop_broadcast()
+    elif args.command == "status":
+        status = youtube.status()
+        if status is not None:
+            print(json.dumps(status, indent=4))
+    elif args.command == "quota":
+        print(json.dumps(youtube.quota_usage(), indent=4))
+    elif args.command == "schedule":
+        youtube.run_schedule(args.count)
+    elif args.command == "fill_pool":
+        pool = youtube.fill_pool()
+        if pool is not None:
+            print(json.dumps(pool, indent=4))
+    elif args.command == "history":
+        history = youtube.health_history(args.days, args.stream)
+        if history is not None:
+            print(json.dumps(history, indent=4))
+    elif args.command == "reconcile":
+        report = youtube.reconcile(args.dry_run)
+        if report is not None:
+            print(json.dumps(report, indent=4))
+    elif args.command == "update_metadata":
+        report = youtube.update_metadata(args.since, args.until, args.title, args.dry_run)
+        if report is not None:
+            print(json.dumps(report, indent=4))
+    elif args.command == "reload_config":
+        if not youtube.reload_config():
+            sys.exit(1)
+    elif args.command == "monitor":
+        youtube.monitor(args.fast, args.slow, args.count, args.fast_window)
+    elif args.command == "serve":
+        youtube.serve(args.socket)
 
 
 if __name__ == "__main__":